@@ -1,16 +1,18 @@
+import click
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
-from flask_jwt_extended import JWTManager
-from flask_restx import Api
-from flask_migrate import Migrate
+from werkzeug.middleware.proxy_fix import ProxyFix
 from .config import Config
+from .utils.batch import BatchJWTManager
+from .utils.openapi import CachedSpecApi, openapi_cli
+from .utils.replicas import RoutingSession, init_replicas
+from .utils.sharding import init_sharding
 
 # Inicializamos las extensiones globalmente para luego asociarlas a la app en la función create_app
-db = SQLAlchemy()  # Para la interacción con la base de datos usando SQLAlchemy
-migrate = Migrate()  # Para gestionar las migraciones de la base de datos
+db = SQLAlchemy(session_options={'class_': RoutingSession})  # Para la interacción con la base de datos; enruta las lecturas a réplicas
 bcrypt = Bcrypt()  # Para el hash y verificación de contraseñas de los usuarios
-jwt = JWTManager()  # Para la gestión de tokens JWT en la autenticación
+jwt = BatchJWTManager()  # Para la gestión de tokens JWT en la autenticación (verificados una sola vez por lote)
 
 def create_app():
     """Función factory para crear la aplicación Flask y configurar sus componentes."""
@@ -21,11 +23,26 @@ def create_app():
     # Cargamos la configuración de la aplicación desde el archivo de configuración
     app.config.from_object(Config)
 
+    # Detrás de proxies inversos, tomar la IP y el esquema del cliente de X-Forwarded-For y
+    # X-Forwarded-Proto (límites de tasa por cliente); solo los añadidos por proxies de confianza
+    if app.config['TRUSTED_PROXY_HOPS']:
+        hops = app.config['TRUSTED_PROXY_HOPS']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
+
+    # Registramos los shards de tareas como binds antes de que SQLAlchemy cree los motores
+    init_sharding(app, db)
+
     # Inicializamos las extensiones con la aplicación
     db.init_app(app)  # Inicializar SQLAlchemy con la app
+    init_replicas(app)  # Crear los motores de las réplicas de lectura, si están configuradas
     bcrypt.init_app(app)  # Inicializar Bcrypt con la app
     jwt.init_app(app)  # Inicializar JWTManager con la app
-    migrate.init_app(app, db)  # Inicializar Migrate con la app y la base de datos
+
+    # Flask-Migrate (y con él Alembic) solo hace falta para los comandos `flask db`: se
+    # inicializa únicamente cuando la aplicación se carga desde la CLI de Flask
+    if click.get_current_context(silent=True) is not None:
+        from flask_migrate import Migrate
+        Migrate(app, db)  # Inicializar Migrate con la app y la base de datos
 
     # Autorizador JWT para integrar con la documentación Swagger
     authorizations = {
@@ -38,7 +55,8 @@ def create_app():
     }
 
     # Configuramos la API Flask-RESTX, que nos ayuda a crear endpoints RESTful con documentación Swagger integrada
-    api = Api(
+    # Sirve /swagger.json desde SWAGGER_SPEC_FILE si se ha generado con `flask openapi build`
+    api = CachedSpecApi(
     app,  # La aplicación Flask en la que registramos la API
     title='API de Gestión de Proyectos',  # Título actualizado para la documentación Swagger
     version='1.0',  # Versión de la API
@@ -46,6 +64,7 @@ def create_app():
     authorizations=authorizations,  # Añadimos la configuración de JWT a la API
     security='Bearer'  # Define que los endpoints por defecto usan el esquema de seguridad JWT
     )
+    app.extensions['restx_api'] = api  # Guardamos la API para poder precalentarla (ver app.utils.warmup)
 
     # Importamos los controladores y namespaces que organizan las rutas/endpoints de la API
     
@@ -54,6 +73,7 @@ def create_app():
     #from .controllers.role_controller import role_ns  # Controlador para la gestión de roles
     from .controllers.task_controller import task_ns  # Controlador para la gestión de tareas
     from .controllers.category_controller import category_ns  # Controlador para la gestión de categorías
+    from .controllers.batch_controller import batch_ns  # Controlador para los lotes de peticiones
 
     # Registramos cada namespace (grupo de rutas) en la API
     api.add_namespace(user_ns, path='/users')  # Registrar el namespace de usuarios en /users
@@ -61,6 +81,22 @@ def create_app():
     #api.add_namespace(role_ns, path='/roles')  # Registrar el namespace de roles en /roles
     api.add_namespace(task_ns, path='/tasks')  # Registrar el namespace de tareas en /tasks
     api.add_namespace(category_ns, path='/categories')  # Registrar el namespace de categorías en /categories
+    api.add_namespace(batch_ns, path='/batch')  # Registrar el namespace de lotes en /batch
+
+    # Registramos el comando CLI para reanudar el purgado de usuarios borrados
+    from .jobs.user_purge import purge_deleted_users_command
+    app.cli.add_command(purge_deleted_users_command)
+
+    # Registramos el comando CLI del barrido de tareas vencidas
+    from .jobs.overdue_sweep import sweep_overdue_tasks_command
+    app.cli.add_command(sweep_overdue_tasks_command)
+
+    # Registramos los comandos CLI de gestión de shards (creación de tablas y redistribución)
+    from .jobs.task_resharding import shards_cli
+    app.cli.add_command(shards_cli)
+
+    # Registramos el comando CLI que genera la especificación Swagger en tiempo de build
+    app.cli.add_command(openapi_cli)
 
     # Retornamos la aplicación ya configurada
     return app
@@ -0,0 +1,194 @@
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+from a2wsgi import WSGIMiddleware
+from flask_jwt_extended import create_access_token, decode_token
+from flask_restx import marshal
+from starlette.responses import JSONResponse
+from starlette.routing import Match, Route
+
+from app import create_app
+from app.controllers.category_controller import category_response_model
+from app.controllers.task_controller import task_response_model
+from app.controllers.user_controller import user_response_model
+from app.middlewares.admission_middleware import get_admission_controller
+from app.services.async_category_service import AsyncCategoryService
+from app.services.async_task_service import AsyncTaskService
+from app.services.async_user_service import AsyncUserService
+from app.utils.async_db import create_async_session_factory
+
+
+class AsyncReadRouter:
+    """
+    Aplicación ASGI que atiende las rutas de lectura en el bucle de eventos y delega el resto.
+
+    Las peticiones que coinciden por completo (ruta y método) con alguna ruta asíncrona se
+    atienden aquí; las demás (escrituras, Swagger, etc.) pasan a la aplicación Flask original,
+    que se ejecuta en un pool de hilos.
+    """
+
+    def __init__(self, routes, fallback, on_shutdown):
+        self.routes = routes
+        self.fallback = fallback
+        self.on_shutdown = on_shutdown
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+
+        if scope['type'] == 'http':
+            for route in self.routes:
+                match, child_scope = route.matches(scope)
+                if match == Match.FULL:
+                    await route.handle({**scope, **child_scope}, receive, send)
+                    return
+
+        await self.fallback(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        """Gestiona el arranque y la parada del servidor ASGI."""
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.on_shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def create_asgi_app(flask_app=None):
+    """
+    Función factory para crear la aplicación en modo asíncrono (ASGI).
+
+    Las lecturas más frecuentes (`GET /tasks/`, `GET /categories/`, `GET /users/me`,
+    `GET /users/<id>`) y `POST /users/login` se ejecutan sobre el motor asyncio de
+    SQLAlchemy, por lo que una petición esperando a la base de datos no ocupa un hilo y la
+    capacidad del proceso la marca el pool de conexiones. El resto de endpoints se delegan
+    a la aplicación Flask.
+
+    Args:
+        flask_app (Flask, opcional): Aplicación Flask ya creada; por defecto se crea una.
+
+    Returns:
+        AsyncReadRouter: Aplicación ASGI lista para servirse con uvicorn.
+    """
+    flask_app = flask_app or create_app()
+    engine, Session = create_async_session_factory(flask_app.config)
+
+    # Mismo control de admisión que en modo WSGI: tasa por cliente y cuenta, y un límite de
+    # hashes simultáneos con una cola acotada delante del pool de hilos
+    with flask_app.app_context():
+        admission = get_admission_controller()
+
+    # Pool de hilos para el hash de contraseñas, fuera del bucle de eventos; nunca tiene
+    # trabajo en cola porque solo recibe las peticiones admitidas
+    hash_executor = ThreadPoolExecutor(max_workers=admission.max_concurrency, thread_name_prefix='password-hash')
+
+    def error(status, message, headers=None):
+        """Respuesta de error con el mismo formato que Flask-RESTX."""
+        return JSONResponse({'message': message}, status_code=status, headers=headers)
+
+    def current_user_id(request):
+        """Obtener la identidad del token JWT de la petición, o None si no es válido."""
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        if scheme != 'Bearer' or not token:
+            return None
+        try:
+            with flask_app.app_context():
+                return decode_token(token)[flask_app.config['JWT_IDENTITY_CLAIM']]
+        except Exception:
+            return None
+
+    async def list_tasks(request):
+        """Obtener todas las tareas"""
+        if current_user_id(request) is None:
+            return error(401, 'Missing or invalid access token')
+        try:
+            after_id = int(request.query_params['after_id']) if 'after_id' in request.query_params else None
+            limit = int(request.query_params['limit']) if 'limit' in request.query_params else None
+        except ValueError:
+            return error(400, 'after_id and limit must be integers')
+        max_limit = flask_app.config['TASK_LIST_MAX_LIMIT']
+        if limit is not None and not 1 <= limit <= max_limit:
+            return error(400, f'limit must be between 1 and {max_limit}')
+
+        async with Session() as session:
+            tasks = await AsyncTaskService.get_all_tasks(session, after_id, limit)
+            return JSONResponse(marshal(tasks, task_response_model))
+
+    async def list_categories(request):
+        """Obtener todas las categorías"""
+        if current_user_id(request) is None:
+            return error(401, 'Missing or invalid access token')
+
+        async with Session() as session:
+            categories = await AsyncCategoryService.get_all_categories(session)
+            return JSONResponse(marshal(categories, category_response_model))
+
+    async def get_user(request):
+        """Obtener un usuario por ID (o el usuario actual en /users/me)"""
+        identity = current_user_id(request)
+        if identity is None:
+            return error(401, 'Missing or invalid access token')
+
+        async with Session() as session:
+            try:
+                user = await AsyncUserService.get_user_by_id(session, request.path_params.get('user_id', identity))
+            except ValueError as e:
+                return error(404, str(e))
+            return JSONResponse(marshal(user, user_response_model))
+
+    async def login(request):
+        """Autenticar un usuario y obtener un token de acceso"""
+        try:
+            data = await request.json()
+        except ValueError:  # Cuerpo que no es JSON válido: 400, como en modo WSGI
+            return error(400, 'Input payload validation failed')
+        if not isinstance(data, dict) or not data.get('email') or not data.get('password'):
+            return error(400, 'Input payload validation failed')
+
+        # Límite de tasa: demasiados intentos del mismo cliente o contra la misma cuenta
+        retry_after = admission.check_rate(
+            request.client.host if request.client else 'unknown', str(data['email']).strip().lower()
+        )
+        if retry_after:
+            return error(429, 'Too many requests', {'Retry-After': str(math.ceil(retry_after))})
+
+        # Límite de concurrencia: sin hueco libre en un tiempo razonable se descarta la carga
+        if not await admission.acquire_async():
+            return error(503, 'Service overloaded, try again later', {
+                'Retry-After': str(max(1, math.ceil(admission.queue_timeout)))
+            })
+
+        try:
+            async with Session() as session:
+                try:
+                    user = await AsyncUserService.authenticate_user(session, data['email'], data['password'], hash_executor)
+                except ValueError as e:
+                    return error(401, str(e))
+        finally:
+            admission.release_async()
+
+        with flask_app.app_context():
+            access_token = create_access_token(identity=user.id)
+        return JSONResponse({'access_token': access_token})
+
+    async def shutdown():
+        """Liberar las conexiones del pool y el pool de hilos al parar el servidor."""
+        await engine.dispose()
+        hash_executor.shutdown(wait=False)
+
+    routes = [
+        Route('/categories/', list_categories, methods=['GET']),
+        Route('/users/me', get_user, methods=['GET']),
+        Route('/users/{user_id:int}', get_user, methods=['GET']),
+        Route('/users/login', login, methods=['POST']),
+    ]
+
+    # Las tareas solo se leen en modo asíncrono sin sharding; con shards se delegan a Flask
+    if not flask_app.config.get('TASK_SHARD_URIS'):
+        routes.append(Route('/tasks/', list_tasks, methods=['GET']))
+
+    return AsyncReadRouter(routes, WSGIMiddleware(flask_app), shutdown)
@@ -14,23 +14,109 @@ class Config:
 
     Atributos:
         SQLALCHEMY_DATABASE_URI (str): URI para la conexión a la base de datos MySQL.
+        SQLALCHEMY_REPLICA_URIS (List[str]): URIs de las réplicas de solo lectura (variable DB_REPLICA_URIS separada por comas).
+        REPLICA_RETRY_INTERVAL (float): Segundos que una réplica caída permanece fuera de la rotación.
+        TASK_SHARD_URIS (List[str]): URIs de los shards de tareas (variable DB_TASK_SHARD_URIS separada por comas); vacía desactiva el sharding.
+        TASK_ID_NODE (int): Nodo fijo (0-1023) del generador de IDs de tareas; si no se define, cada proceso arrienda uno libre.
+        TASK_ID_NODE_LEASE_TTL (float): Segundos que dura el arrendamiento del nodo si el proceso no lo renueva.
         SQLALCHEMY_TRACK_MODIFICATIONS (bool): Deshabilita el seguimiento de modificaciones de objetos en SQLAlchemy para optimizar el rendimiento.
-        SQLALCHEMY_ECHO (bool): Activa la impresión de todas las consultas SQL ejecutadas por la aplicación en la consola, útil para depuración.
+        SQLALCHEMY_ECHO (bool): Activa la impresión de todas las consultas SQL ejecutadas por la aplicación en la consola, útil para depuración (desactivado por defecto; nunca en wsgi.py).
         SECRET_KEY (str): Clave secreta para firmar cookies y otras funcionalidades de seguridad de Flask.
         JWT_SECRET_KEY (str): Clave secreta utilizada para generar y verificar tokens JWT.
+        USER_PURGE_BATCH_SIZE (int): Número de tareas eliminadas por transacción al purgar un usuario borrado.
+        USER_PURGE_ASYNC (bool): Ejecuta el purgado de usuarios en un hilo en segundo plano en lugar de hacerlo en la petición.
+        ASYNC_SQLALCHEMY_DATABASE_URI (str): URI asíncrona para el modo ASGI; si no se define se deriva de SQLALCHEMY_DATABASE_URI.
+        ASYNC_POOL_SIZE / ASYNC_MAX_OVERFLOW (int): Conexiones del pool asíncrono; limitan las consultas simultáneas del modo ASGI.
+        ASYNC_POOL_TIMEOUT (float): Segundos máximos de espera por una conexión libre en el modo ASGI.
+        AUTH_CLIENT_RATE / AUTH_CLIENT_BURST (float): Tasa (peticiones/s) y ráfaga permitidas por cliente en login y registro.
+        TRUSTED_PROXY_HOPS (int): Proxies inversos de confianza delante de la aplicación; la IP del cliente se toma de X-Forwarded-For (por defecto 0, desactivado).
+        AUTH_ACCOUNT_RATE / AUTH_ACCOUNT_BURST (float): Tasa y ráfaga permitidas por cuenta en login y registro.
+        WORKER_THREADS (int): Hilos por worker de gunicorn (variable GUNICORN_THREADS); acotan los límites de admisión.
+        AUTH_MAX_CONCURRENCY (int): Número máximo de hashes de contraseña ejecutándose a la vez por proceso (por defecto, un hilo menos que el worker).
+        AUTH_QUEUE_SIZE (int): Peticiones de autenticación que pueden esperar un hueco libre, bloqueando un hilo (por defecto 0).
+        AUTH_QUEUE_TIMEOUT (float): Segundos máximos de espera en la cola antes de responder 503.
+        TASK_LIST_MAX_LIMIT (int): Tamaño máximo de página de `GET /tasks/`.
+        BATCH_MAX_REQUESTS (int): Número máximo de subpeticiones en un `POST /batch`.
+        BATCH_MAX_PARALLEL (int): Hilos por proceso para ejecutar en paralelo las lecturas de los lotes.
+        QUERY_BUDGETS_ENFORCED (bool): Comprueba los presupuestos de consultas declarados con `@query_budget` (pruebas y CI).
+        OVERDUE_SWEEP_BATCH_SIZE (int): Número de tareas marcadas como vencidas por transacción.
+        OVERDUE_SWEEP_STATUSES (List[str]): Estados no completados que recorre el barrido de tareas vencidas.
+        OVERDUE_SWEEP_LOOKBACK (float): Segundos que el barrido retrocede desde su marca de agua para recuperar filas saltadas.
+        OVERDUE_SWEEP_INTERVAL (float): Segundos entre barridos dentro de cada worker de gunicorn; 0 lo desactiva.
+        SWAGGER_SPEC_FILE (str): Especificación Swagger generada con `flask openapi build`; si existe y coincide con las rutas y modelos se sirve en lugar de generarla.
     """
 
     # URI de conexión a la base de datos MySQL, con las credenciales y el host tomados del archivo .env
     SQLALCHEMY_DATABASE_URI = f"mysql://{os.environ.get('DB_USER')}:{os.environ.get('DB_PASS')}@{os.environ.get('DB_HOST')}/{os.environ.get('DB_NAME')}"
+
+    # URIs de las réplicas de lectura; las consultas de solo lectura se reparten entre ellas
+    SQLALCHEMY_REPLICA_URIS = [uri.strip() for uri in os.environ.get('DB_REPLICA_URIS', '').split(',') if uri.strip()]
+
+    # Tiempo que una réplica caída queda fuera de la rotación antes de volver a probarla
+    REPLICA_RETRY_INTERVAL = float(os.environ.get('REPLICA_RETRY_INTERVAL') or 30)
+
+    # Shards de las tablas de tareas, repartidas por hash de user_id; usuarios y categorías siguen en la base principal
+    TASK_SHARD_URIS = [uri.strip() for uri in os.environ.get('DB_TASK_SHARD_URIS', '').split(',') if uri.strip()]
+
+    # Nodo del generador de IDs de tareas con sharding: cada proceso arrienda uno distinto en la
+    # base principal. Fijarlo solo tiene sentido con un único proceso por nodo; si otro lo tiene, el arranque falla
+    TASK_ID_NODE = int(os.environ['TASK_ID_NODE']) if os.environ.get('TASK_ID_NODE') else None
+    TASK_ID_NODE_LEASE_TTL = float(os.environ.get('TASK_ID_NODE_LEASE_TTL') or 300)
     
     # Desactiva el rastreo de modificaciones para mejorar el rendimiento de la aplicación
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
-    # Activa el logging de las consultas SQL en la consola
-    SQLALCHEMY_ECHO = True
+    # Logging de las consultas SQL en la consola, solo para depuración (variable SQLALCHEMY_ECHO=true)
+    SQLALCHEMY_ECHO = os.environ.get('SQLALCHEMY_ECHO', 'false').lower() == 'true'
 
     # Clave secreta para funcionalidades de seguridad como sesiones y cookies
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'super_secret_key'
 
     # Clave secreta para la autenticación JWT, usada para generar tokens
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt_super_secret_key'
+
+    # Tamaño de lote para el purgado de usuarios: transacciones cortas que no retienen bloqueos
+    USER_PURGE_BATCH_SIZE = int(os.environ.get('USER_PURGE_BATCH_SIZE') or 500)
+
+    # Purgar los usuarios borrados en segundo plano para que DELETE /users/<id> responda de inmediato
+    USER_PURGE_ASYNC = os.environ.get('USER_PURGE_ASYNC', 'true').lower() == 'true'
+
+    # Control de admisión de login y registro: el hash de contraseñas consume mucha CPU
+    AUTH_CLIENT_RATE = float(os.environ.get('AUTH_CLIENT_RATE') or 1)
+    AUTH_CLIENT_BURST = float(os.environ.get('AUTH_CLIENT_BURST') or 10)
+    AUTH_ACCOUNT_RATE = float(os.environ.get('AUTH_ACCOUNT_RATE') or 0.2)
+    AUTH_ACCOUNT_BURST = float(os.environ.get('AUTH_ACCOUNT_BURST') or 5)
+    # Proxies inversos de confianza (balanceador, nginx...): sin ellos todos los clientes comparten la
+    # IP del proxy y su límite de tasa. Solo con proxies delante, o cualquiera podría falsear X-Forwarded-For
+    TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS') or 0)
+    # Los límites son por proceso y cada petición en cola bloquea un hilo: huecos más cola se
+    # mantienen por debajo de los hilos del worker para que siempre quede uno para el resto de endpoints
+    WORKER_THREADS = int(os.environ.get('GUNICORN_THREADS') or 4)
+    AUTH_MAX_CONCURRENCY = int(os.environ.get('AUTH_MAX_CONCURRENCY') or max(1, WORKER_THREADS - 1))
+    AUTH_QUEUE_SIZE = int(os.environ.get('AUTH_QUEUE_SIZE') or 0)
+    AUTH_QUEUE_TIMEOUT = float(os.environ.get('AUTH_QUEUE_TIMEOUT') or 0.5)
+
+    # Modo asíncrono (run_async.py): URI con controlador asyncio (p. ej. mysql+aiomysql://) y tamaño del pool
+    ASYNC_SQLALCHEMY_DATABASE_URI = os.environ.get('ASYNC_DATABASE_URI')
+    ASYNC_POOL_SIZE = int(os.environ.get('ASYNC_POOL_SIZE') or 20)
+    ASYNC_MAX_OVERFLOW = int(os.environ.get('ASYNC_MAX_OVERFLOW') or 10)
+    ASYNC_POOL_TIMEOUT = float(os.environ.get('ASYNC_POOL_TIMEOUT') or 30)
+
+    # Tamaño máximo de página del listado de tareas (parámetro limit)
+    TASK_LIST_MAX_LIMIT = int(os.environ.get('TASK_LIST_MAX_LIMIT') or 1000)
+
+    # Lotes de peticiones (POST /batch): tamaño máximo y lecturas simultáneas por proceso
+    BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS') or 20)
+    BATCH_MAX_PARALLEL = int(os.environ.get('BATCH_MAX_PARALLEL') or 4)
+
+    # Presupuestos de consultas (@query_budget): solo se comprueban en pruebas y CI
+    QUERY_BUDGETS_ENFORCED = os.environ.get('QUERY_BUDGETS_ENFORCED', 'false').lower() == 'true'
+
+    # Barrido incremental de tareas vencidas (`flask sweep-overdue-tasks` o en segundo plano en los workers)
+    OVERDUE_SWEEP_BATCH_SIZE = int(os.environ.get('OVERDUE_SWEEP_BATCH_SIZE') or 500)
+    OVERDUE_SWEEP_STATUSES = [s.strip() for s in os.environ.get('OVERDUE_SWEEP_STATUSES', 'pending,in-progress').split(',') if s.strip()]
+    OVERDUE_SWEEP_LOOKBACK = float(os.environ.get('OVERDUE_SWEEP_LOOKBACK') or 3600)
+    OVERDUE_SWEEP_INTERVAL = float(os.environ.get('OVERDUE_SWEEP_INTERVAL') or 0)
+
+    # Especificación Swagger precalculada en tiempo de build (`flask openapi build`)
+    SWAGGER_SPEC_FILE = os.environ.get('SWAGGER_SPEC_FILE') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'swagger.json')
@@ -0,0 +1,52 @@
+from flask import current_app, request
+from flask_restx import Namespace, Resource, fields
+from flask_jwt_extended import jwt_required
+from app.utils.batch import BATCH_METHODS, run_batch
+
+# Namespace para los lotes de peticiones
+batch_ns = Namespace('batch', description='Varias llamadas a la API en una sola petición')
+
+# Modelo de cada subpetición del lote
+batch_request_model = batch_ns.model('BatchRequest', {
+    'id': fields.String(description='Identificador opcional que se devuelve en la respuesta'),
+    'method': fields.String(required=True, enum=list(BATCH_METHODS), description='Método HTTP'),
+    'path': fields.String(required=True, description='Ruta de la API, por ejemplo /tasks/?limit=20'),
+    'headers': fields.Raw(description='Encabezados adicionales (If-Match, Prefer...); el token es el del lote'),
+    'body': fields.Raw(description='Cuerpo JSON de la subpetición')
+})
+
+# Modelo de entrada del lote
+batch_model = batch_ns.model('Batch', {
+    'requests': fields.List(fields.Nested(batch_request_model), required=True, description='Subpeticiones, en orden'),
+    'atomic': fields.Boolean(default=False, description='Todo o nada: si una subpetición falla se deshace el lote'),
+    'parallel_reads': fields.Boolean(default=False, description='Ejecutar en paralelo los GET consecutivos (no atómico)')
+})
+
+# Modelo de la respuesta de cada subpetición
+batch_response_model = batch_ns.model('BatchResponse', {
+    'id': fields.String(description='Identificador de la subpetición'),
+    'status': fields.Integer(description='Código de estado HTTP'),
+    'headers': fields.Raw(description='Encabezados de la respuesta'),
+    'body': fields.Raw(description='Cuerpo de la respuesta')
+})
+
+@batch_ns.route('')
+class BatchResource(Resource):
+    @batch_ns.expect(batch_model, validate=True)
+    @batch_ns.response(409, 'Lote atómico deshecho porque una subpetición ha fallado')
+    @jwt_required()
+    @batch_ns.marshal_list_with(batch_response_model)
+    def post(self):
+        """Ejecutar varias llamadas a la API en una sola petición, con el token verificado una vez"""
+        data = request.get_json()
+        sub_requests = data['requests']
+        if not sub_requests:
+            batch_ns.abort(400, 'The batch has no requests')
+        if len(sub_requests) > current_app.config['BATCH_MAX_REQUESTS']:
+            batch_ns.abort(400, f"A batch can have at most {current_app.config['BATCH_MAX_REQUESTS']} requests")
+
+        try:
+            responses, committed = run_batch(sub_requests, data.get('atomic', False), data.get('parallel_reads', False))
+        except ValueError as e:
+            batch_ns.abort(400, str(e))
+        return responses, 200 if committed else 409
@@ -1,7 +1,9 @@
 from flask import request
 from flask_restx import Namespace, Resource, fields
 from app.services.category_service import CategoryService
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
+from app.utils.versioning import handle_conditional_patch
+from app.middlewares.auth_middleware import admin_required
 
 # Crear un espacio de nombres (namespace) para categorías
 category_ns = Namespace('categories', description='Operaciones relacionadas con las categorías')
@@ -14,7 +16,14 @@ category_model = category_ns.model('Category', {
 # Definir el modelo de salida de categoría para la documentación de Swagger
 category_response_model = category_ns.model('CategoryResponse', {
     'id': fields.Integer(description='ID de la categoría'),
-    'name': fields.String(description='Nombre de la categoría')
+    'name': fields.String(description='Nombre de la categoría'),
+    'version': fields.Integer(description='Versión de la categoría para el control de concurrencia')
+})
+
+# Modelo de entrada para la actualización parcial de categorías
+category_patch_model = category_ns.model('CategoryPatch', {
+    'name': fields.String(description='Nuevo nombre de la categoría'),
+    'version': fields.Integer(description='Versión esperada (alternativa al encabezado If-Match)')
 })
 
 @category_ns.route('/')
@@ -27,18 +36,29 @@ class CategoryListResource(Resource):
         return categories, 200
 
     @category_ns.expect(category_model, validate=True)
+    @category_ns.response(403, 'Solo para administradores')
     @jwt_required()
+    @admin_required  # Acceso basado en roles: solo los administradores crean categorías
     @category_ns.marshal_with(category_response_model, code=201)
     def post(self):
         """Crear una nueva categoría (Solo para administradores)"""
-        # Ejemplo de acceso basado en roles:
-        user = get_jwt_identity()
-        if not user['is_admin']:
-            category_ns.abort(403, "Permiso denegado: Solo los administradores pueden crear categorías.")
-
         data = request.get_json()
         try:
             category = CategoryService.create_category(data['name'])
             return category, 201
         except ValueError as e:
             category_ns.abort(400, str(e))
+
+@category_ns.route('/<int:category_id>')
+@category_ns.param('category_id', 'El identificador único de la categoría')
+class CategoryResource(Resource):
+    @category_ns.expect(category_patch_model, validate=True)
+    @category_ns.header('If-Match', 'Versión esperada de la categoría, por ejemplo "3"')
+    @category_ns.response(409, 'Conflicto de versión (campo version)')
+    @category_ns.response(412, 'Conflicto de versión (If-Match)')
+    @category_ns.response(403, 'Solo para administradores')
+    @jwt_required()
+    @admin_required
+    def patch(self, category_id):
+        """Actualizar parcialmente una categoría con control de concurrencia optimista (Solo para administradores)"""
+        return handle_conditional_patch(category_ns, CategoryService.patch_category, category_id, category_response_model)
@@ -1,7 +1,10 @@
-from flask import request
-from flask_restx import Namespace, Resource, fields
+from functools import partial
+from flask import current_app, request
+from flask_restx import Namespace, Resource, fields, reqparse
 from app.services.task_service import TaskService
+from app.services.user_service import UserService
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.utils.versioning import handle_conditional_patch
 
 # Namespace para Tareas
 task_ns = Namespace('tasks', description='Operaciones con las tareas')
@@ -10,28 +13,70 @@ task_ns = Namespace('tasks', description='Operaciones con las tareas')
 task_model = task_ns.model('Task', {
     'title': fields.String(required=True, description='Título de la tarea'),
     'description': fields.String(description='Descripción de la tarea'),
-    'category_ids': fields.List(fields.Integer, description='IDs de las categorías asociadas')
+    'due_date': fields.DateTime(description='Fecha límite en formato ISO 8601, por ejemplo 2024-01-01T00:00:00'),
+    'category_ids': fields.List(fields.Integer, description='IDs de las categorías asociadas'),
+    'category_names': fields.List(fields.String, description='Nombres de las categorías asociadas (solo los administradores pueden nombrar categorías nuevas, que se crean)')
 })
 
+# Con sharding los IDs de tareas superan 2**53 (ver next_task_id): se envían como texto para
+# que los clientes JavaScript no los redondeen
+task_id_pattern = r'^[0-9]+$'
+
 # Modelo de salida para tareas (respuesta)
 task_response_model = task_ns.model('TaskResponse', {
-    'id': fields.Integer(description='ID de la tarea'),
+    'id': fields.String(description='ID de la tarea, como texto'),
     'title': fields.String(description='Título de la tarea'),
     'description': fields.String(description='Descripción de la tarea'),
     'completed': fields.Boolean(description='Estado de la tarea (completada o no)'),
+    'due_date': fields.DateTime(description='Fecha límite de la tarea'),
+    'version': fields.Integer(description='Versión de la tarea para el control de concurrencia'),
+    'overdue_at': fields.DateTime(description='Momento en que la tarea se marcó como vencida, si lo está'),
     'categories': fields.List(fields.Nested(task_ns.model('Category', {
         'id': fields.Integer(description='ID de la categoría'),
         'name': fields.String(description='Nombre de la categoría')
     })), description='Lista de categorías asociadas a la tarea')
 })
 
+def task_id_arg(value):
+    """Interpretar un ID de tarea recibido como texto en la URL."""
+    if not str(value).isdigit():
+        raise ValueError('(must be a task ID)')
+    return int(value)
+
+def page_limit_arg(value):
+    """Interpretar el tamaño de página, entre 1 y `TASK_LIST_MAX_LIMIT`."""
+    if not str(value).isdigit():
+        raise ValueError('(must be a positive integer)')
+    limit = int(value)
+    max_limit = current_app.config['TASK_LIST_MAX_LIMIT']
+    if not 1 <= limit <= max_limit:
+        raise ValueError(f'(must be between 1 and {max_limit})')
+    return limit
+
+# Tipos de los parámetros en la documentación Swagger
+task_id_arg.__schema__ = {'type': 'string', 'pattern': task_id_pattern}
+page_limit_arg.__schema__ = {'type': 'integer', 'minimum': 1}
+
+# Parámetros de paginación del listado de tareas (responde 400 si no son válidos)
+task_list_parser = reqparse.RequestParser()
+task_list_parser.add_argument('after_id', type=task_id_arg, location='args',
+                              help='Cursor: devolver solo las tareas con ID mayor que este')
+task_list_parser.add_argument('limit', type=page_limit_arg, location='args',
+                              help='Número máximo de tareas a devolver')
+
+def can_create_categories(data):
+    """Si la petición puede crear las categorías que nombra: solo los administradores."""
+    return bool(data.get('category_names')) and UserService.is_admin(get_jwt_identity())
+
 @task_ns.route('/')
 class TaskListResource(Resource):
     @jwt_required()
+    @task_ns.expect(task_list_parser)
     @task_ns.marshal_list_with(task_response_model)
     def get(self):
         """Obtener todas las tareas"""
-        tasks = TaskService.get_all_tasks()
+        args = task_list_parser.parse_args()
+        tasks = TaskService.get_all_tasks(after_id=args['after_id'], limit=args['limit'])
         return tasks, 200
 
     @task_ns.expect(task_model, validate=True)
@@ -41,7 +86,96 @@ class TaskListResource(Resource):
         """Crear una nueva tarea"""
         data = request.get_json()
         try:
-            task = TaskService.create_task(data['title'], data.get('description'), data.get('category_ids', []))
+            task = TaskService.create_task(
+                title=data['title'],
+                description=data.get('description'),
+                due_date=data.get('due_date'),
+                user_id=get_jwt_identity(),
+                category_ids=data.get('category_ids', []),
+                category_names=data.get('category_names', []),
+                create_categories=can_create_categories(data)
+            )
             return task, 201
         except ValueError as e:
             task_ns.abort(400, str(e))
+
+# Modelo de salida para las estadísticas de tareas
+task_stats_model = task_ns.model('TaskStats', {
+    'total': fields.Integer(description='Número total de tareas'),
+    'by_status': fields.Raw(description='Número de tareas por estado')
+})
+
+@task_ns.route('/stats')
+class TaskStatsResource(Resource):
+    @jwt_required()
+    @task_ns.marshal_with(task_stats_model)
+    def get(self):
+        """Obtener el número de tareas por estado"""
+        return TaskService.get_task_stats(), 200
+
+# Modelo de entrada para la actualización parcial de tareas
+task_patch_model = task_ns.model('TaskPatch', {
+    'title': fields.String(description='Nuevo título de la tarea'),
+    'description': fields.String(description='Nueva descripción de la tarea'),
+    'status': fields.String(description='Nuevo estado de la tarea'),
+    'due_date': fields.DateTime(description='Nueva fecha límite en formato ISO 8601, por ejemplo 2024-01-01T00:00:00'),
+    'version': fields.Integer(description='Versión esperada (alternativa al encabezado If-Match)')
+})
+
+@task_ns.route('/<int:task_id>')
+@task_ns.param('task_id', 'El identificador único de la tarea')
+class TaskResource(Resource):
+    @task_ns.expect(task_patch_model, validate=True)
+    @task_ns.header('If-Match', 'Versión esperada de la tarea, por ejemplo "3"')
+    @task_ns.response(409, 'Conflicto de versión (campo version)')
+    @task_ns.response(412, 'Conflicto de versión (If-Match)')
+    @jwt_required()
+    def patch(self, task_id):
+        """Actualizar parcialmente una tarea con control de concurrencia optimista"""
+        # El propietario permite enrutar la actualización directamente a su shard
+        patch_task = partial(TaskService.patch_task, user_id=get_jwt_identity())
+        return handle_conditional_patch(task_ns, patch_task, task_id, task_response_model)
+
+# Modelo de entrada para el etiquetado masivo de tareas
+task_bulk_categories_model = task_ns.model('TaskBulkCategories', {
+    'task_ids': fields.List(fields.String(pattern=task_id_pattern), required=True, description='IDs de las tareas a modificar, como texto'),
+    'category_ids': fields.List(fields.Integer, description='IDs de las categorías a agregar o quitar'),
+    'category_names': fields.List(fields.String, description='Nombres de las categorías a agregar o quitar (solo los administradores pueden nombrar categorías nuevas al agregar)')
+})
+
+# Modelo de salida para las operaciones masivas
+task_bulk_result_model = task_ns.model('TaskBulkResult', {
+    'affected': fields.Integer(description='Número de asociaciones tarea-categoría afectadas')
+})
+
+@task_ns.route('/bulk/tag')
+class TaskBulkTagResource(Resource):
+    @task_ns.expect(task_bulk_categories_model, validate=True)
+    @jwt_required()
+    @task_ns.marshal_with(task_bulk_result_model)
+    def post(self):
+        """Agregar una o varias categorías a muchas tareas en una sola operación"""
+        data = request.get_json()
+        try:
+            affected = TaskService.add_categories_to_tasks(
+                [int(task_id) for task_id in data['task_ids']], data.get('category_ids'), data.get('category_names'),
+                user_id=get_jwt_identity(),  # Solo las tareas propias; las ajenas no cuentan en `affected`
+                create_categories=can_create_categories(data)
+            )
+        except ValueError as e:
+            task_ns.abort(400, str(e))
+        return {'affected': affected}, 200
+
+@task_ns.route('/bulk/untag')
+class TaskBulkUntagResource(Resource):
+    @task_ns.expect(task_bulk_categories_model, validate=True)
+    @jwt_required()
+    @task_ns.marshal_with(task_bulk_result_model)
+    def post(self):
+        """Quitar una o varias categorías de muchas tareas en una sola operación"""
+        data = request.get_json()
+        affected = TaskService.remove_categories_from_tasks(
+            [int(task_id) for task_id in data['task_ids']], data.get('category_ids'), data.get('category_names'),
+            user_id=get_jwt_identity()  # Solo las tareas propias; las ajenas no cuentan en `affected`
+        )
+        return {'affected': affected}, 200
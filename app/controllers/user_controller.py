@@ -2,6 +2,9 @@ from flask import request
 from flask_restx import Namespace, Resource, fields
 from app.services.user_service import UserService
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from app.utils.versioning import handle_conditional_patch
+from app.jobs.user_purge import get_purge_status
+from app.middlewares.admission_middleware import admission_controlled
 
 # Namespace para Usuarios
 user_ns = Namespace('users', description='Operaciones con usuarios')
@@ -24,6 +27,15 @@ user_response_model = user_ns.model('UserResponse', {
     'id': fields.Integer(description='ID del usuario'),
     'username': fields.String(description='Nombre de usuario'),
     'email': fields.String(description='Correo electrónico del usuario'),
+    'version': fields.Integer(description='Versión del usuario para el control de concurrencia'),
+})
+
+# Modelo de entrada para la actualización parcial de usuario
+user_patch_model = user_ns.model('UserPatch', {
+    'username': fields.String(description='Nuevo nombre de usuario'),
+    'email': fields.String(description='Nuevo correo electrónico'),
+    'password': fields.String(description='Nueva contraseña'),
+    'version': fields.Integer(description='Versión esperada (alternativa al encabezado If-Match)'),
 })
 
 # Modelo para el token de acceso
@@ -34,6 +46,9 @@ token_response_model = user_ns.model('TokenResponse', {
 # **Registro y Autenticación de Usuarios**
 @user_ns.route('/register')
 class UserRegisterResource(Resource):
+    @admission_controlled(account_field='email')  # Limitar el coste de CPU del hash de contraseñas
+    @user_ns.response(429, 'Demasiadas peticiones')
+    @user_ns.response(503, 'Servicio saturado')
     @user_ns.expect(user_registration_model, validate=True)
     @user_ns.marshal_with(user_response_model, code=201)
     def post(self):
@@ -47,6 +62,9 @@ class UserRegisterResource(Resource):
 
 @user_ns.route('/login')
 class UserLoginResource(Resource):
+    @admission_controlled(account_field='email')  # Limitar el coste de CPU del hash de contraseñas
+    @user_ns.response(429, 'Demasiadas peticiones')
+    @user_ns.response(503, 'Servicio saturado')
     @user_ns.expect(user_login_model, validate=True)
     @user_ns.marshal_with(token_response_model)
     def post(self):
@@ -68,10 +86,10 @@ class UserResource(Resource):
     @user_ns.marshal_with(user_response_model)
     def get(self, user_id):
         """Obtener un usuario por ID"""
-        user = UserService.get_user_by_id(user_id)
-        if not user:
-            user_ns.abort(404, 'User not found')
-        return user, 200
+        try:
+            return UserService.get_user_by_id(user_id), 200
+        except ValueError as e:  # Inexistente o borrado
+            user_ns.abort(404, str(e))
 
     @jwt_required()
     @user_ns.expect(user_registration_model, validate=True)
@@ -85,15 +103,48 @@ class UserResource(Resource):
         except ValueError as e:
             user_ns.abort(400, str(e))
 
+    @jwt_required()
+    @user_ns.expect(user_patch_model, validate=True)
+    @user_ns.header('If-Match', 'Versión esperada del usuario, por ejemplo "3"')
+    @user_ns.response(409, 'Conflicto de versión (campo version)')
+    @user_ns.response(412, 'Conflicto de versión (If-Match)')
+    @user_ns.response(403, 'Solo el propio usuario puede modificar sus datos')
+    def patch(self, user_id):
+        """Actualizar parcialmente un usuario con control de concurrencia optimista"""
+        # Solo el propio usuario puede cambiar su nombre, correo o contraseña
+        if user_id != int(get_jwt_identity()):
+            user_ns.abort(403, 'Permission denied: users can only modify their own account')
+        return handle_conditional_patch(user_ns, UserService.patch_user, user_id, user_response_model)
+
     @jwt_required()
     def delete(self, user_id):
         """Eliminar un usuario por ID"""
         try:
             UserService.delete_user(user_id)
-            return {'message': 'User deleted successfully'}, 204
+            # El usuario queda borrado de inmediato; sus tareas se purgan en segundo plano
+            return {'message': 'User deleted, purge scheduled'}, 202
         except ValueError as e:
             user_ns.abort(404, str(e))
 
+# Modelo de salida para el progreso del purgado
+purge_status_model = user_ns.model('PurgeStatus', {
+    'user_id': fields.Integer(description='ID del usuario borrado'),
+    'status': fields.String(description='Estado del purgado (queued, running, completed, failed)'),
+    'deleted_tasks': fields.Integer(description='Número de tareas eliminadas hasta ahora'),
+})
+
+@user_ns.route('/<int:user_id>/purge')
+@user_ns.param('user_id', 'El identificador único del usuario')
+class UserPurgeStatusResource(Resource):
+    @jwt_required()
+    @user_ns.marshal_with(purge_status_model)
+    def get(self, user_id):
+        """Consultar el progreso del purgado de un usuario borrado"""
+        status = get_purge_status(user_id)
+        if not status:
+            user_ns.abort(404, 'No purge found for this user')
+        return status, 200
+
 # **Perfil del Usuario Actual**
 @user_ns.route('/me')
 class UserProfileResource(Resource):
@@ -102,7 +153,7 @@ class UserProfileResource(Resource):
     def get(self):
         """Obtener información del usuario actual"""
         user_id = get_jwt_identity()
-        user = UserService.get_user_by_id(user_id)
-        if not user:
-            user_ns.abort(404, 'User not found')
-        return user, 200
+        try:
+            return UserService.get_user_by_id(user_id), 200
+        except ValueError as e:  # El token de un usuario borrado sigue siendo válido hasta que caduca
+            user_ns.abort(404, str(e))
@@ -0,0 +1,271 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+
+import click
+from blinker import Namespace
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import and_, delete, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.sweep_watermark import SweepWatermark
+from app.models.task import Task
+from app.utils.sharding import task_sessions
+
+logger = logging.getLogger(__name__)
+
+# Señales del barrido: los suscriptores (notificaciones, métricas...) reciben cada lote marcado
+overdue_signals = Namespace()
+overdue_tasks_flagged = overdue_signals.signal('overdue-tasks-flagged')
+
+# Barrido periódico dentro del proceso (ver start_overdue_sweeper)
+_sweeper_lock = threading.Lock()
+_sweeper_thread = None
+_sweeper_stop = threading.Event()
+
+
+def _watermark_name(shard_id, status):
+    """Clave de la marca de agua de un shard y un estado."""
+    return f'overdue:{shard_id}:{status}'
+
+
+def _load_cursor(name, lookback):
+    """Obtener la marca de agua guardada y la posición `(due_date, id)` desde la que continuar el barrido.
+
+    Con `lookback` se retrocede esa ventana de tiempo para volver a revisar las tareas que se
+    saltaron por estar bloqueadas por otro nodo cuyo lote terminó deshaciéndose.
+
+    Returns:
+        Tuple[tuple, tuple]: La marca de agua `(position, last_id)` y la posición de inicio;
+        ambas None si la partición no se ha barrido nunca.
+    """
+    watermark = db.session.execute(
+        select(SweepWatermark.position, SweepWatermark.last_id).where(SweepWatermark.name == name)
+    ).first()
+    db.session.commit()  # No retener la transacción de lectura durante el barrido
+    if watermark is None:
+        return None, None
+    stored = watermark.position, watermark.last_id
+    if lookback:
+        return stored, (watermark.position - lookback, 0)
+    return stored, stored
+
+
+def _advance_watermark(name, expected, position, last_id):
+    """Avanzar la marca de agua desde `expected` hasta `(position, last_id)`.
+
+    La actualización es condicional a que la marca siga en `expected`: si entretanto otro
+    nodo la ha llevado más lejos o una escritura la ha retrocedido (ver
+    `rewind_overdue_watermark`), no se modifica.
+
+    Returns:
+        bool: Si la marca se ha movido; si no, el barrido deja de moverla hasta la siguiente pasada.
+    """
+    values = {'position': position, 'last_id': last_id, 'updated_at': datetime.utcnow()}
+    if expected is None:
+        # Primera ejecución de esta partición
+        try:
+            db.session.execute(insert(SweepWatermark).values(name=name, **values))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()  # Otro nodo la ha creado a la vez; su posición es igual de válida
+            return False
+        return True
+
+    result = db.session.execute(
+        update(SweepWatermark)
+        .where(
+            SweepWatermark.name == name,
+            SweepWatermark.position == expected[0],
+            SweepWatermark.last_id == expected[1],
+        )
+        .values(**values)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def rewind_overdue_watermark(shard_id, status, due_date):
+    """Retroceder la marca de agua de un shard y un estado hasta `due_date`, si ya la ha superado.
+
+    El barrido continúa desde su marca de agua, así que no volvería a ver una tarea que queda
+    por detrás de ella: una fecha límite adelantada, una tarea creada con una fecha ya pasada
+    o una tarea que vuelve a un estado barrido (por ejemplo, reabierta tras completarse). Debe
+    llamarse después de confirmar la tarea; los barridos en curso dejan de avanzar la marca
+    (ver `_advance_watermark`). Solo consulta la base de datos si la tarea puede estar vencida,
+    y solo escribe si la marca de agua ha superado de verdad `due_date`.
+
+    Args:
+        shard_id (int): Índice del shard de la tarea (0 sin sharding).
+        status (str): Estado de la tarea.
+        due_date (datetime): Fecha límite de la tarea.
+    """
+    if due_date is None or status not in current_app.config['OVERDUE_SWEEP_STATUSES'] or due_date > datetime.utcnow():
+        return
+
+    # Leer antes de escribir: la marca de agua es una única fila por shard y estado que todas
+    # las escrituras con fechas pasadas actualizarían, y casi siempre va por detrás de
+    # `due_date`. La lectura va al primario (fuera de `read_only`): una réplica con retraso
+    # podría mostrar una marca aún no avanzada y saltarse un retroceso necesario
+    name = _watermark_name(shard_id, status)
+    position = db.session.execute(select(SweepWatermark.position).where(SweepWatermark.name == name)).scalar()
+    if position is not None and position >= due_date:
+        # Condicional de nuevo: un barrido o un retroceso concurrentes pueden haberla movido
+        db.session.execute(
+            update(SweepWatermark)
+            .where(SweepWatermark.name == name, SweepWatermark.position >= due_date)
+            .values(position=due_date, last_id=0, updated_at=datetime.utcnow())
+        )
+    db.session.commit()
+
+
+def sweep_overdue_tasks(batch_size=500, max_batches=None):
+    """Marcar como vencidas las tareas no completadas cuya fecha límite ya ha pasado.
+
+    Recorre el índice `(status, due_date)` de cada shard y de cada estado de
+    `OVERDUE_SWEEP_STATUSES` desde la última marca de agua, en orden `(due_date, id)`. Cada
+    lote reclama sus filas con `SELECT ... FOR UPDATE SKIP LOCKED`, fija `overdue_at` en una
+    transacción corta, avanza la marca de agua y emite `overdue_tasks_flagged`. Varios nodos
+    pueden barrer a la vez: cada uno se salta las filas que otro ya ha reclamado.
+
+    Args:
+        batch_size (int, opcional): Número máximo de tareas por transacción.
+        max_batches (int, opcional): Número máximo de lotes por shard y estado.
+
+    Returns:
+        int: Número total de tareas marcadas como vencidas.
+    """
+    app = current_app._get_current_object()
+    statuses = app.config['OVERDUE_SWEEP_STATUSES']
+    lookback = timedelta(seconds=app.config['OVERDUE_SWEEP_LOOKBACK'])
+    now = datetime.utcnow()
+    flagged = 0
+
+    for shard_id, session in enumerate(task_sessions()):
+        for status in statuses:
+            name = _watermark_name(shard_id, status)
+            watermark, cursor = _load_cursor(name, lookback)
+            advancing = True
+            batches = 0
+
+            while max_batches is None or batches < max_batches:
+                query = select(Task.id, Task.user_id, Task.due_date).where(
+                    Task.status == status,
+                    Task.due_date <= now,
+                    Task.overdue_at.is_(None),
+                )
+                if cursor is not None:
+                    # Continuar justo después de la última fila procesada (paginación por clave)
+                    due_date, last_id = cursor
+                    query = query.where(or_(Task.due_date > due_date, and_(Task.due_date == due_date, Task.id > last_id)))
+
+                # Reclamar el lote: las filas bloqueadas por otro nodo se saltan en lugar de esperar
+                rows = session.execute(
+                    query.order_by(Task.due_date, Task.id).limit(batch_size).with_for_update(skip_locked=True)
+                ).all()
+                if not rows:
+                    session.commit()
+                    break
+
+                session.execute(
+                    update(Task)
+                    .where(Task.id.in_([row.id for row in rows]))
+                    .values(overdue_at=now, version=Task.version + 1)  # Cambia la representación: nuevo ETag
+                    .execution_options(synchronize_session=False)
+                )
+                session.commit()
+
+                cursor = rows[-1].due_date, rows[-1].id
+                if advancing and (watermark is None or cursor > watermark):
+                    advancing = _advance_watermark(name, watermark, *cursor)
+                    watermark = cursor
+
+                flagged += len(rows)
+                batches += 1
+                overdue_tasks_flagged.send(
+                    app, shard_id=shard_id, status=status, flagged_at=now,
+                    tasks=[{'id': row.id, 'user_id': row.user_id, 'due_date': row.due_date} for row in rows]
+                )
+                logger.info('Flagged %d overdue %s tasks in shard %d', len(rows), status, shard_id)
+
+                if len(rows) < batch_size:
+                    break
+
+    return flagged
+
+
+def _sweep_forever(app, interval):
+    """Ejecutar el barrido cada `interval` segundos hasta que se pida parar."""
+    while not _sweeper_stop.wait(interval):
+        with app.app_context():
+            try:
+                sweep_overdue_tasks(app.config['OVERDUE_SWEEP_BATCH_SIZE'])
+            except Exception:
+                db.session.rollback()
+                logger.exception('Overdue task sweep failed')
+
+
+def start_overdue_sweeper(app):
+    """Lanzar el barrido periódico de tareas vencidas en un hilo del proceso.
+
+    Solo se lanza si `OVERDUE_SWEEP_INTERVAL` es mayor que cero, y una sola vez por proceso.
+
+    Args:
+        app (Flask): La aplicación Flask.
+
+    Returns:
+        threading.Thread: El hilo del barrido, o None si está desactivado.
+    """
+    global _sweeper_thread
+    interval = app.config['OVERDUE_SWEEP_INTERVAL']
+    if interval <= 0:
+        return None
+
+    with _sweeper_lock:
+        if _sweeper_thread is None:
+            _sweeper_stop.clear()
+            _sweeper_thread = threading.Thread(
+                target=_sweep_forever, args=(app, interval), name='overdue-sweep', daemon=True
+            )
+            _sweeper_thread.start()
+        return _sweeper_thread
+
+
+def reset_overdue_sweeper():
+    """Olvidar el barrido heredado tras un fork: su hilo no existe en el proceso hijo."""
+    global _sweeper_lock, _sweeper_thread, _sweeper_stop
+    _sweeper_lock = threading.Lock()
+    _sweeper_thread = None
+    _sweeper_stop = threading.Event()
+
+
+def stop_overdue_sweeper():
+    """Detener el barrido periódico lanzado con `start_overdue_sweeper`."""
+    global _sweeper_thread
+    with _sweeper_lock:
+        _sweeper_stop.set()
+        if _sweeper_thread is not None:
+            _sweeper_thread.join()
+            _sweeper_thread = None
+
+
+@click.command('sweep-overdue-tasks')
+@click.option('--batch-size', type=int, default=None, help='Tareas marcadas por transacción.')
+@click.option('--max-batches', type=int, default=None, help='Lotes como máximo por shard y estado.')
+@click.option('--loop', is_flag=True, help='Repetir el barrido indefinidamente.')
+@click.option('--interval', type=float, default=60, help='Segundos entre barridos con --loop.')
+@click.option('--reset', is_flag=True, help='Borrar las marcas de agua y volver a recorrer todas las tareas.')
+@with_appcontext
+def sweep_overdue_tasks_command(batch_size, max_batches, loop, interval, reset):
+    """Marcar como vencidas las tareas no completadas cuya fecha límite ha pasado."""
+    batch_size = batch_size or current_app.config['OVERDUE_SWEEP_BATCH_SIZE']
+    if reset:
+        db.session.execute(delete(SweepWatermark).where(SweepWatermark.name.like('overdue:%')))
+        db.session.commit()
+
+    while True:
+        flagged = sweep_overdue_tasks(batch_size, max_batches)
+        click.echo(f'{flagged} overdue tasks flagged')
+        if not loop or _sweeper_stop.wait(interval):
+            break
@@ -0,0 +1,129 @@
+import click
+from flask.cli import AppGroup
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from app import db
+from app.models.task import Task, task_category
+from app.models.task_id_node import TaskIdNode
+from app.utils.sharding import get_shard_router, shard_metadata
+
+shards_cli = AppGroup('shards', help='Gestión de los shards de tareas.')
+
+
+def _router_or_fail():
+    """Obtener el enrutador de shards o abortar el comando si el sharding está desactivado."""
+    router = get_shard_router()
+    if router is None:
+        raise click.ClickException('Sharding is disabled: set DB_TASK_SHARD_URIS')
+    return router
+
+
+def move_tasks(source, targets, shard_for, batch_size=500):
+    """Mover a su shard correcto las tareas de `source` que no pertenezcan a él.
+
+    Recorre `source` por lotes ordenados por ID. Cada lote se copia primero en el shard
+    de destino (omitiendo las tareas que ya estén allí) y después se borra del origen,
+    cada paso en su propia transacción corta. Si el proceso se interrumpe, puede
+    relanzarse: como mucho quedan copias duplicadas que la siguiente ejecución limpia.
+
+    Args:
+        source (Session): Sesión de la base de datos de origen.
+        targets (List[Session]): Sesiones de los shards de destino, por índice.
+        shard_for (Callable): Función `user_id -> índice de shard`.
+        batch_size (int, opcional): Número máximo de tareas por lote.
+
+    Returns:
+        int: Número de tareas movidas.
+    """
+    tasks = Task.__table__
+    moved = 0
+    last_id = None
+
+    while True:
+        # Siguiente lote del origen
+        stmt = select(tasks).order_by(tasks.c.id).limit(batch_size)
+        if last_id is not None:
+            stmt = stmt.where(tasks.c.id > last_id)
+        rows = source.execute(stmt).mappings().all()
+        if not rows:
+            break
+        last_id = rows[-1]['id']
+
+        # Agrupar por shard de destino las tareas que no pertenecen al origen
+        by_target = {}
+        for row in rows:
+            target = shard_for(row['user_id'])
+            if targets[target] is not source:
+                by_target.setdefault(target, []).append(dict(row))
+
+        for target, task_rows in by_target.items():
+            session = targets[target]
+            task_ids = [row['id'] for row in task_rows]
+            links = source.execute(
+                select(task_category).where(task_category.c.task_id.in_(task_ids))
+            ).mappings().all()
+
+            # Copiar al destino solo las tareas que aún no están allí
+            existing = set(session.execute(
+                select(tasks.c.id).where(tasks.c.id.in_(task_ids))
+            ).scalars())
+            new_rows = [row for row in task_rows if row['id'] not in existing]
+            new_links = [dict(link) for link in links if link['task_id'] not in existing]
+            if new_rows:
+                session.execute(tasks.insert(), new_rows)
+            if new_links:
+                session.execute(task_category.insert(), new_links)
+            session.commit()
+
+            # Con la copia confirmada, borrar del origen
+            source.execute(task_category.delete().where(task_category.c.task_id.in_(task_ids)))
+            source.execute(tasks.delete().where(tasks.c.id.in_(task_ids)))
+            source.commit()
+
+            moved += len(task_ids)
+            click.echo(f'Moved {moved} tasks')
+
+    return moved
+
+
+@shards_cli.command('init')
+def init_shards_command():
+    """Crear las tablas de tareas en todos los shards y la de nodos de IDs en la base principal."""
+    router = _router_or_fail()
+    TaskIdNode.__table__.create(db.engine, checkfirst=True)
+    click.echo('Primary: task ID node table created')
+    metadata = shard_metadata(Task.__table__, task_category)
+    for shard_id in range(router.shard_count):
+        metadata.create_all(router.engine(shard_id))
+        click.echo(f'Shard {shard_id}: tables created')
+
+
+@shards_cli.command('rebalance')
+@click.option('--from-primary', is_flag=True, help='Rellenar los shards con las tareas de la base de datos principal.')
+@click.option('--source-uri', 'source_uris', multiple=True, help='URI de un shard antiguo que se quiere vaciar.')
+@click.option('--batch-size', type=int, default=500, help='Tareas movidas por transacción.')
+def rebalance_shards_command(from_primary, source_uris, batch_size):
+    """Mover cada tarea al shard que le corresponde según la configuración actual.
+
+    Tras cambiar DB_TASK_SHARD_URIS, redistribuye las tareas entre los shards configurados
+    y vacía los shards retirados indicados con --source-uri. Con --from-primary hace el
+    relleno inicial desde las tablas de la base de datos principal.
+    """
+    router = _router_or_fail()
+    targets = router.sessions()
+
+    if from_primary:
+        moved = move_tasks(db.session, targets, router.shard_for, batch_size)
+        click.echo(f'Primary: {moved} tasks moved to shards')
+
+    # Vaciar los shards retirados que ya no forman parte de la configuración
+    for uri in source_uris:
+        engine = create_engine(uri)
+        with Session(bind=engine) as source:
+            moved = move_tasks(source, targets, router.shard_for, batch_size)
+        engine.dispose()
+        click.echo(f'{uri}: {moved} tasks moved')
+
+    for shard_id, source in enumerate(targets):
+        moved = move_tasks(source, targets, router.shard_for, batch_size)
+        click.echo(f'Shard {shard_id}: {moved} tasks moved')
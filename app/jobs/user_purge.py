@@ -0,0 +1,240 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import select, delete, insert, update, or_
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.user import User
+from app.models.user_purge import UserPurge
+from app.models.task import Task, task_category
+from app.utils.sharding import task_session
+
+logger = logging.getLogger(__name__)
+
+# Un único hilo de trabajo: los purgados se ejecutan uno detrás de otro sin competir por bloqueos.
+# Se crea bajo demanda en cada proceso: un pool heredado por fork no tiene hilos en el hijo
+_executor_lock = threading.Lock()
+_executor_state = {'pid': None, 'executor': None}
+
+# Un purgado 'running' sin avances durante este tiempo se da por abandonado (proceso caído)
+_STALE_AFTER = timedelta(minutes=5)
+
+
+def _get_executor():
+    """Obtener el pool de hilos de los purgados de este proceso, creándolo si no existe."""
+    with _executor_lock:
+        if _executor_state['pid'] != os.getpid():
+            _executor_state.update(
+                pid=os.getpid(), executor=ThreadPoolExecutor(max_workers=1, thread_name_prefix='user-purge')
+            )
+        return _executor_state['executor']
+
+
+def reset_purge_executor():
+    """Olvidar el pool de hilos heredado tras un fork; el siguiente purgado crea uno nuevo."""
+    global _executor_lock
+    _executor_lock = threading.Lock()
+    _executor_state.update(pid=None, executor=None)
+
+
+def _report(user_id, **fields):
+    """Guardar el progreso del purgado de un usuario; también sirve de latido."""
+    db.session.execute(
+        update(UserPurge).where(UserPurge.user_id == user_id).values(updated_at=datetime.utcnow(), **fields)
+    )
+    db.session.commit()
+
+
+def get_purge_status(user_id):
+    """Obtener el progreso del purgado de un usuario.
+
+    El estado se guarda en la tabla `user_purges`, así que cualquier worker puede
+    consultarlo, también después de un reinicio.
+
+    Args:
+        user_id (int): El ID del usuario.
+
+    Returns:
+        dict: Estado (`queued`, `running`, `completed`, `failed`) y número de tareas
+        eliminadas, o None si el usuario nunca se ha borrado.
+    """
+    purge = db.session.get(UserPurge, user_id)
+    if purge is None:
+        return None
+    return {'user_id': purge.user_id, 'status': purge.status, 'deleted_tasks': purge.deleted_tasks}
+
+
+def queue_user_purge(user_id):
+    """Registrar el purgado pendiente de un usuario en la transacción actual, sin confirmarla.
+
+    Se llama en la misma transacción que el borrado lógico, de modo que ningún usuario
+    borrado queda sin su purgado registrado.
+
+    Args:
+        user_id (int): El ID del usuario borrado.
+    """
+    db.session.merge(UserPurge(user_id=user_id, status='queued', deleted_tasks=0, updated_at=datetime.utcnow()))
+
+
+def claim_user_purge(user_id):
+    """Reclamar el purgado de un usuario para ejecutarlo en este proceso.
+
+    Solo un proceso puede tener un purgado en marcha; un purgado 'running' que lleva
+    `_STALE_AFTER` sin avanzar se considera abandonado y se puede reclamar de nuevo.
+
+    Args:
+        user_id (int): El ID del usuario borrado.
+
+    Returns:
+        bool: True si este proceso debe ejecutar el purgado.
+    """
+    now = datetime.utcnow()
+    claimed = db.session.execute(
+        update(UserPurge)
+        .where(
+            UserPurge.user_id == user_id,
+            or_(UserPurge.status != 'running', UserPurge.updated_at < now - _STALE_AFTER),
+        )
+        .values(status='running', updated_at=now)
+    ).rowcount
+    if not claimed:
+        if db.session.get(UserPurge, user_id) is not None:
+            db.session.rollback()  # Otro proceso lo está ejecutando
+            return False
+        # Usuario borrado antes de que existiera la tabla de purgados
+        try:
+            db.session.execute(insert(UserPurge).values(user_id=user_id, status='running', deleted_tasks=0, updated_at=now))
+        except IntegrityError:
+            db.session.rollback()
+            return False
+    db.session.commit()
+    return True
+
+
+def purge_user(user_id, batch_size=500):
+    """Eliminar por lotes las tareas de un usuario borrado y, al final, el propio usuario.
+
+    Cada lote borra las filas de `task_category` y de `tasks` de hasta `batch_size`
+    tareas en su propia transacción, de modo que nunca se retienen bloqueos durante
+    mucho tiempo. Es idempotente: si se interrumpe, puede relanzarse sin problemas.
+    El purgado debe haberse reclamado antes con `claim_user_purge`.
+
+    Args:
+        user_id (int): El ID del usuario a purgar.
+        batch_size (int, opcional): Número máximo de tareas por transacción.
+
+    Returns:
+        int: Número de tareas eliminadas en esta ejecución.
+    """
+    deleted_tasks = 0
+
+    # Las tareas del usuario viven en su shard (o en la base global sin sharding)
+    session = task_session(user_id)
+
+    while True:
+        # Seleccionar el siguiente lote de tareas del usuario
+        task_ids = session.execute(
+            select(Task.id).where(Task.user_id == user_id).order_by(Task.id).limit(batch_size)
+        ).scalars().all()
+        if not task_ids:
+            break
+
+        # Borrar primero las asociaciones y después las tareas, en una transacción corta
+        session.execute(task_category.delete().where(task_category.c.task_id.in_(task_ids)))
+        session.execute(
+            delete(Task).where(Task.id.in_(task_ids)).execution_options(synchronize_session=False)
+        )
+        session.commit()
+
+        deleted_tasks += len(task_ids)
+        _report(user_id, deleted_tasks=UserPurge.deleted_tasks + len(task_ids))
+        logger.info('Purged %d tasks of user %d', deleted_tasks, user_id)
+
+    # Sin tareas pendientes, eliminar definitivamente al usuario marcado como borrado
+    db.session.execute(
+        delete(User)
+        .where(User.id == user_id, User.deleted_at.isnot(None))
+        .execution_options(synchronize_session=False)
+    )
+    _report(user_id, status='completed')  # En la misma transacción que el borrado del usuario
+
+    return deleted_tasks
+
+
+def _run_purge(app, user_id):
+    """Ejecutar el purgado de un usuario dentro de un contexto de aplicación propio."""
+    with app.app_context():
+        try:
+            if claim_user_purge(user_id):
+                purge_user(user_id, app.config['USER_PURGE_BATCH_SIZE'])
+        except Exception:
+            db.session.rollback()
+            _report(user_id, status='failed')
+            logger.exception('Purge of user %d failed', user_id)
+
+
+def enqueue_user_purge(user_id):
+    """Programar el purgado de un usuario borrado.
+
+    Con `USER_PURGE_ASYNC` activado el trabajo se ejecuta en un hilo en segundo plano;
+    en caso contrario, se ejecuta de inmediato en el hilo actual.
+
+    Args:
+        user_id (int): El ID del usuario a purgar.
+    """
+    app = current_app._get_current_object()
+
+    if app.config['USER_PURGE_ASYNC']:
+        _get_executor().submit(_run_purge, app, user_id)
+    else:
+        _run_purge(app, user_id)
+
+
+def resume_user_purges(app):
+    """Reanudar en segundo plano los purgados pendientes, por ejemplo al arrancar un worker.
+
+    Si varios procesos los reanudan a la vez, cada purgado lo ejecuta solo el que lo reclama.
+
+    Args:
+        app (Flask): La aplicación Flask.
+
+    Returns:
+        int: Número de purgados programados.
+    """
+    with app.app_context():
+        user_ids = db.session.execute(
+            select(User.id).where(User.deleted_at.isnot(None))
+        ).scalars().all()
+        db.session.commit()
+    for user_id in user_ids:
+        _get_executor().submit(_run_purge, app, user_id)
+    return len(user_ids)
+
+
+@click.command('purge-deleted-users')
+@click.option('--batch-size', type=int, default=None, help='Tareas eliminadas por transacción.')
+@with_appcontext
+def purge_deleted_users_command(batch_size):
+    """Purgar todos los usuarios marcados como borrados (por ejemplo, tras un reinicio)."""
+    batch_size = batch_size or current_app.config['USER_PURGE_BATCH_SIZE']
+    user_ids = db.session.execute(
+        select(User.id).where(User.deleted_at.isnot(None))
+    ).scalars().all()
+
+    for user_id in user_ids:
+        if not claim_user_purge(user_id):
+            click.echo(f'User {user_id}: purge already running in another process')
+            continue
+        try:
+            deleted_tasks = purge_user(user_id, batch_size)
+        except Exception:
+            db.session.rollback()
+            _report(user_id, status='failed')
+            raise
+        click.echo(f'User {user_id}: {deleted_tasks} tasks purged')
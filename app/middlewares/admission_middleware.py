@@ -0,0 +1,244 @@
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request
+
+
+class TokenBucket:
+    """
+    Cubeta de tokens para limitar la tasa de peticiones de una clave (cliente o cuenta).
+
+    Atributos:
+        rate (float): Tokens que se reponen por segundo.
+        capacity (float): Número máximo de tokens acumulables (ráfaga permitida).
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self):
+        """
+        Intenta consumir un token.
+
+        Returns:
+            float: 0 si se consumió el token; en caso contrario, los segundos que faltan para el siguiente.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """
+    Control de admisión para endpoints costosos en CPU (hash de contraseñas).
+
+    Combina una cubeta de tokens por cliente y otra por cuenta con un límite global de
+    ejecuciones concurrentes y una cola corta y acotada. Así, una ráfaga de intentos de
+    login no ocupa todos los hilos del proceso y el resto de endpoints conserva su latencia.
+
+    Atributos:
+        max_concurrency (int): Número máximo de peticiones admitidas ejecutándose a la vez.
+        queue_size (int): Número máximo de peticiones esperando un hueco.
+        queue_timeout (float): Segundos máximos de espera en la cola.
+    """
+
+    def __init__(self, client_rate, client_burst, account_rate, account_burst,
+                 max_concurrency, queue_size, queue_timeout, max_tracked_keys=10000):
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.account_rate = account_rate
+        self.account_burst = account_burst
+        self.max_concurrency = max_concurrency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.max_tracked_keys = max_tracked_keys
+
+        # Cubetas por clave con desalojo LRU para acotar la memoria ante muchas IPs distintas
+        self._client_buckets = OrderedDict()
+        self._account_buckets = OrderedDict()
+        self._buckets_lock = threading.Lock()
+
+        # Estado del límite de concurrencia
+        self._slots = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+
+        # Estado del límite de concurrencia en modo asíncrono (un único bucle de eventos)
+        self._async_slots = None
+        self._async_waiting = 0
+
+    def _take(self, buckets, key, rate, burst):
+        """Consumir un token de la cubeta de `key`, creándola si no existe."""
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = TokenBucket(rate, burst)
+            if len(buckets) > self.max_tracked_keys:
+                buckets.popitem(last=False)
+        else:
+            buckets.move_to_end(key)
+        return bucket.take()
+
+    def check_rate(self, client_key, account_key=None):
+        """
+        Aplica los límites de tasa por cliente y por cuenta.
+
+        Args:
+            client_key (str): Identificador del cliente (dirección IP).
+            account_key (str, opcional): Identificador de la cuenta objetivo.
+
+        Returns:
+            float: 0 si la petición puede continuar; en caso contrario, segundos a esperar.
+        """
+        with self._buckets_lock:
+            retry_after = self._take(self._client_buckets, client_key, self.client_rate, self.client_burst)
+            if not retry_after and account_key:
+                retry_after = self._take(self._account_buckets, account_key, self.account_rate, self.account_burst)
+        return retry_after
+
+    def acquire(self):
+        """
+        Reserva un hueco de ejecución, esperando en la cola como mucho `queue_timeout` segundos.
+
+        Returns:
+            bool: True si se obtuvo el hueco; False si la cola está llena o se agotó la espera.
+        """
+        with self._slots:
+            if self._active < self.max_concurrency:
+                self._active += 1
+                return True
+
+            # Rechazar de inmediato si la cola ya está llena
+            if self._waiting >= self.queue_size:
+                return False
+
+            self._waiting += 1
+            try:
+                admitted = self._slots.wait_for(lambda: self._active < self.max_concurrency, self.queue_timeout)
+                if admitted:
+                    self._active += 1
+                return admitted
+            finally:
+                self._waiting -= 1
+
+    def release(self):
+        """Libera un hueco de ejecución y despierta a la siguiente petición en cola."""
+        with self._slots:
+            self._active -= 1
+            self._slots.notify()
+
+    async def acquire_async(self):
+        """
+        Versión de `acquire` para el modo asíncrono: la espera en cola no ocupa ningún hilo.
+
+        Returns:
+            bool: True si se obtuvo el hueco; False si la cola está llena o se agotó la espera.
+        """
+        if self._async_slots is None:
+            self._async_slots = asyncio.Semaphore(self.max_concurrency)
+        if not self._async_slots.locked():
+            await self._async_slots.acquire()
+            return True
+
+        # Rechazar de inmediato si la cola ya está llena
+        if self._async_waiting >= self.queue_size:
+            return False
+
+        self._async_waiting += 1
+        try:
+            await asyncio.wait_for(self._async_slots.acquire(), self.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._async_waiting -= 1
+
+    def release_async(self):
+        """Libera un hueco obtenido con `acquire_async`."""
+        self._async_slots.release()
+
+
+def get_admission_controller():
+    """
+    Obtiene el controlador de admisión de la aplicación actual, creándolo a partir de la configuración.
+
+    Returns:
+        AdmissionController: El controlador compartido por todos los hilos del proceso.
+    """
+    controller = current_app.extensions.get('auth_admission')
+    if controller is None:
+        config = current_app.config
+
+        # Las peticiones admitidas y las que esperan en cola ocupan un hilo del worker cada una:
+        # se limitan a un hilo menos que el worker para que el resto de endpoints siga atendido
+        spare_threads = max(1, config['WORKER_THREADS'] - 1)
+        max_concurrency = max(1, min(config['AUTH_MAX_CONCURRENCY'], spare_threads))
+        queue_size = max(0, min(config['AUTH_QUEUE_SIZE'], spare_threads - max_concurrency))
+
+        controller = current_app.extensions.setdefault('auth_admission', AdmissionController(
+            client_rate=config['AUTH_CLIENT_RATE'],
+            client_burst=config['AUTH_CLIENT_BURST'],
+            account_rate=config['AUTH_ACCOUNT_RATE'],
+            account_burst=config['AUTH_ACCOUNT_BURST'],
+            max_concurrency=max_concurrency,
+            queue_size=queue_size,
+            queue_timeout=config['AUTH_QUEUE_TIMEOUT'],
+        ))
+    return controller
+
+
+def admission_controlled(account_field=None):
+    """
+    Middleware que aplica control de admisión a un endpoint costoso.
+
+    Debe colocarse por encima de `marshal_with` para que las respuestas 429/503 no se serialicen
+    con el modelo del endpoint.
+
+    Args:
+        account_field (str, opcional): Campo del cuerpo JSON que identifica la cuenta (p. ej. 'email').
+
+    Returns:
+        Función decoradora que responde 429 si se supera la tasa permitida y 503 si no hay
+        capacidad, ambas con el encabezado `Retry-After`.
+    """
+
+    def decorator(func):
+        @wraps(func)  # Mantiene el nombre y la docstring original de la función decorada
+        def wrapper(*args, **kwargs):
+            controller = get_admission_controller()
+
+            # Identificar al cliente y a la cuenta objetivo de la petición
+            client_key = request.remote_addr or 'unknown'
+            account_key = None
+            if account_field:
+                data = request.get_json(silent=True) or {}
+                account_key = str(data.get(account_field) or '').strip().lower() or None
+
+            # Límite de tasa: demasiados intentos del mismo cliente o contra la misma cuenta
+            retry_after = controller.check_rate(client_key, account_key)
+            if retry_after:
+                return {'message': 'Too many requests'}, 429, {'Retry-After': str(math.ceil(retry_after))}
+
+            # Límite de concurrencia: sin hueco libre en un tiempo razonable se descarta la carga
+            if not controller.acquire():
+                return {'message': 'Service overloaded, try again later'}, 503, {
+                    'Retry-After': str(max(1, math.ceil(controller.queue_timeout)))
+                }
+
+            try:
+                return func(*args, **kwargs)
+            finally:
+                controller.release()
+
+        return wrapper  # Retorna la función decorada con el control de admisión
+    return decorator  # Retorna el decorador
@@ -1,6 +1,7 @@
 from flask_jwt_extended import get_jwt_identity
 from functools import wraps
 from flask import jsonify
+from flask_restx import abort
 from app.services.user_service import UserService
 
 def role_required(required_role):
@@ -34,3 +35,25 @@ def role_required(required_role):
         return wrapper  # Retorna la función decorada con las verificaciones de rol
     return decorator  # Retorna el decorador
 
+
+
+def admin_required(func):
+    """
+    Middleware que restringe el endpoint a los administradores (`User.is_admin`).
+
+    Debe aplicarse debajo de `@jwt_required()`, que valida el token y deja disponible su
+    identidad (el ID del usuario). Los usuarios borrados o inexistentes se tratan como no
+    administradores (ver `UserService.is_admin`).
+
+    Returns:
+        Función decorada que responde 403 si el usuario no es administrador.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not UserService.is_admin(get_jwt_identity()):
+            # Dentro de un recurso de Flask-RESTX la respuesta de error se genera con abort
+            abort(403, "Permiso denegado: solo los administradores pueden gestionar categorías.")
+
+        return func(*args, **kwargs)
+
+    return wrapper
@@ -9,6 +9,7 @@ class Category(db.Model):
     Atributos:
         id (int): Identificador único de la categoría (clave primaria).
         name (str): Nombre de la categoría, debe ser único y no nulo.
+        version (int): Versión de la fila, se incrementa en cada actualización.
     """
     
     __tablename__ = 'categories'  # Nombre de la tabla en la base de datos
@@ -16,6 +17,10 @@ class Category(db.Model):
     # Definición de columnas de la tabla
     id = db.Column(db.Integer, primary_key=True)  # Clave primaria de la tabla
     name = db.Column(db.String(100), unique=True, nullable=False)  # Nombre de la categoría, debe ser único y no nulo
+    version = db.Column(db.Integer, nullable=False, default=1)  # Versión de la fila para el control de concurrencia optimista
+
+    # Activar la columna de versión en el mapeador de SQLAlchemy
+    __mapper_args__ = {'version_id_col': version}
 
     def __init__(self, name):
         """
@@ -0,0 +1,28 @@
+from datetime import datetime
+from app import db
+
+
+class SweepWatermark(db.Model):
+    """
+    Posición persistida de un barrido incremental (por ejemplo, el de tareas vencidas).
+
+    Guarda la clave `(due_date, id)` de la última fila procesada de cada partición del
+    barrido, de modo que la siguiente ejecución continúa desde ahí en lugar de recorrer
+    toda la tabla. Vive en la base de datos principal aunque las tareas estén en shards.
+    """
+    __tablename__ = 'sweep_watermarks'  # Nombre de la tabla en la base de datos
+
+    # Definición de columnas de la tabla
+    name = db.Column(db.String(100), primary_key=True)  # Partición del barrido, p. ej. 'overdue:0:pending'
+    position = db.Column(db.DateTime, nullable=False)  # Fecha límite de la última fila procesada
+    last_id = db.Column(db.BigInteger, nullable=False)  # ID de la última fila procesada (desempate)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # Última vez que avanzó
+
+    def __repr__(self):
+        """
+        Representación en formato string del objeto SweepWatermark.
+
+        Returns:
+            str: Representación de la marca de agua.
+        """
+        return f'<SweepWatermark {self.name} {self.position} {self.last_id}>'
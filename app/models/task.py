@@ -1,9 +1,12 @@
 from datetime import datetime  # Import necesario para la fecha
 from app import db
 
+# IDs de 64 bits para admitir los IDs generados con sharding (SQLite solo autoincrementa INTEGER)
+TaskId = db.BigInteger().with_variant(db.Integer, 'sqlite')
+
 # Tabla intermedia para la relación de muchos a muchos entre Tareas y Categorías
 task_category = db.Table('task_category',
-    db.Column('task_id', db.Integer, db.ForeignKey('tasks.id'), primary_key=True),  # Referencia a la tabla 'tasks'
+    db.Column('task_id', TaskId, db.ForeignKey('tasks.id'), primary_key=True),  # Referencia a la tabla 'tasks'
     db.Column('category_id', db.Integer, db.ForeignKey('categories.id'), primary_key=True)  # Referencia a la tabla 'categories'
 )
 
@@ -11,13 +14,21 @@ class Task(db.Model):
     __tablename__ = 'tasks'  # Nombre de la tabla en la base de datos
 
     # Definición de columnas de la tabla
-    id = db.Column(db.Integer, primary_key=True)  # Clave primaria de la tabla
+    id = db.Column(TaskId, primary_key=True)  # Clave primaria de la tabla
     title = db.Column(db.String(120), nullable=False)  # Título de la tarea, no puede ser nulo
     description = db.Column(db.String(255), nullable=True)  # Descripción de la tarea, es opcional
     status = db.Column(db.String(50), nullable=False, default='pending')  # Estado de la tarea (pending, completed)
     due_date = db.Column(db.DateTime, nullable=True)  # Fecha límite para completar la tarea
     created_at = db.Column(db.DateTime, default=datetime.utcnow)  # Fecha de creación de la tarea
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)  # ID del usuario que creó la tarea
+    version = db.Column(db.Integer, nullable=False, default=1)  # Versión de la fila para el control de concurrencia optimista
+    overdue_at = db.Column(db.DateTime, nullable=True)  # Momento en que el barrido de vencidas la marcó como vencida
+
+    # Índice recorrido por el barrido incremental de tareas vencidas (ver app.jobs.overdue_sweep)
+    __table_args__ = (db.Index('ix_tasks_status_due_date', 'status', 'due_date'),)
+
+    # SQLAlchemy incluye la versión en el WHERE de cada UPDATE del ORM y la incrementa
+    __mapper_args__ = {'version_id_col': version}
 
     # Relación muchos a muchos con categorías usando la tabla intermedia 'task_category'
     categories = db.relationship('Category', 
@@ -0,0 +1,27 @@
+from app import db
+
+
+class TaskIdNode(db.Model):
+    """
+    Arrendamiento de un identificador de nodo del generador de IDs de tareas.
+
+    Con sharding cada proceso genera los IDs de sus tareas sin consultar ninguna base de
+    datos (ver `next_task_id`); para que dos procesos no generen el mismo ID, cada uno
+    reserva aquí un nodo distinto durante `TASK_ID_NODE_LEASE_TTL` segundos y lo renueva
+    mientras sigue vivo. Vive en la base de datos principal, compartida por todos los procesos.
+    """
+    __tablename__ = 'task_id_nodes'  # Nombre de la tabla en la base de datos
+
+    # Definición de columnas de la tabla
+    node = db.Column(db.Integer, primary_key=True, autoincrement=False)  # Nodo de 10 bits (0-1023)
+    holder = db.Column(db.String(120), nullable=False)  # Proceso que lo tiene reservado (host:pid:token)
+    expires_at = db.Column(db.DateTime, nullable=False)  # Fin del arrendamiento si no se renueva
+
+    def __repr__(self):
+        """
+        Representación en formato string del objeto TaskIdNode.
+
+        Returns:
+            str: Representación del arrendamiento.
+        """
+        return f'<TaskIdNode {self.node} {self.holder} {self.expires_at}>'
@@ -10,6 +10,12 @@ class User(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False)  # Correo electrónico único
     password_hash = db.Column(db.String(128), nullable=False)  # Contraseña hasheada
     created_at = db.Column(db.DateTime, default=datetime.utcnow)  # Fecha de creación del usuario
+    is_admin = db.Column(db.Boolean, nullable=False, default=False)  # Administrador: puede crear y modificar categorías
+    deleted_at = db.Column(db.DateTime, nullable=True, index=True)  # Fecha de borrado lógico; el purgado se hace en segundo plano
+    version = db.Column(db.Integer, nullable=False, default=1)  # Versión de la fila para el control de concurrencia optimista
+
+    # Control de versión gestionado por el ORM en las actualizaciones
+    __mapper_args__ = {'version_id_col': version}
 
     # Relación uno a muchos: Un usuario puede tener muchas tareas
     tasks = db.relationship('Task', backref='user', lazy=True)  # Relación con la tabla 'tasks'
@@ -0,0 +1,28 @@
+from datetime import datetime
+from app import db
+
+
+class UserPurge(db.Model):
+    """
+    Estado persistido del purgado de un usuario borrado (ver app.jobs.user_purge).
+
+    Se guarda en su propia tabla porque la fila del usuario se elimina al terminar el
+    purgado; así el progreso se puede consultar desde cualquier worker y los purgados
+    pendientes se reanudan tras un reinicio.
+    """
+    __tablename__ = 'user_purges'  # Nombre de la tabla en la base de datos
+
+    # Definición de columnas de la tabla
+    user_id = db.Column(db.Integer, primary_key=True)  # ID del usuario borrado (sin clave foránea: la fila se elimina)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, completed, failed
+    deleted_tasks = db.Column(db.Integer, nullable=False, default=0)  # Tareas eliminadas hasta ahora
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # Último avance (latido)
+
+    def __repr__(self):
+        """
+        Representación en formato string del objeto UserPurge.
+
+        Returns:
+            str: Representación del purgado.
+        """
+        return f'<UserPurge {self.user_id} {self.status} {self.deleted_tasks}>'
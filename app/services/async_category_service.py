@@ -0,0 +1,18 @@
+from sqlalchemy import select
+from app.models.category import Category
+
+class AsyncCategoryService:
+    """Versión asíncrona de las operaciones de lectura de `CategoryService`."""
+
+    @staticmethod
+    async def get_all_categories(session):
+        """Obtener todas las categorías disponibles en la base de datos.
+        
+        Args:
+            session (AsyncSession): Sesión asíncrona de base de datos.
+
+        Returns:
+            List[Category]: Una lista de todas las categorías.
+        """
+        result = await session.execute(select(Category))
+        return result.scalars().all()
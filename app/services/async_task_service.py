@@ -0,0 +1,32 @@
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from app.models.task import Task
+from app.models.user import User
+
+class AsyncTaskService:
+    """Versión asíncrona de las operaciones de lectura de `TaskService`."""
+
+    @staticmethod
+    async def get_all_tasks(session, after_id=None, limit=None):
+        """Obtener todas las tareas existentes.
+        
+        Args:
+            session (AsyncSession): Sesión asíncrona de base de datos.
+            after_id (int, opcional): Devolver solo las tareas con ID mayor que este cursor.
+            limit (int, opcional): Número máximo de tareas a devolver.
+
+        Returns:
+            List[Task]: Lista de tareas ordenadas por ID, con sus categorías ya cargadas.
+        """
+        # Las categorías se cargan en una segunda consulta: en asyncio no hay carga perezosa
+        stmt = select(Task).options(selectinload(Task.categories)).order_by(Task.id)
+        if after_id is not None:
+            stmt = stmt.where(Task.id > after_id)
+
+        # Las tareas de los usuarios borrados (pendientes de purgar) no se devuelven
+        stmt = stmt.where(Task.user_id.notin_(select(User.id).where(User.deleted_at.isnot(None))))
+        if limit:
+            stmt = stmt.limit(limit)
+
+        result = await session.execute(stmt)
+        return result.scalars().all()
@@ -0,0 +1,65 @@
+import asyncio
+from sqlalchemy import select
+from app.models.user import User
+from werkzeug.security import check_password_hash
+
+class AsyncUserService:
+    """Versión asíncrona de las operaciones de lectura de `UserService`."""
+
+    @staticmethod
+    async def get_user_by_id(session, user_id):
+        """Obtener un usuario por su ID.
+        
+        Args:
+            session (AsyncSession): Sesión asíncrona de base de datos.
+            user_id (int): El ID del usuario a buscar.
+
+        Returns:
+            User: El usuario encontrado.
+
+        Raises:
+            ValueError: Si el usuario no se encuentra.
+        """
+        # Buscar el usuario por su ID, ignorando los usuarios borrados
+        result = await session.execute(
+            select(User).where(User.id == user_id, User.deleted_at.is_(None))
+        )
+        user = result.scalar_one_or_none()
+        
+        # Si no se encuentra el usuario, lanzar un error
+        if not user:
+            raise ValueError('User not found')
+        
+        return user
+
+    @staticmethod
+    async def authenticate_user(session, username, password, executor):
+        """Autenticar un usuario con su nombre de usuario y contraseña.
+
+        La verificación del hash consume mucha CPU, así que se ejecuta en `executor`
+        para no bloquear el bucle de eventos mientras se atienden otras peticiones.
+        
+        Args:
+            session (AsyncSession): Sesión asíncrona de base de datos.
+            username (str): Nombre de usuario.
+            password (str): Contraseña proporcionada para la autenticación.
+            executor (Executor): Pool de hilos dedicado al hash de contraseñas.
+
+        Returns:
+            User: El usuario autenticado si las credenciales son correctas.
+
+        Raises:
+            ValueError: Si el usuario no se encuentra o la contraseña es incorrecta.
+        """
+        # Buscar el usuario por su nombre de usuario, ignorando los usuarios borrados
+        result = await session.execute(
+            select(User).where(User.username == username, User.deleted_at.is_(None))
+        )
+        user = result.scalar_one_or_none()
+
+        # Verificar la contraseña fuera del bucle de eventos
+        loop = asyncio.get_running_loop()
+        if not user or not await loop.run_in_executor(executor, check_password_hash, user.password_hash, password):
+            raise ValueError('Invalid username or password')
+        
+        return user
@@ -1,10 +1,16 @@
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from app import db
 from app.models.category import Category
+from app.utils.versioning import versioned_update
+from app.utils.replicas import read_only
+from app.utils.query_budget import query_budget
 
 class CategoryService:
     """Servicio que gestiona las operaciones CRUD para las categorías"""
 
     @staticmethod
+    @query_budget(1)
     def create_category(name):
         """Crear una nueva categoría en la base de datos.
         
@@ -17,22 +23,95 @@ class CategoryService:
         Raises:
             ValueError: Si la categoría ya existe.
         """
-        # Verificar si la categoría con el mismo nombre ya existe
-        category = Category.query.filter_by(name=name).first()
-        if category:
-            # Si ya existe una categoría con el mismo nombre, se lanza una excepción
-            raise ValueError("Category already exists")
-        
-        # Si no existe, crear una nueva instancia de Category
+        # Crear una nueva instancia de Category y guardarla directamente: la restricción
+        # UNIQUE de la columna `name` detecta los duplicados sin un SELECT previo
         new_category = Category(name=name)
-        
-        # Guardar la nueva categoría en la base de datos
         db.session.add(new_category)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Si ya existe una categoría con el mismo nombre, se lanza una excepción
+            db.session.rollback()
+            raise ValueError("Category already exists")
         
         return new_category
 
     @staticmethod
+    @query_budget(2)
+    def get_or_create_categories(names, commit=True):
+        """Obtener o crear en bloque categorías a partir de sus nombres.
+
+        Inserta los nombres que falten con un upsert nativo del dialecto
+        (``INSERT ... ON DUPLICATE KEY UPDATE`` en MySQL, ``INSERT ... ON CONFLICT DO NOTHING``
+        en PostgreSQL y SQLite) y después lee todos los IDs con un único SELECT, de modo
+        que la operación es segura ante creaciones concurrentes del mismo nombre.
+
+        Args:
+            names (List[str]): Nombres de las categorías deseadas.
+            commit (bool, opcional): Si es False, el upsert se deja dentro de la transacción
+                del llamador para que la confirme junto con sus propios cambios.
+
+        Returns:
+            Dict[str, int]: Diccionario que relaciona cada nombre con el ID de su categoría.
+        """
+        # Eliminar duplicados y nombres vacíos conservando el orden original
+        names = list(dict.fromkeys(name.strip() for name in names if name and name.strip()))
+        if not names:
+            return {}
+
+        rows = [{'name': name} for name in names]
+        dialect = db.session.get_bind(mapper=Category).dialect.name
+
+        # Construir la sentencia de upsert adecuada para el motor de base de datos; el módulo
+        # del dialecto en uso ya está cargado por el motor, así que importarlo aquí no cuesta
+        # nada y evita cargar los del resto de motores al arrancar
+        if dialect in ('mysql', 'mariadb'):
+            from sqlalchemy.dialects.mysql import insert
+            stmt = insert(Category).values(rows)
+            stmt = stmt.on_duplicate_key_update(name=stmt.inserted.name)
+        elif dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+            stmt = insert(Category).values(rows).on_conflict_do_nothing(index_elements=['name'])
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+            stmt = insert(Category).values(rows).on_conflict_do_nothing(index_elements=['name'])
+        else:
+            raise ValueError(f'Upsert not supported for dialect {dialect}')
+
+        db.session.execute(stmt)
+
+        # Leer los IDs de todas las categorías solicitadas, existentes o recién creadas
+        result = db.session.execute(
+            select(Category.name, Category.id).where(Category.name.in_(names))
+        )
+        ids_by_name = {name: category_id for name, category_id in result}
+        if commit:
+            db.session.commit()
+
+        return ids_by_name
+
+    @staticmethod
+    @query_budget(1)
+    def get_category_ids_by_names(names):
+        """Obtener los IDs de las categorías existentes con los nombres indicados.
+
+        Args:
+            names (List[str]): Nombres de las categorías a buscar.
+
+        Returns:
+            Dict[str, int]: Diccionario nombre -> ID; los nombres inexistentes se omiten.
+        """
+        if not names:
+            return {}
+
+        # Una sola consulta para todos los nombres
+        result = db.session.execute(
+            select(Category.name, Category.id).where(Category.name.in_(set(names)))
+        )
+        return {name: category_id for name, category_id in result}
+
+    @staticmethod
+    @query_budget(2)
     def update_category(category_id, name):
         """Actualizar una categoría existente en la base de datos.
         
@@ -60,6 +139,36 @@ class CategoryService:
         
         return category
 
+    @staticmethod
+    @query_budget(2)  # Sin UPDATE ... RETURNING (MySQL) la fila se relee con un SELECT
+    def patch_category(category_id, changes, expected_version=None, fetch=True):
+        """Actualizar parcialmente una categoría con una única sentencia UPDATE.
+
+        Args:
+            category_id (int): El ID de la categoría a actualizar.
+            changes (dict): Campos a modificar (`name`).
+            expected_version (int, opcional): Versión que debe tener la categoría.
+            fetch (bool, opcional): Si es True, devuelve la categoría actualizada.
+
+        Returns:
+            Category | int | None: La categoría actualizada, o su nueva versión si `fetch` es False.
+
+        Raises:
+            ValueError: Si la categoría no se encuentra o el nombre ya existe.
+            VersionConflictError: Si la versión de la categoría no coincide.
+        """
+        values = {key: changes[key] for key in ('name',) if key in changes}
+
+        try:
+            result = versioned_update(Category, category_id, values, expected_version, fetch)
+            db.session.commit()
+        except IntegrityError:
+            # La restricción UNIQUE de `name` rechaza los nombres duplicados
+            db.session.rollback()
+            raise ValueError('Category already exists')
+
+        return result
+
     @staticmethod
     def delete_category(category_id):
         """Eliminar una categoría existente de la base de datos.
@@ -81,6 +190,8 @@ class CategoryService:
         db.session.commit()
 
     @staticmethod
+    @query_budget(1)
+    @read_only
     def get_all_categories():
         """Obtener todas las categorías disponibles en la base de datos.
         
@@ -1,28 +1,69 @@
+from collections import Counter, defaultdict
+from sqlalchemy import select, delete, exists, true, literal, func
+from sqlalchemy.orm import object_session
+from sqlalchemy.orm.attributes import set_committed_value
 from app import db
-from app.models.task import Task
+from app.models.task import Task, task_category
 from app.models.category import Category
-from datetime import datetime
+from app.models.user import User
+from app.jobs.overdue_sweep import rewind_overdue_watermark
+from app.services.category_service import CategoryService
+from app.utils.versioning import versioned_update
+from app.utils.replicas import read_only
+from app.utils.query_budget import query_budget
+from app.utils.sharding import get_shard_router, task_session, task_sessions, next_task_id, merge_sorted
+from datetime import datetime, timezone
 
 class TaskService:
     """Servicio para manejar las operaciones CRUD y lógicas de las tareas."""
 
     @staticmethod
-    def create_task(title, description, due_date, user_id, category_ids=None):
+    @query_budget(7)
+    def create_task(title, description, due_date, user_id, category_ids=None, category_names=None,
+                    create_categories=False):
         """Crear una nueva tarea con categorías asociadas.
         
         Args:
             title (str): El título de la tarea.
             description (str): La descripción de la tarea.
-            due_date (datetime): Fecha límite para completar la tarea.
+            due_date (str | datetime): Fecha límite para completar la tarea, en formato ISO 8601.
             user_id (int): ID del usuario que crea la tarea.
             category_ids (List[int], opcional): Lista de IDs de categorías a asociar.
+            category_names (List[str], opcional): Nombres de categorías a asociar.
+            create_categories (bool, opcional): Crear en bloque las categorías de `category_names`
+                que no existan (solo administradores); si es False, los nombres desconocidos son
+                un error.
 
         Returns:
             Task: La nueva tarea creada.
 
         Raises:
-            ValueError: Si las categorías especificadas no existen.
+            ValueError: Si el usuario no existe o está borrado, si las categorías especificadas
+                no existen o si la fecha límite no es válida.
         """
+        if due_date is not None:
+            due_date = TaskService._parse_due_date(due_date)
+
+        # Resolver los nombres de categorías a IDs con una sola sentencia, sin búsquedas individuales
+        if category_names:
+            category_ids = list(category_ids or []) + TaskService._resolve_category_names(
+                category_names, create_categories
+            )
+            # Confirmar las categorías creadas antes que la tarea: si algo falla después quedan
+            # categorías sin usar, nunca una tarea sin las categorías que se le pidieron
+            if create_categories:
+                db.session.commit()
+
+        # El token de un usuario borrado sigue siendo válido hasta que caduca: no debe crear
+        # tareas que el purgado ya no va a ver. La fila del usuario queda bloqueada en modo
+        # compartido hasta confirmar la tarea, de modo que un borrado concurrente espera a que
+        # la tarea exista (y la purga) o esta ve al usuario ya borrado
+        owner = db.session.execute(
+            select(User.id).where(User.id == user_id, User.deleted_at.is_(None)).with_for_update(read=True)
+        ).scalar()
+        if owner is None:
+            raise ValueError('User not found')
+
         # Obtener las categorías asociadas filtrando por los IDs proporcionados
         categories = Category.query.filter(Category.id.in_(category_ids)).all() if category_ids else []
 
@@ -34,19 +75,36 @@ class TaskService:
             user_id=user_id
         )
 
-        # Asociar las categorías a la tarea
-        new_task.categories = categories
+        # Con sharding, el ID se genera en la aplicación para que sea único entre shards
+        if get_shard_router() is not None:
+            new_task.id = next_task_id()
 
-        # Agregar la nueva tarea a la sesión de base de datos
-        db.session.add(new_task)
+        # Agregar la nueva tarea a la sesión del shard del usuario
+        session = task_session(user_id)
+        session.add(new_task)
+        session.flush()
+
+        # Asociar las categorías insertando directamente en la tabla intermedia
+        if categories:
+            session.execute(
+                task_category.insert(),
+                [{'task_id': new_task.id, 'category_id': category.id} for category in categories]
+            )
         
-        # Confirmar los cambios y guardar la nueva tarea en la base de datos
+        # Confirmar la tarea y después, en la base global, liberar el bloqueo del propietario
+        sweep_key = TaskService._overdue_sweep_key(new_task)
+        session.commit()
         db.session.commit()
+        TaskService._rewind_overdue_sweep(sweep_key)
+
+        # Las categorías viven en la base de datos global: se adjuntan sin consultar el shard
+        set_committed_value(new_task, 'categories', categories)
         
         return new_task
 
     @staticmethod
-    def update_task(task_id, title=None, description=None, status=None, due_date=None, category_ids=None):
+    @query_budget(10, per_shard=True)
+    def update_task(task_id, title=None, description=None, status=None, due_date=None, category_ids=None, user_id=None):
         """Actualizar los detalles de una tarea existente.
         
         Args:
@@ -56,6 +114,7 @@ class TaskService:
             status (str, opcional): Nuevo estado de la tarea ('pending', 'in-progress', 'completed').
             due_date (datetime, opcional): Nueva fecha límite para la tarea.
             category_ids (List[int], opcional): Lista de nuevos IDs de categorías asociadas.
+            user_id (int, opcional): ID del propietario; con sharding evita buscar en todos los shards.
 
         Returns:
             Task: La tarea actualizada.
@@ -63,12 +122,8 @@ class TaskService:
         Raises:
             ValueError: Si la tarea no se encuentra.
         """
-        # Buscar la tarea por su ID
-        task = Task.query.get(task_id)
-        
-        # Si la tarea no existe, lanzar un error
-        if not task:
-            raise ValueError('Task not found')
+        # Buscar la tarea por su ID (lanza un error si no existe)
+        session, task = TaskService._locate_task(task_id, user_id)
         
         # Si se proporcionó un nuevo título, actualizarlo
         if title:
@@ -82,60 +137,368 @@ class TaskService:
         if status:
             task.status = status
         
-        # Si se proporcionó una nueva fecha límite, actualizarla
+        # Si se proporcionó una nueva fecha límite, actualizarla; la tarea deja de estar vencida
+        # hasta que el barrido vuelva a comprobarla
         if due_date:
-            task.due_date = due_date
+            task.due_date = TaskService._parse_due_date(due_date)
+            task.overdue_at = None
         
-        # Si se proporcionaron nuevas categorías, actualizarlas
+        # Si se proporcionaron nuevas categorías, aplicar solo la diferencia con las actuales
         if category_ids:
-            categories = Category.query.filter(Category.id.in_(category_ids)).all()
-            task.categories = categories
+            TaskService.sync_task_categories(task.id, category_ids, session)
         
         # Confirmar los cambios y actualizar la tarea en la base de datos
-        db.session.commit()
+        sweep_key = TaskService._overdue_sweep_key(task) if status or due_date else None
+        session.commit()
+        TaskService._rewind_overdue_sweep(sweep_key)
+        TaskService._attach_categories(session, [task])
         
         return task
 
     @staticmethod
-    def delete_task(task_id):
+    @query_budget(6, per_shard=True)
+    def patch_task(task_id, changes, expected_version=None, fetch=True, user_id=None):
+        """Actualizar parcialmente una tarea con una única sentencia UPDATE.
+
+        A diferencia de `update_task`, no carga la tarea antes de modificarla y aplica
+        control de concurrencia optimista mediante la columna `version`.
+
+        Args:
+            task_id (int): El ID de la tarea a actualizar.
+            changes (dict): Campos a modificar (`title`, `description`, `status`, `due_date`).
+            expected_version (int, opcional): Versión que debe tener la tarea.
+            fetch (bool, opcional): Si es True, devuelve la tarea actualizada.
+            user_id (int, opcional): ID del propietario; solo se modifica la tarea si le pertenece
+                y, con sharding, evita buscar en todos los shards.
+
+        Returns:
+            Task | int | None: La tarea actualizada, o su nueva versión si `fetch` es False.
+
+        Raises:
+            ValueError: Si la tarea no se encuentra o no pertenece a `user_id`.
+            VersionConflictError: Si la versión de la tarea no coincide.
+        """
+        # Solo se permiten los campos editables de la tarea
+        values = {key: changes[key] for key in ('title', 'description', 'status', 'due_date') if key in changes}
+        if values.get('due_date') is not None:
+            values['due_date'] = TaskService._parse_due_date(values['due_date'])
+
+        # Con una nueva fecha límite la tarea deja de estar vencida hasta el siguiente barrido
+        if 'due_date' in values:
+            values['overdue_at'] = None
+
+        # Con sharding y sin propietario conocido, localizar primero el shard de la tarea
+        if user_id is not None or get_shard_router() is None:
+            session = task_session(user_id)
+        else:
+            session, _ = TaskService._locate_task(task_id)
+
+        # Solo el propietario puede modificar la tarea (las ajenas se tratan como inexistentes),
+        # y las tareas de los usuarios borrados (pendientes de purgar) no se pueden modificar
+        criteria = (Task.user_id == user_id,) if user_id is not None else ()
+        deleted_owners = TaskService._deleted_owner_ids()
+        if deleted_owners:
+            criteria += (Task.user_id.notin_(deleted_owners),)
+
+        # Al cambiar el estado o la fecha límite hace falta la fila para avisar al barrido
+        rewind = 'status' in values or 'due_date' in values
+        result = versioned_update(
+            Task, task_id, values, expected_version, fetch or rewind, session=session, criteria=criteria
+        )
+        sweep_key = TaskService._overdue_sweep_key(result) if rewind else None
+        if rewind and not fetch:
+            result = result.version
+        session.commit()
+        TaskService._rewind_overdue_sweep(sweep_key)
+        if fetch:
+            TaskService._attach_categories(session, [result])
+
+        return result
+
+    @staticmethod
+    def sync_task_categories(task_id, category_ids, session=None):
+        """Sincronizar las categorías de una tarea emitiendo solo los cambios necesarios.
+
+        En lugar de reemplazar la colección ``task.categories`` (lo que obliga a SQLAlchemy
+        a cargarla y reescribir todas sus filas), se calcula la diferencia de conjuntos
+        contra ``task_category`` y se ejecutan únicamente los INSERT y DELETE requeridos.
+        No confirma la transacción.
+
+        Args:
+            task_id (int): El ID de la tarea.
+            category_ids (List[int]): Lista completa de IDs de categorías deseadas.
+            session (Session, opcional): Sesión del shard de la tarea; por defecto `db.session`.
+
+        Returns:
+            Tuple[Set[int], Set[int]]: IDs de categorías agregadas y eliminadas.
+        """
+        session = session or db.session
+
+        # Obtener los IDs de las categorías actualmente asociadas a la tarea
+        current_ids = set(session.execute(
+            select(task_category.c.category_id).where(task_category.c.task_id == task_id)
+        ).scalars())
+        wanted_ids = set(category_ids)
+
+        # Solo se pueden agregar categorías que existan realmente
+        to_add = wanted_ids - current_ids
+        if to_add:
+            to_add = set(db.session.execute(
+                select(Category.id).where(Category.id.in_(to_add))
+            ).scalars())
+        to_remove = current_ids - wanted_ids
+
+        # Eliminar las asociaciones que ya no se desean
+        if to_remove:
+            session.execute(
+                task_category.delete().where(
+                    task_category.c.task_id == task_id,
+                    task_category.c.category_id.in_(to_remove)
+                )
+            )
+
+        # Insertar las nuevas asociaciones en una sola sentencia
+        if to_add:
+            session.execute(
+                task_category.insert(),
+                [{'task_id': task_id, 'category_id': category_id} for category_id in to_add]
+            )
+
+        return to_add, to_remove
+
+    @staticmethod
+    def add_categories_to_tasks(task_ids, category_ids=None, category_names=None, user_id=None,
+                                create_categories=False):
+        """Asociar una o varias categorías a muchas tareas con una sola sentencia.
+
+        Ejecuta un ``INSERT ... SELECT`` sobre el producto de tareas y categorías existentes,
+        omitiendo las asociaciones que ya están presentes.
+
+        Args:
+            task_ids (List[int]): IDs de las tareas a etiquetar.
+            category_ids (List[int], opcional): IDs de las categorías a asociar.
+            category_names (List[str], opcional): Nombres de categorías a asociar.
+            user_id (int, opcional): ID del propietario; solo se etiquetan sus tareas (las ajenas
+                se ignoran) y, con sharding, solo se recorre su shard.
+            create_categories (bool, opcional): Crear en bloque las categorías de `category_names`
+                que no existan (solo administradores); si es False, los nombres desconocidos son
+                un error.
+
+        Returns:
+            int: Número de asociaciones creadas.
+
+        Raises:
+            ValueError: Si alguno de los nombres no corresponde a una categoría y no se pueden crear.
+        """
+        # Sin tareas no hay nada que etiquetar: no crear categorías en una transacción sin confirmar
+        if not task_ids:
+            return 0
+
+        # Resolver los nombres a IDs (creando en bloque las que falten, si está permitido)
+        category_ids = list(category_ids or [])
+        if category_names:
+            category_ids += TaskService._resolve_category_names(category_names, create_categories)
+
+        if not category_ids:
+            return 0
+
+        # Solo las tareas del propietario; las de los usuarios borrados (pendientes de purgar)
+        # no se etiquetan
+        criteria = TaskService._bulk_task_criteria(user_id)
+
+        # Con sharding, las categorías no están en los shards: se valida en la base global
+        # y se inserta con una sentencia por categoría en cada shard
+        if get_shard_router() is not None:
+            return TaskService._add_categories_to_sharded_tasks(task_ids, category_ids, criteria, user_id)
+
+        # Subconsulta que descarta las parejas (tarea, categoría) ya asociadas
+        already_linked = exists().where(
+            task_category.c.task_id == Task.id,
+            task_category.c.category_id == Category.id
+        )
+        # El JOIN incondicional deja explícito el producto cartesiano deseado
+        pairs = select(Task.id, Category.id).join(Category, true()).where(
+            Task.id.in_(task_ids),
+            Category.id.in_(category_ids),
+            ~already_linked,
+            *criteria
+        )
+
+        # Insertar todas las parejas resultantes en una única sentencia
+        result = db.session.execute(
+            task_category.insert().from_select(['task_id', 'category_id'], pairs)
+        )
+        db.session.commit()
+
+        return result.rowcount
+
+    @staticmethod
+    def _add_categories_to_sharded_tasks(task_ids, category_ids, criteria=(), user_id=None):
+        """Variante de `add_categories_to_tasks` para tareas repartidas entre shards."""
+        valid_ids = db.session.execute(
+            select(Category.id).where(Category.id.in_(category_ids))
+        ).scalars().all()
+        db.session.commit()
+
+        affected = 0
+        sessions = [task_session(user_id)] if user_id is not None else task_sessions()
+        for session in sessions:
+            for category_id in valid_ids:
+                already_linked = exists().where(
+                    task_category.c.task_id == Task.id,
+                    task_category.c.category_id == category_id
+                )
+                pairs = select(Task.id, literal(category_id)).where(Task.id.in_(task_ids), ~already_linked, *criteria)
+                affected += session.execute(
+                    task_category.insert().from_select(['task_id', 'category_id'], pairs)
+                ).rowcount
+            session.commit()
+
+        return affected
+
+    @staticmethod
+    def remove_categories_from_tasks(task_ids, category_ids=None, category_names=None, user_id=None):
+        """Desasociar una o varias categorías de muchas tareas con una sola sentencia.
+
+        Args:
+            task_ids (List[int]): IDs de las tareas a desetiquetar.
+            category_ids (List[int], opcional): IDs de las categorías a quitar.
+            category_names (List[str], opcional): Nombres de las categorías a quitar.
+            user_id (int, opcional): ID del propietario; solo se desetiquetan sus tareas (las
+                ajenas se ignoran) y, con sharding, solo se recorre su shard.
+
+        Returns:
+            int: Número de asociaciones eliminadas.
+        """
+        # Resolver los nombres a IDs; los nombres inexistentes no tienen asociaciones
+        category_ids = list(category_ids or [])
+        if category_names:
+            category_ids += CategoryService.get_category_ids_by_names(category_names).values()
+
+        if not task_ids or not category_ids:
+            return 0
+
+        # Solo las tareas del propietario; las de los usuarios borrados (pendientes de purgar)
+        # no se modifican
+        criteria = TaskService._bulk_task_criteria(user_id)
+        if criteria:
+            task_ids = select(Task.id).where(Task.id.in_(task_ids), *criteria)
+
+        # Eliminar todas las asociaciones coincidentes con una única sentencia por shard
+        affected = 0
+        sessions = [task_session(user_id)] if user_id is not None else task_sessions()
+        for session in sessions:
+            affected += session.execute(
+                task_category.delete().where(
+                    task_category.c.task_id.in_(task_ids),
+                    task_category.c.category_id.in_(category_ids)
+                )
+            ).rowcount
+            session.commit()
+
+        return affected
+
+    @staticmethod
+    @query_budget(2, per_shard=True)
+    def delete_task(task_id, user_id=None):
         """Eliminar una tarea existente.
         
         Args:
             task_id (int): El ID de la tarea a eliminar.
+            user_id (int, opcional): ID del propietario; con sharding evita buscar en todos los shards.
 
         Raises:
             ValueError: Si la tarea no se encuentra.
         """
-        # Buscar la tarea por su ID
-        task = Task.query.get(task_id)
+        # Con sharding y sin propietario conocido, probar en cada shard
+        sessions = [task_session(user_id)] if user_id is not None else task_sessions()
+        for session in sessions:
+            # Eliminar sus asociaciones y la tarea sin cargar la tarea ni sus categorías
+            session.execute(task_category.delete().where(task_category.c.task_id == task_id))
+            deleted = session.execute(
+                delete(Task).where(Task.id == task_id).execution_options(synchronize_session=False)
+            ).rowcount
+            
+            # Confirmar los cambios si la tarea estaba en este shard
+            if deleted:
+                session.commit()
+                return
+            session.rollback()
         
         # Si la tarea no existe, lanzar un error
-        if not task:
-            raise ValueError('Task not found')
-        
-        # Eliminar la tarea de la base de datos
-        db.session.delete(task)
-        
-        # Confirmar los cambios
-        db.session.commit()
+        raise ValueError('Task not found')
 
     @staticmethod
-    def get_all_tasks():
+    @query_budget(4, per_shard=True)
+    @read_only
+    def get_all_tasks(after_id=None, limit=None):
         """Obtener todas las tareas existentes.
+
+        Con sharding, consulta cada shard ordenando por ID y mezcla los resultados
+        manteniendo el orden global, de modo que `after_id` funciona como cursor.
         
+        Args:
+            after_id (int, opcional): Devolver solo las tareas con ID mayor que este cursor.
+            limit (int, opcional): Número máximo de tareas a devolver.
+
         Returns:
-            List[Task]: Lista de todas las tareas en la base de datos.
+            List[Task]: Lista de tareas ordenadas por ID.
         """
-        # Devolver todas las tareas almacenadas
-        return Task.query.all()
+        # Las tareas de los usuarios borrados (pendientes de purgar) no se devuelven
+        deleted_owners = TaskService._deleted_owner_ids()
+
+        results = []
+        for session in task_sessions():
+            stmt = select(Task).order_by(Task.id)
+            if after_id is not None:
+                stmt = stmt.where(Task.id > after_id)
+            if deleted_owners:
+                stmt = stmt.where(Task.user_id.notin_(deleted_owners))
+            if limit:
+                stmt = stmt.limit(limit)
+            results.append(session.execute(stmt).scalars().all())
+
+        # Mezclar los cursores ordenados de cada shard y adjuntar las categorías de las elegidas
+        tasks = merge_sorted(results, key=lambda task: task.id, limit=limit)
+        by_session = defaultdict(list)
+        for task in tasks:
+            by_session[object_session(task)].append(task)
+        for session, session_tasks in by_session.items():
+            TaskService._attach_categories(session, session_tasks)
+
+        return tasks
 
     @staticmethod
-    def mark_task_status(task_id, status):
+    @query_budget(2, per_shard=True)
+    @read_only
+    def get_task_stats():
+        """Obtener el número de tareas por estado, agregado entre todos los shards.
+
+        Returns:
+            dict: Total de tareas (`total`) y recuento por estado (`by_status`).
+        """
+        # Las tareas de los usuarios borrados (pendientes de purgar) no se cuentan
+        deleted_owners = TaskService._deleted_owner_ids()
+        stmt = select(Task.status, func.count()).group_by(Task.status)
+        if deleted_owners:
+            stmt = stmt.where(Task.user_id.notin_(deleted_owners))
+
+        by_status = Counter()
+        for session in task_sessions():
+            for status, count in session.execute(stmt):
+                by_status[status] += count
+
+        return {'total': sum(by_status.values()), 'by_status': dict(by_status)}
+
+    @staticmethod
+    @query_budget(6, per_shard=True)
+    def mark_task_status(task_id, status, user_id=None):
         """Actualizar el estado de una tarea.
         
         Args:
             task_id (int): El ID de la tarea a actualizar.
             status (str): Nuevo estado de la tarea ('pending', 'in-progress', 'completed').
+            user_id (int, opcional): ID del propietario; con sharding evita buscar en todos los shards.
 
         Returns:
             Task: La tarea con el estado actualizado.
@@ -143,17 +506,164 @@ class TaskService:
         Raises:
             ValueError: Si la tarea no se encuentra.
         """
-        # Buscar la tarea por su ID
-        task = Task.query.get(task_id)
-        
-        # Si la tarea no existe, lanzar un error
-        if not task:
-            raise ValueError('Task not found')
+        # Buscar la tarea por su ID (lanza un error si no existe)
+        session, task = TaskService._locate_task(task_id, user_id)
         
         # Actualizar el estado de la tarea
-        task.status = status
+        previous_status, task.status = task.status, status
         
         # Confirmar los cambios
-        db.session.commit()
+        sweep_key = TaskService._overdue_sweep_key(task) if status != previous_status else None
+        session.commit()
+        TaskService._rewind_overdue_sweep(sweep_key)
+        TaskService._attach_categories(session, [task])
         
         return task
+
+    @staticmethod
+    def _deleted_owner_ids():
+        """IDs de los usuarios borrados cuyas tareas aún no se han purgado.
+
+        Los usuarios viven en la base de datos global y las tareas pueden estar en shards,
+        así que los IDs se consultan aparte; la lista solo contiene los purgados en curso.
+
+        Returns:
+            List[int]: IDs de los usuarios con `deleted_at`.
+        """
+        return db.session.execute(select(User.id).where(User.deleted_at.isnot(None))).scalars().all()
+
+    @staticmethod
+    def _resolve_category_names(names, create_missing=False):
+        """Obtener los IDs de las categorías con los nombres indicados.
+
+        Crear categorías está reservado a los administradores (`POST /categories/`), así que
+        los nombres que no existen solo se crean con `create_missing`.
+
+        Args:
+            names (List[str]): Nombres de las categorías.
+            create_missing (bool, opcional): Crear en bloque las que no existan, sin confirmar.
+
+        Returns:
+            List[int]: IDs de las categorías.
+
+        Raises:
+            ValueError: Si algún nombre no existe y no se pueden crear.
+        """
+        if create_missing:
+            return list(CategoryService.get_or_create_categories(names, commit=False).values())
+
+        names = list(dict.fromkeys(name.strip() for name in names if name and name.strip()))
+        found = CategoryService.get_category_ids_by_names(names)
+        missing = [name for name in names if name not in found]
+        if missing:
+            raise ValueError(f"Unknown categories: {', '.join(missing)}")
+        return list(found.values())
+
+    @staticmethod
+    def _bulk_task_criteria(user_id=None):
+        """Condiciones de las tareas que puede modificar una operación masiva.
+
+        Args:
+            user_id (int, opcional): ID del propietario; si se indica, solo sus tareas.
+
+        Returns:
+            tuple: Condiciones sobre `Task` para añadir a la selección de tareas.
+        """
+        criteria = (Task.user_id == user_id,) if user_id is not None else ()
+        deleted_owners = TaskService._deleted_owner_ids()
+        if deleted_owners:
+            criteria += (Task.user_id.notin_(deleted_owners),)
+        return criteria
+
+    @staticmethod
+    def _overdue_sweep_key(task):
+        """Shard, estado y fecha límite de una tarea nueva o cuyo estado o fecha cambian.
+
+        Se obtiene antes de confirmar, mientras los atributos de la tarea siguen cargados.
+
+        Returns:
+            tuple | None: Argumentos de `rewind_overdue_watermark`, o None si la tarea ya está
+            marcada como vencida.
+        """
+        if task.overdue_at is not None:
+            return None
+        router = get_shard_router()
+        shard_id = router.shard_for(task.user_id) if router is not None else 0
+        return shard_id, task.status, task.due_date
+
+    @staticmethod
+    def _rewind_overdue_sweep(sweep_key):
+        """Tras confirmar, avisar al barrido de una tarea que puede haber quedado por detrás de su marca de agua."""
+        if sweep_key is not None:
+            rewind_overdue_watermark(*sweep_key)
+
+    @staticmethod
+    def _parse_due_date(value):
+        """Interpretar una fecha límite en formato ISO 8601.
+
+        Las fechas con zona horaria se convierten a UTC sin zona, como el resto de fechas
+        de la base de datos.
+
+        Args:
+            value (str | datetime): Fecha recibida en la petición.
+
+        Returns:
+            datetime: La fecha límite en UTC.
+
+        Raises:
+            ValueError: Si la fecha no es válida.
+        """
+        if isinstance(value, datetime):
+            parsed = value
+        else:
+            try:
+                parsed = datetime.fromisoformat(value)
+            except (TypeError, ValueError):
+                raise ValueError('Invalid due_date: expected an ISO 8601 date')
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed
+
+    @staticmethod
+    def _locate_task(task_id, user_id=None):
+        """Buscar una tarea en su shard (o en todos si no se conoce el propietario).
+
+        Returns:
+            Tuple[Session, Task]: La sesión donde vive la tarea y la propia tarea.
+
+        Raises:
+            ValueError: Si la tarea no se encuentra.
+        """
+        sessions = [task_session(user_id)] if user_id is not None else task_sessions()
+        for session in sessions:
+            task = session.get(Task, task_id)
+            if task:
+                return session, task
+        raise ValueError('Task not found')
+
+    @staticmethod
+    def _attach_categories(session, tasks):
+        """Cargar las categorías de varias tareas con dos consultas en total.
+
+        Las asociaciones se leen de la sesión de la tarea y las categorías de la base de
+        datos global, por lo que funciona igual con y sin sharding y evita N+1 consultas.
+        """
+        if not tasks:
+            return
+
+        links = session.execute(
+            select(task_category.c.task_id, task_category.c.category_id)
+            .where(task_category.c.task_id.in_([task.id for task in tasks]))
+        ).all()
+        category_ids = {category_id for _, category_id in links}
+        categories = {
+            category.id: category
+            for category in db.session.execute(select(Category).where(Category.id.in_(category_ids))).scalars()
+        } if category_ids else {}
+
+        by_task = defaultdict(list)
+        for task_id, category_id in links:
+            if category_id in categories:
+                by_task[task_id].append(categories[category_id])
+        for task in tasks:
+            set_committed_value(task, 'categories', by_task[task.id])
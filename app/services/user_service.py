@@ -1,5 +1,13 @@
 from app import db
+from datetime import datetime
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
 from app.models.user import User
+from app.jobs.user_purge import enqueue_user_purge, queue_user_purge
+from app.utils.versioning import versioned_update
+from app.utils.batch import after_batch_commit
+from app.utils.replicas import read_only
+from app.utils.query_budget import query_budget
 from werkzeug.security import generate_password_hash, check_password_hash
 
 class UserService:
@@ -42,6 +50,8 @@ class UserService:
         return new_user
 
     @staticmethod
+    @query_budget(1)
+    @read_only
     def get_user_by_id(user_id):
         """Obtener un usuario por su ID.
         
@@ -54,8 +64,8 @@ class UserService:
         Raises:
             ValueError: Si el usuario no se encuentra.
         """
-        # Buscar el usuario por su ID
-        user = User.query.get(user_id)
+        # Buscar el usuario por su ID, ignorando los usuarios borrados
+        user = User.query.filter_by(id=user_id, deleted_at=None).first()
         
         # Si no se encuentra el usuario, lanzar un error
         if not user:
@@ -64,6 +74,25 @@ class UserService:
         return user
 
     @staticmethod
+    @query_budget(1)
+    def is_admin(user_id):
+        """Comprobar si un usuario es administrador.
+
+        Se consulta siempre el primario: un permiso retirado no debe seguir valiendo mientras
+        la réplica se pone al día.
+
+        Args:
+            user_id (int): El ID del usuario.
+
+        Returns:
+            bool: True si el usuario existe, no está borrado y es administrador.
+        """
+        return bool(db.session.execute(
+            select(User.is_admin).where(User.id == user_id, User.deleted_at.is_(None))
+        ).scalar())
+
+    @staticmethod
+    @query_budget(1)
     def get_user_by_username(username):
         """Obtener un usuario por su nombre de usuario.
         
@@ -76,8 +105,8 @@ class UserService:
         Raises:
             ValueError: Si el usuario no se encuentra.
         """
-        # Buscar el usuario por su nombre de usuario
-        user = User.query.filter_by(username=username).first()
+        # Buscar el usuario por su nombre de usuario, ignorando los usuarios borrados
+        user = User.query.filter_by(username=username, deleted_at=None).first()
         
         # Si no se encuentra el usuario, lanzar un error
         if not user:
@@ -86,6 +115,7 @@ class UserService:
         return user
 
     @staticmethod
+    @query_budget(4)
     def update_user(user_id, username=None, email=None, password=None):
         """Actualizar la información de un usuario existente.
         
@@ -104,8 +134,8 @@ class UserService:
         # Buscar el usuario por su ID
         user = User.query.get(user_id)
         
-        # Si el usuario no existe, lanzar un error
-        if not user:
+        # Si el usuario no existe o está borrado, lanzar un error
+        if not user or user.deleted_at:
             raise ValueError('User not found')
         
         # Verificar si el nuevo nombre de usuario ya existe
@@ -134,8 +164,52 @@ class UserService:
         return user
 
     @staticmethod
+    @query_budget(2)  # Sin UPDATE ... RETURNING (MySQL) la fila se relee con un SELECT
+    def patch_user(user_id, changes, expected_version=None, fetch=True):
+        """Actualizar parcialmente un usuario con una única sentencia UPDATE.
+
+        Las restricciones UNIQUE de `username` y `email` sustituyen a las consultas
+        previas de `update_user`.
+
+        Args:
+            user_id (int): El ID del usuario a actualizar.
+            changes (dict): Campos a modificar (`username`, `email`, `password`).
+            expected_version (int, opcional): Versión que debe tener el usuario.
+            fetch (bool, opcional): Si es True, devuelve el usuario actualizado.
+
+        Returns:
+            User | int | None: El usuario actualizado, o su nueva versión si `fetch` es False.
+
+        Raises:
+            ValueError: Si el usuario no se encuentra o el nombre de usuario/correo ya existen.
+            VersionConflictError: Si la versión del usuario no coincide.
+        """
+        values = {key: changes[key] for key in ('username', 'email') if changes.get(key)}
+
+        # La contraseña nunca se guarda en texto plano
+        if changes.get('password'):
+            values['password_hash'] = generate_password_hash(changes['password'])
+
+        try:
+            # Los usuarios borrados (pendientes de purgar) no se pueden modificar
+            result = versioned_update(
+                User, user_id, values, expected_version, fetch, criteria=(User.deleted_at.is_(None),)
+            )
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            raise ValueError('Username or email already exists')
+
+        return result
+
+    @staticmethod
+    @query_budget(3)
     def delete_user(user_id):
         """Eliminar un usuario existente.
+
+        El usuario se marca como borrado con un único UPDATE, sin cargar sus tareas, y el
+        borrado físico de sus tareas y asociaciones se delega a un trabajo en segundo plano
+        que las elimina por lotes (ver `app.jobs.user_purge`).
         
         Args:
             user_id (int): El ID del usuario a eliminar.
@@ -143,20 +217,28 @@ class UserService:
         Raises:
             ValueError: Si el usuario no se encuentra.
         """
-        # Buscar el usuario por su ID
-        user = User.query.get(user_id)
+        # Marcar el usuario como borrado sin cargar el objeto ni su colección de tareas
+        result = db.session.execute(
+            update(User)
+            .where(User.id == user_id, User.deleted_at.is_(None))
+            .values(deleted_at=datetime.utcnow(), version=User.version + 1)
+            .execution_options(synchronize_session=False)
+        )
         
-        # Si el usuario no existe, lanzar un error
-        if not user:
+        # Si el usuario no existe o ya estaba borrado, lanzar un error
+        if not result.rowcount:
+            db.session.rollback()
             raise ValueError('User not found')
         
-        # Eliminar el usuario de la base de datos
-        db.session.delete(user)
-        
-        # Confirmar los cambios
+        # Registrar el purgado pendiente en la misma transacción que el borrado lógico,
+        # confirmarlos juntos y programar el purgado de sus datos (en un lote atómico, cuando
+        # se confirme el lote: si se deshace, el usuario y sus tareas deben seguir intactos)
+        queue_user_purge(user_id)
         db.session.commit()
+        after_batch_commit(enqueue_user_purge, user_id)
 
     @staticmethod
+    @query_budget(1)
     def authenticate_user(username, password):
         """Autenticar un usuario con su nombre de usuario y contraseña.
         
@@ -170,8 +252,8 @@ class UserService:
         Raises:
             ValueError: Si el usuario no se encuentra o la contraseña es incorrecta.
         """
-        # Buscar el usuario por su nombre de usuario
-        user = User.query.filter_by(username=username).first()
+        # Buscar el usuario por su nombre de usuario, ignorando los usuarios borrados
+        user = User.query.filter_by(username=username, deleted_at=None).first()
         
         # Si el usuario no se encuentra o la contraseña es incorrecta, lanzar un error
         if not user or not check_password_hash(user.password_hash, password):
@@ -180,11 +262,13 @@ class UserService:
         return user
 
     @staticmethod
+    @query_budget(1)
+    @read_only
     def get_all_users():
         """Obtener todos los usuarios existentes.
         
         Returns:
             List[User]: Lista de todos los usuarios en la base de datos.
         """
-        # Devolver todos los usuarios almacenados
-        return User.query.all()
+        # Devolver todos los usuarios almacenados que no estén borrados
+        return User.query.filter_by(deleted_at=None).all()
@@ -0,0 +1,64 @@
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# Controlador asíncrono equivalente a cada motor de base de datos síncrono
+ASYNC_DRIVERS = {
+    'mysql': 'mysql+aiomysql',
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+}
+
+
+def async_database_uri(config):
+    """
+    Obtiene la URI de conexión asíncrona de la aplicación.
+
+    Usa `ASYNC_SQLALCHEMY_DATABASE_URI` si está definida; si no, deriva la URI de
+    `SQLALCHEMY_DATABASE_URI` sustituyendo el controlador por su equivalente asíncrono.
+
+    Args:
+        config (dict): Configuración de la aplicación Flask.
+
+    Returns:
+        str: URI para `create_async_engine`.
+
+    Raises:
+        ValueError: Si el motor de base de datos no tiene un controlador asíncrono conocido.
+    """
+    if config.get('ASYNC_SQLALCHEMY_DATABASE_URI'):
+        return config['ASYNC_SQLALCHEMY_DATABASE_URI']
+
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        raise ValueError(f'No async driver known for {url.get_backend_name()}')
+    return url.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def create_async_session_factory(config):
+    """
+    Crea el motor asíncrono y su fábrica de sesiones.
+
+    El tamaño del pool (`ASYNC_POOL_SIZE` + `ASYNC_MAX_OVERFLOW`) es el que limita cuántas
+    peticiones pueden consultar la base de datos a la vez; el resto espera su turno en el
+    bucle de eventos sin ocupar ningún hilo, como mucho `ASYNC_POOL_TIMEOUT` segundos.
+
+    Args:
+        config (dict): Configuración de la aplicación Flask.
+
+    Returns:
+        Tuple[AsyncEngine, async_sessionmaker]: El motor y la fábrica de sesiones.
+    """
+    uri = async_database_uri(config)
+    engine = create_async_engine(
+        uri,
+        echo=config.get('SQLALCHEMY_ECHO', False),
+        # aiosqlite usa NullPool por defecto; se fuerza un pool acotado como en MySQL
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=config['ASYNC_POOL_SIZE'],
+        max_overflow=config['ASYNC_MAX_OVERFLOW'],
+        pool_timeout=config['ASYNC_POOL_TIMEOUT'],
+        pool_pre_ping=True,
+    )
+    return engine, async_sessionmaker(engine, expire_on_commit=False)
@@ -0,0 +1,269 @@
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from flask import current_app, g, request
+from flask_jwt_extended import JWTManager, get_jwt
+from sqlalchemy.orm import Session
+from werkzeug.test import EnvironBuilder
+from app.utils.sharding import ensure_task_id_node
+from app.utils.sqlite import begin_outer_transaction, end_outer_transaction
+
+# Métodos admitidos en las subpeticiones de un lote
+BATCH_METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+
+# Encabezados de la respuesta de una subpetición que no tienen sentido dentro del lote
+_SKIPPED_RESPONSE_HEADERS = {'Content-Length', 'Content-Type'}
+
+
+class BatchJWTManager(JWTManager):
+    """
+    JWTManager que no vuelve a verificar el token en las subpeticiones de un lote.
+
+    `POST /batch` verifica el token una sola vez y lo guarda, junto con sus claims, en `g`
+    (compartido por todas las subpeticiones, que se ejecutan en el mismo contexto de
+    aplicación). Cuando `@jwt_required()` decodifica ese mismo token en una subpetición se
+    devuelven los claims ya verificados; cualquier otro token se verifica como siempre.
+    """
+
+    def _decode_jwt_from_config(self, encoded_token, csrf_value=None, allow_expired=False):
+        verified = g.get('_batch_jwt')
+        if verified is not None and verified[0] == encoded_token:
+            return verified[1]
+        return super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+
+
+def get_batch_executor():
+    """
+    Obtiene el pool de hilos de la aplicación actual para las lecturas en paralelo de los lotes.
+
+    Returns:
+        ThreadPoolExecutor: Pool compartido por todos los lotes del proceso.
+    """
+    executor = current_app.extensions.get('batch_executor')
+    if executor is None:
+        executor = current_app.extensions.setdefault('batch_executor', ThreadPoolExecutor(
+            max_workers=current_app.config['BATCH_MAX_PARALLEL'], thread_name_prefix='batch-read'
+        ))
+    return executor
+
+
+def _dispatch(app, sub_request, authorization, remote_addr):
+    """
+    Ejecuta una subpetición dentro del proceso, sin pasar por la red ni por el servidor WSGI.
+
+    El contexto de petición se apila sobre el contexto de aplicación actual, así que la
+    subpetición comparte `g` y `db.session` con el resto del lote.
+
+    Returns:
+        dict: Identificador, código de estado, encabezados y cuerpo de la respuesta.
+    """
+    headers = dict(sub_request.get('headers') or {})
+    headers['Authorization'] = authorization  # Siempre el token ya verificado del lote
+
+    builder = EnvironBuilder(
+        path=sub_request['path'],
+        method=sub_request['method'].upper(),
+        headers=headers,
+        json=sub_request.get('body'),
+        environ_base={'REMOTE_ADDR': remote_addr},
+    )
+    try:
+        with app.request_context(builder.get_environ()):
+            response = app.make_response(app.full_dispatch_request())
+    except Exception:
+        # En modo debug Flask propaga las excepciones; dentro del lote se devuelven como 500
+        app.logger.exception('Batch sub-request %s %s failed', sub_request['method'], sub_request['path'])
+        return {'id': sub_request.get('id'), 'status': 500, 'headers': {},
+                'body': {'message': 'Internal Server Error'}}
+    finally:
+        builder.close()
+
+    body = response.get_json(silent=True)
+    if body is None and response.get_data():
+        body = response.get_data(as_text=True)
+    return {
+        'id': sub_request.get('id'),
+        'status': response.status_code,
+        'headers': {k: v for k, v in response.headers.items() if k not in _SKIPPED_RESPONSE_HEADERS},
+        'body': body,
+    }
+
+
+def _dispatch_isolated(app, sub_request, authorization, remote_addr, batch_jwt, pinned_to_primary):
+    """
+    Ejecuta una subpetición de lectura en su propio contexto de aplicación (hilo del pool).
+
+    Tiene su propia sesión y, por tanto, su propia conexión, que puede ir a una réplica; si
+    el lote ya ha escrito, la sesión se fija al primario para leer esas escrituras.
+    """
+    with app.app_context():
+        g._batch_jwt = batch_jwt
+        current_app.extensions['sqlalchemy'].session().pinned_to_primary = pinned_to_primary
+        return _dispatch(app, sub_request, authorization, remote_addr)
+
+
+def _rollback_sessions():
+    """Deshace lo que haya quedado sin confirmar en `db.session` y en las sesiones de los shards."""
+    current_app.extensions['sqlalchemy'].session.rollback()
+    for shard_session in g.get('_task_shard_sessions', {}).values():
+        shard_session.rollback()
+
+
+def after_batch_commit(callback, *args):
+    """
+    Ejecuta `callback(*args)` cuando se confirme el lote atómico en curso.
+
+    Los efectos que no forman parte de la transacción (trabajos en segundo plano,
+    notificaciones...) no se pueden deshacer con ella: dentro de un lote atómico se aplazan
+    hasta que el lote se confirma y se descartan si se deshace. Fuera de un lote atómico la
+    transacción de la petición ya está confirmada y `callback` se ejecuta de inmediato.
+
+    Args:
+        callback (Callable): Función a ejecutar.
+        *args: Argumentos de `callback`.
+    """
+    pending = g.get('_batch_after_commit')
+    if pending is None:
+        callback(*args)
+    else:
+        pending.append((callback, args))
+
+
+@contextmanager
+def _pinned_connection(atomic):
+    """
+    Fija `db.session` (y, en un lote atómico, las sesiones de los shards) a una sola conexión.
+
+    En un lote atómico la conexión abre una transacción externa y las sesiones la comparten
+    mediante savepoints: los `commit()` de los servicios solo liberan su savepoint y los
+    `rollback()` solo deshacen su propia subpetición. La transacción se confirma o se
+    deshace al final según el resultado de `yield`, y solo tras confirmarla se ejecutan los
+    efectos aplazados con `after_batch_commit`.
+    """
+    db = current_app.extensions['sqlalchemy']
+    session = db.session()
+    session.close()  # Empezar el lote sin ninguna transacción de la petición pendiente
+
+    connections = [db.engine.connect()]
+    session.pinned_connection = connections[0]
+    if atomic:
+        session.join_transaction_mode = 'create_savepoint'
+
+        # Los shards no pueden compartir la conexión del primario: una conexión (y una
+        # transacción) por shard, confirmadas justo antes que la del primario
+        router = current_app.extensions.get('task_shards')
+        if router is not None:
+            ensure_task_id_node()  # Arrendar el nodo de IDs antes de bloquear la base principal
+            shard_sessions = g.setdefault('_task_shard_sessions', {})
+            for shard_id in range(router.shard_count):
+                connection = router.engine(shard_id).connect()
+                connections.insert(0, connection)
+                shard_sessions.setdefault(shard_id, Session(bind=connection, join_transaction_mode='create_savepoint'))
+
+        transactions = [begin_outer_transaction(connection) for connection in connections]
+        g._batch_after_commit = []
+
+    outcome = {'commit': True}
+    try:
+        yield outcome
+        session.close()
+        if atomic:
+            for transaction in transactions:
+                if outcome['commit']:
+                    transaction.commit()
+                else:
+                    transaction.rollback()
+    finally:
+        session.close()
+        session.pinned_connection = None
+        session.join_transaction_mode = 'conditional_savepoint'
+        if atomic:
+            for shard_session in g.pop('_task_shard_sessions', {}).values():
+                shard_session.close()
+            for connection, transaction in zip(connections, transactions):
+                end_outer_transaction(connection, transaction)
+            after_commit = g.pop('_batch_after_commit')
+        for connection in connections:
+            connection.close()
+
+    # Ya con la sesión liberada: los efectos aplazados pueden usar `db.session` con normalidad
+    if atomic and outcome['commit']:
+        for callback, args in after_commit:
+            callback(*args)
+
+
+def run_batch(sub_requests, atomic=False, parallel_reads=False):
+    """
+    Ejecuta las subpeticiones de un lote dentro del proceso y devuelve sus respuestas en orden.
+
+    Debe llamarse desde una petición ya autenticada con `@jwt_required()`: el token se verifica
+    una sola vez y se reutiliza en todas las subpeticiones.
+
+    Args:
+        sub_requests (List[dict]): Subpeticiones con `method`, `path` y, opcionalmente, `id`,
+            `headers` y `body`.
+        atomic (bool, opcional): Ejecutar todo en una transacción; si una subpetición falla
+            (código >= 400) no se ejecutan las siguientes y se deshace todo el lote. Sin él,
+            cada subpetición se confirma por separado y lo que deja pendiente una que falla
+            (código >= 500) se deshace antes de ejecutar la siguiente.
+        parallel_reads (bool, opcional): Ejecutar en paralelo los GET consecutivos, cada uno
+            con su propia conexión. No se aplica en lotes atómicos, cuyas lecturas deben ver
+            las escrituras aún sin confirmar del lote.
+
+    Returns:
+        Tuple[List[dict], bool]: Respuestas de cada subpetición y si el lote se ha confirmado.
+
+    Raises:
+        ValueError: Si alguna subpetición no es válida.
+    """
+    for sub_request in sub_requests:
+        if sub_request['method'].upper() not in BATCH_METHODS:
+            raise ValueError(f"Unsupported method {sub_request['method']}")
+        if not sub_request['path'].startswith('/') or sub_request['path'].startswith('/batch'):
+            raise ValueError(f"Invalid path {sub_request['path']}")
+
+    app = current_app._get_current_object()
+    authorization = request.headers['Authorization']
+    remote_addr = request.remote_addr
+    g._batch_jwt = (authorization.split(None, 1)[1], get_jwt())
+    parallel_reads = parallel_reads and not atomic
+
+    responses = []
+    with _pinned_connection(atomic) as outcome:
+        # Grupos de subpeticiones consecutivas: los GET se agrupan si se leen en paralelo
+        groups = itertools.groupby(
+            sub_requests, key=lambda sub_request: parallel_reads and sub_request['method'].upper() == 'GET'
+        )
+        for parallel, group in groups:
+            group = list(group)
+            if parallel and len(group) > 1:
+                pinned = current_app.extensions['sqlalchemy'].session().pinned_to_primary
+                futures = [
+                    get_batch_executor().submit(
+                        _dispatch_isolated, app, sub_request, authorization, remote_addr, g._batch_jwt, pinned
+                    )
+                    for sub_request in group
+                ]
+                responses.extend(future.result() for future in futures)
+                continue
+
+            for sub_request in group:
+                if atomic and not outcome['commit']:
+                    # Una subpetición anterior ha fallado: el lote se deshará, no ejecutar el resto
+                    responses.append({
+                        'id': sub_request.get('id'), 'status': 424, 'headers': {},
+                        'body': {'message': 'Not executed: a previous request in the atomic batch failed'},
+                    })
+                    continue
+
+                response = _dispatch(app, sub_request, authorization, remote_addr)
+                responses.append(response)
+                if atomic and response['status'] >= 400:
+                    outcome['commit'] = False
+                elif not atomic and response['status'] >= 500:
+                    # Las subpeticiones comparten las sesiones: lo que la fallida dejó sin
+                    # confirmar no debe confirmarlo (ni bloquearlo) la siguiente
+                    _rollback_sessions()
+
+    return responses, outcome['commit']
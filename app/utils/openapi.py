@@ -0,0 +1,106 @@
+import hashlib
+import json
+import logging
+import os
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from flask_restx import Api
+from flask_restx.swagger import Swagger
+
+logger = logging.getLogger(__name__)
+
+# Clave de la especificación generada con la huella de las rutas y modelos (extensión `x-` de Swagger 2.0)
+_FINGERPRINT_KEY = 'x-spec-fingerprint'
+
+
+def spec_fingerprint(api):
+    """
+    Calcula la huella de las rutas y los modelos de una API.
+
+    Cambia al añadir, quitar o renombrar rutas, métodos o modelos y al modificar sus campos;
+    no al cambiar solo las descripciones de los recursos. Es mucho más barata que generar la
+    especificación, así que se puede comprobar en cada proceso al cargarla desde el fichero.
+
+    Args:
+        api (Api): La API de Flask-RESTX.
+
+    Returns:
+        str: Resumen SHA-256 en hexadecimal.
+    """
+    routes = sorted((rule.rule, sorted(rule.methods), rule.endpoint) for rule in api.app.url_map.iter_rules())
+    models = {name: model.__schema__ for name, model in api.models.items()}
+    payload = json.dumps([api.version, routes, models], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class CachedSpecApi(Api):
+    """
+    API de Flask-RESTX que sirve la especificación Swagger generada en tiempo de build.
+
+    Si existe el fichero `SWAGGER_SPEC_FILE` (creado con `flask openapi build`) y su huella
+    coincide con las rutas y modelos actuales, `/swagger.json` devuelve su contenido en lugar
+    de recorrer todos los namespaces y modelos para generarlo en cada proceso. Si no existe,
+    está desfasado o la aplicación está en modo debug, se genera como siempre. El `basePath`
+    se toma de la petición, ya que depende de dónde esté montada la aplicación.
+    """
+
+    _cached_spec = None
+
+    @property
+    def __schema__(self):
+        if self._cached_spec is None and not self._schema and self.app is not None and not self.app.debug:
+            self._cached_spec = self._load_spec_file() or False
+        if self._cached_spec:
+            return dict(self._cached_spec, basePath=self.base_path)
+        return super().__schema__
+
+    def _load_spec_file(self):
+        """Especificación de `SWAGGER_SPEC_FILE`, o None si no existe o no coincide con la API."""
+        spec_file = self.app.config.get('SWAGGER_SPEC_FILE')
+        if not spec_file or not os.path.exists(spec_file):
+            return None
+        with open(spec_file, encoding='utf-8') as f:
+            spec = json.load(f)
+        if spec.get(_FINGERPRINT_KEY) != spec_fingerprint(self):
+            logger.warning('Swagger spec %s is out of date, generating it instead; run `flask openapi build`', spec_file)
+            return None
+        return spec
+
+
+def build_swagger_spec(app, spec_file):
+    """
+    Genera la especificación Swagger de la aplicación y la guarda en `spec_file`.
+
+    Args:
+        app (Flask): La aplicación Flask.
+        spec_file (str): Ruta del fichero JSON a escribir.
+
+    Returns:
+        dict: La especificación generada.
+    """
+    # Generar siempre desde los namespaces, sin pasar por la especificación cacheada; a
+    # diferencia de `/swagger.json`, cualquier error al generarla se propaga
+    api = app.extensions['restx_api']
+    with app.test_request_context('/'):
+        spec = Swagger(api).as_dict()
+    spec.pop('basePath', None)  # Depende de la petición: se añade al servirla
+    spec[_FINGERPRINT_KEY] = spec_fingerprint(api)
+
+    with open(spec_file, 'w', encoding='utf-8') as f:
+        json.dump(spec, f, ensure_ascii=False, sort_keys=True)
+    return spec
+
+
+# Grupo de comandos CLI `flask openapi`
+openapi_cli = AppGroup('openapi', help='Gestión de la especificación Swagger precalculada.')
+
+
+@openapi_cli.command('build')
+@click.option('--output', default=None, help='Fichero de salida (por defecto SWAGGER_SPEC_FILE).')
+def build_swagger_spec_command(output):
+    """Genera la especificación Swagger para servirla sin reconstruirla en cada proceso."""
+    spec_file = output or current_app.config['SWAGGER_SPEC_FILE']
+    spec = build_swagger_spec(current_app, spec_file)
+    click.echo(f'Swagger spec written to {spec_file} ({len(spec["paths"])} paths)')
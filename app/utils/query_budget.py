@@ -0,0 +1,163 @@
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Contadores activos en cada hilo; el listener solo registra las sentencias del hilo que las ejecuta
+_active = threading.local()
+_listener_lock = threading.Lock()
+_listener_installed = False
+
+
+class QueryBudgetExceeded(AssertionError):
+    """
+    Excepción lanzada cuando una llamada ejecuta más consultas de las declaradas.
+
+    Atributos:
+        label (str): Nombre de la llamada (endpoint o método de servicio).
+        budget (int): Número máximo de consultas permitido.
+        statements (List[str]): Sentencias SQL ejecutadas durante la llamada.
+    """
+
+    def __init__(self, label, budget, statements):
+        super().__init__(
+            f'{label} executed {len(statements)} queries (budget {budget}):\n' + '\n'.join(statements)
+        )
+        self.label = label
+        self.budget = budget
+        self.statements = statements
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """Registrar la sentencia en todos los contadores activos del hilo actual."""
+    for counter in getattr(_active, 'counters', ()):
+        counter.record(conn, statement, parameters)
+
+
+def _install_listener():
+    """Escuchar las sentencias de todos los motores (primario, réplicas y shards) una sola vez."""
+    global _listener_installed
+    with _listener_lock:
+        if not _listener_installed:
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            _listener_installed = True
+
+
+class QueryCounter:
+    """
+    Registra las sentencias SQL que ejecuta el hilo actual mientras está activo.
+
+    Se usa como gestor de contexto; los contadores pueden anidarse.
+
+    Atributos:
+        statements (List[Tuple[Connection, str, Any]]): Conexión, sentencia y parámetros de
+            cada consulta, tal y como se enviaron al controlador de la base de datos.
+    """
+
+    def __init__(self):
+        self.statements = []
+
+    def record(self, conn, statement, parameters):
+        self.statements.append((conn, statement, parameters))
+
+    @property
+    def count(self):
+        """Número de sentencias registradas."""
+        return len(self.statements)
+
+    def __enter__(self):
+        _install_listener()
+        if not hasattr(_active, 'counters'):
+            _active.counters = []
+        _active.counters.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _active.counters.remove(self)
+        return False
+
+
+@contextmanager
+def uncounted():
+    """
+    Excluye de los contadores activos del hilo las sentencias ejecutadas dentro del bloque.
+
+    Para el mantenimiento interno que una llamada puede desencadenar de forma ocasional (p. ej.
+    renovar el arrendamiento del nodo de IDs de tareas) y que no forma parte de su coste.
+    """
+    counters = getattr(_active, 'counters', [])
+    _active.counters = []
+    try:
+        yield
+    finally:
+        _active.counters = counters
+
+
+class query_budget:
+    """
+    Declara el número máximo de consultas de un método de servicio o endpoint.
+
+    Solo se comprueba con `QUERY_BUDGETS_ENFORCED` activado (pruebas y
+    `benchmarks/check_query_plans.py`); en producción no añade ningún coste. Si la llamada
+    supera el presupuesto se lanza `QueryBudgetExceeded` con las sentencias ejecutadas, lo
+    que delata un índice o un `joinedload` perdidos, o una carga perezosa nueva.
+
+    Se puede usar como decorador o como gestor de contexto:
+
+        @staticmethod
+        @query_budget(1)
+        def get_user_by_id(user_id): ...
+
+        with query_budget(3, label='dashboard'):
+            ...
+
+    Args:
+        max_queries (int): Consultas permitidas.
+        per_shard (bool, opcional): Multiplicar el presupuesto por el número de shards de
+            tareas, para los métodos que consultan todos los shards.
+        label (str, opcional): Nombre usado en el mensaje de error; por defecto, el de la función.
+    """
+
+    def __init__(self, max_queries, per_shard=False, label=None):
+        self.max_queries = max_queries
+        self.per_shard = per_shard
+        self.label = label
+        self._counters = []
+
+    def __call__(self, func):
+        label = self.label or func.__qualname__
+
+        @wraps(func)  # Mantiene el nombre y la docstring original de la función decorada
+        def wrapper(*args, **kwargs):
+            with query_budget(self.max_queries, self.per_shard, label):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    def budget(self):
+        """Presupuesto efectivo según el número de shards configurados."""
+        if not self.per_shard:
+            return self.max_queries
+        router = current_app.extensions.get('task_shards')
+        return self.max_queries * (router.shard_count if router is not None else 1)
+
+    def __enter__(self):
+        counter = QueryCounter().__enter__() if current_app.config.get('QUERY_BUDGETS_ENFORCED') else None
+        self._counters.append(counter)
+        return counter
+
+    def __exit__(self, exc_type, exc, tb):
+        counter = self._counters.pop()
+        if counter is None:
+            return False
+        counter.__exit__(exc_type, exc, tb)
+
+        # Si la llamada ya ha fallado, no ocultar su excepción con la del presupuesto
+        if exc_type is None and counter.count > self.budget():
+            raise QueryBudgetExceeded(
+                self.label or 'block', self.budget(), [statement for _, statement, _ in counter.statements]
+            )
+        return False
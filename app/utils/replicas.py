@@ -0,0 +1,161 @@
+import itertools
+import logging
+import threading
+import time
+from functools import wraps
+
+import sqlalchemy as sa
+from flask import current_app
+from flask_sqlalchemy.session import Session
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.sql.dml import UpdateBase
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicaPool:
+    """
+    Conjunto de motores de réplicas de solo lectura con reparto round-robin.
+
+    Una réplica que falla queda fuera de la rotación durante `retry_interval` segundos;
+    al cumplirse el plazo se comprueba con un ``SELECT 1`` antes de volver a usarla.
+
+    Atributos:
+        engines (List[Engine]): Motores de SQLAlchemy de cada réplica.
+        retry_interval (float): Segundos que una réplica caída permanece fuera de la rotación.
+    """
+
+    def __init__(self, engines, retry_interval=30):
+        self.engines = list(engines)
+        self.retry_interval = retry_interval
+        self._cycle = itertools.cycle(self.engines)
+        self._down_until = {}
+        self._lock = threading.Lock()
+
+    def choose(self):
+        """
+        Elige la siguiente réplica sana.
+
+        Returns:
+            Engine: El motor de la réplica elegida, o None si ninguna está disponible.
+        """
+        for _ in range(len(self.engines)):
+            with self._lock:
+                engine = next(self._cycle)
+                down_until = self._down_until.get(engine)
+
+            if down_until is None:
+                return engine
+            if down_until <= time.monotonic() and self._probe(engine):
+                with self._lock:
+                    self._down_until.pop(engine, None)
+                logger.info('Replica %s is back in rotation', engine.url.render_as_string())
+                return engine
+        return None
+
+    def mark_failed(self, engine):
+        """Saca una réplica de la rotación durante `retry_interval` segundos."""
+        with self._lock:
+            self._down_until[engine] = time.monotonic() + self.retry_interval
+        logger.warning('Replica %s marked as unavailable', engine.url.render_as_string())
+
+    def _probe(self, engine):
+        """Comprueba que una réplica responde; si no, prolonga su tiempo fuera de rotación."""
+        try:
+            with engine.connect() as connection:
+                connection.execute(sa.text('SELECT 1'))
+            return True
+        except DBAPIError:
+            self.mark_failed(engine)
+            return False
+
+
+class RoutingSession(Session):
+    """
+    Sesión de Flask-SQLAlchemy que reparte las lecturas entre el primario y las réplicas.
+
+    Por defecto todo va al primario. Dentro de un método marcado con `read_only`, las
+    consultas de lectura se envían a la réplica elegida para ese método. En cuanto la sesión
+    escribe (flush o INSERT/UPDATE/DELETE explícito) queda fijada al primario durante el
+    resto de la petición, de modo que el cliente siempre lee sus propias escrituras.
+
+    Durante un lote (`POST /batch`, ver `app.utils.batch`) todo lo que iría al primario usa
+    la conexión fijada en `pinned_connection`.
+    """
+
+    def __init__(self, db, **kwargs):
+        super().__init__(db, **kwargs)
+        self.replica = None  # Réplica activa dentro de un método `read_only`
+        self.pinned_to_primary = False  # True tras la primera escritura de la petición
+        self.pinned_connection = None  # Conexión del primario compartida por las subpeticiones de un lote
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        """Devuelve la réplica activa para lecturas y el motor de Flask-SQLAlchemy en otro caso."""
+        # Cualquier escritura fija la sesión al primario (read-your-writes)
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.pinned_to_primary = True
+
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+        # Dentro de un lote, el primario se usa siempre a través de la conexión del lote
+        if self.pinned_connection is not None and engine is self._db.engines.get(None):
+            return self.pinned_connection
+
+        # Solo se redirigen las lecturas que irían al motor principal por defecto
+        if self.replica is not None and not self.pinned_to_primary and engine is self._db.engines.get(None):
+            return self.replica
+        return engine
+
+
+def init_replicas(app):
+    """
+    Crea los motores de las réplicas configuradas en `SQLALCHEMY_REPLICA_URIS`.
+
+    Args:
+        app (Flask): La aplicación Flask.
+    """
+    uris = app.config.get('SQLALCHEMY_REPLICA_URIS') or []
+    if not uris:
+        return
+
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    options.setdefault('echo', app.config.get('SQLALCHEMY_ECHO', False))
+    engines = [sa.create_engine(uri, **options) for uri in uris]
+    app.extensions['db_replicas'] = ReplicaPool(engines, app.config.get('REPLICA_RETRY_INTERVAL', 30))
+
+
+def read_only(func):
+    """
+    Decorador para métodos de servicio de solo lectura que pueden ejecutarse en una réplica.
+
+    Si la petición ya ha escrito, no hay réplicas configuradas o ninguna está sana, el método
+    se ejecuta en el primario. Si la réplica falla durante la consulta, se saca de la rotación
+    y el método se repite en el primario.
+    """
+
+    @wraps(func)  # Mantiene el nombre y la docstring original de la función decorada
+    def wrapper(*args, **kwargs):
+        pool = current_app.extensions.get('db_replicas')
+        session = current_app.extensions['sqlalchemy'].session()
+
+        # Sin réplicas, con la petición fijada al primario o en una llamada anidada: nada que hacer
+        if pool is None or session.pinned_to_primary or session.replica is not None:
+            return func(*args, **kwargs)
+
+        session.replica = pool.choose()
+        if session.replica is None:
+            return func(*args, **kwargs)
+
+        try:
+            return func(*args, **kwargs)
+        except (OperationalError, InterfaceError):
+            # La réplica ha fallado: descartarla y repetir la lectura en el primario.
+            # La sesión no ha escrito nada (no está fijada), así que el rollback es seguro.
+            pool.mark_failed(session.replica)
+            session.rollback()
+            session.replica = None
+            return func(*args, **kwargs)
+        finally:
+            session.replica = None
+
+    return wrapper
@@ -0,0 +1,355 @@
+import hashlib
+import heapq
+import itertools
+import logging
+import os
+import secrets
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app, g
+from sqlalchemy import MetaData, delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.utils.query_budget import uncounted
+
+logger = logging.getLogger(__name__)
+
+# Época propia para los IDs de tareas (2024-01-01 UTC, en milisegundos)
+_ID_EPOCH_MS = 1704067200000
+
+# Identificador de nodo (10 bits) y secuencia (12 bits) del generador de IDs. El nodo se
+# arrienda en la base de datos principal (ver `lease_task_id_node`) y es propio de cada
+# proceso: tras un fork (p. ej. el de gunicorn) el hijo olvida el del padre y arrienda otro
+_ID_NODES = 1024
+_id_lock = threading.Lock()
+_lease_lock = threading.Lock()
+_id_state = {'pid': None, 'node': None, 'holder': None, 'renew_at': 0.0, 'ms': 0, 'seq': 0}
+
+
+def reset_task_id_generator():
+    """
+    Olvida el nodo y la secuencia del generador de IDs de tareas.
+
+    No libera el arrendamiento: pertenece al proceso padre. `next_task_id` lo hace por sí
+    solo al detectar un cambio de PID; se puede llamar explícitamente tras un fork (ver
+    `post_fork` en gunicorn.conf.py).
+    """
+    global _id_lock, _lease_lock
+    # Los cerrojos heredados del proceso padre podrían haberse copiado cerrados
+    _id_lock = threading.Lock()
+    _lease_lock = threading.Lock()
+    _id_state.update(pid=os.getpid(), node=None, holder=None, renew_at=0.0, ms=0, seq=0)
+
+
+def lease_task_id_node(app):
+    """
+    Arrienda en la base de datos principal el nodo del generador de IDs de este proceso.
+
+    Si el proceso ya tiene un nodo, renueva su arrendamiento; si no (o si lo ha perdido por
+    dejarlo caducar), reserva `TASK_ID_NODE` o, si no está definido, cualquier nodo libre o
+    caducado. Cada reserva es una sentencia condicional, así que dos procesos nunca obtienen
+    el mismo nodo. Se llama al arrancar cada worker de gunicorn (`post_worker_init`), de
+    modo que un worker sin un nodo único no llega a aceptar peticiones; fuera de gunicorn,
+    `next_task_id` lo llama con la primera tarea creada.
+
+    El nodo solo se usa hasta la mitad de `TASK_ID_NODE_LEASE_TTL` sin renovarlo: el margen
+    cubre la diferencia entre los relojes de los hosts, que deciden cuándo ha caducado.
+
+    Args:
+        app (Flask): La aplicación Flask.
+
+    Returns:
+        int: El nodo arrendado.
+
+    Raises:
+        RuntimeError: Si `TASK_ID_NODE` está arrendado por otro proceso o no queda ningún nodo libre.
+    """
+    from app import db
+    from app.models.task_id_node import TaskIdNode
+
+    if _id_state['pid'] != os.getpid():
+        reset_task_id_generator()
+
+    table = TaskIdNode.__table__
+    ttl = app.config['TASK_ID_NODE_LEASE_TTL']
+    with app.app_context():
+        engine = db.engine
+
+    # El mantenimiento del arrendamiento no forma parte del coste de la petición que lo dispara
+    with _lease_lock, uncounted():
+        if _id_state['node'] is not None:
+            if time.monotonic() < _id_state['renew_at']:
+                return _id_state['node']  # Otro hilo acaba de renovarlo
+            started = time.monotonic()
+            with engine.begin() as connection:
+                renewed = connection.execute(
+                    update(table)
+                    .where(table.c.node == _id_state['node'], table.c.holder == _id_state['holder'])
+                    .values(expires_at=datetime.utcnow() + timedelta(seconds=ttl))
+                ).rowcount
+            if renewed:
+                _id_state['renew_at'] = started + ttl / 2
+                return _id_state['node']
+            logger.warning('Task ID node %s lease expired and was taken over; leasing another one', _id_state['node'])
+            _id_state.update(node=None, holder=None)
+
+        holder = f'{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(4)}'
+        configured = app.config.get('TASK_ID_NODE')
+        with engine.connect() as connection:
+            leased = dict(connection.execute(select(table.c.node, table.c.expires_at)).all())
+
+        for node in [configured] if configured is not None else range(_ID_NODES):
+            if node in leased and leased[node] > datetime.utcnow():
+                continue
+            started = time.monotonic()
+            expires_at = datetime.utcnow() + timedelta(seconds=ttl)
+            try:
+                with engine.begin() as connection:
+                    if node in leased:
+                        # Tomar el nodo solo si sigue caducado: otro proceso puede habérsenos adelantado
+                        claimed = connection.execute(
+                            update(table)
+                            .where(table.c.node == node, table.c.expires_at < datetime.utcnow())
+                            .values(holder=holder, expires_at=expires_at)
+                        ).rowcount
+                    else:
+                        connection.execute(insert(table).values(node=node, holder=holder, expires_at=expires_at))
+                        claimed = 1
+            except IntegrityError:
+                claimed = 0  # Otro proceso lo ha insertado antes
+            if claimed:
+                _id_state.update(node=node, holder=holder, renew_at=started + ttl / 2)
+                logger.info('Leased task ID node %s for %s', node, holder)
+                return node
+
+    if configured is not None:
+        raise RuntimeError(
+            f'Task ID node {configured} (TASK_ID_NODE) is leased by another process; '
+            'each process needs its own node'
+        )
+    raise RuntimeError(f'No free task ID node: all {_ID_NODES} nodes are leased')
+
+
+def release_task_id_node(app):
+    """
+    Libera el nodo arrendado por este proceso para que otro pueda usarlo sin esperar a que caduque.
+
+    Args:
+        app (Flask): La aplicación Flask.
+    """
+    from app import db
+    from app.models.task_id_node import TaskIdNode
+
+    if _id_state['pid'] != os.getpid() or _id_state['node'] is None:
+        return
+    table = TaskIdNode.__table__
+    with app.app_context(), db.engine.begin() as connection:
+        connection.execute(
+            delete(table).where(table.c.node == _id_state['node'], table.c.holder == _id_state['holder'])
+        )
+    _id_state.update(node=None, holder=None, renew_at=0.0)
+
+
+def ensure_task_id_node():
+    """
+    Arrienda o renueva el nodo de IDs de tareas de este proceso si hace falta.
+
+    Se puede llamar antes de abrir una transacción larga sobre la base principal (lotes
+    atómicos): con SQLite el arrendamiento, que usa otra conexión, esperaría a que terminase.
+    """
+    if _id_state['pid'] != os.getpid() or time.monotonic() >= _id_state['renew_at']:
+        lease_task_id_node(current_app._get_current_object())
+
+
+def next_task_id():
+    """
+    Genera un ID de tarea único entre todos los shards.
+
+    El ID ocupa 63 bits: milisegundos desde `_ID_EPOCH_MS`, 10 bits de nodo y 12 bits de
+    secuencia, por lo que crece con el tiempo y permite ordenar y paginar entre shards. Solo
+    consulta la base de datos principal para arrendar o renovar el nodo del proceso (ver
+    `lease_task_id_node`), como mucho una vez cada media `TASK_ID_NODE_LEASE_TTL`.
+
+    Returns:
+        int: Nuevo ID de tarea.
+    """
+    ensure_task_id_node()
+
+    with _id_lock:
+        now = int(time.time() * 1000) - _ID_EPOCH_MS
+        if now <= _id_state['ms']:
+            # Mismo milisegundo (o reloj retrasado): avanzar la secuencia
+            now = _id_state['ms']
+            _id_state['seq'] = (_id_state['seq'] + 1) & 0xFFF
+            if _id_state['seq'] == 0:
+                now += 1
+        else:
+            _id_state['seq'] = 0
+        _id_state['ms'] = now
+        return (now << 22) | (_id_state['node'] << 12) | _id_state['seq']
+
+
+# Reiniciar el generador en el hijo justo tras el fork, antes de que arranque ningún hilo
+os.register_at_fork(after_in_child=reset_task_id_generator)
+
+
+def shard_for_user(user_id, shard_count):
+    """
+    Calcula el shard que almacena las tareas de un usuario.
+
+    Args:
+        user_id (int): El ID del usuario.
+        shard_count (int): Número total de shards.
+
+    Returns:
+        int: Índice del shard, entre 0 y `shard_count - 1`.
+    """
+    digest = hashlib.blake2b(str(user_id).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % shard_count
+
+
+def shard_bind_key(shard_id):
+    """Nombre del bind de Flask-SQLAlchemy asociado a un shard."""
+    return f'tasks_shard_{shard_id}'
+
+
+class ShardRouter:
+    """
+    Enrutador de las tablas de tareas (`tasks` y `task_category`) entre varios shards.
+
+    Cada shard es un bind de Flask-SQLAlchemy. Las sesiones de cada shard se crean bajo
+    demanda y viven en el contexto de aplicación actual, igual que `db.session`.
+
+    Atributos:
+        shard_count (int): Número de shards configurados.
+    """
+
+    def __init__(self, db, shard_count):
+        self.db = db
+        self.shard_count = shard_count
+
+    def engine(self, shard_id):
+        """Motor de SQLAlchemy de un shard."""
+        return self.db.engines[shard_bind_key(shard_id)]
+
+    def shard_for(self, user_id):
+        """Índice del shard que almacena las tareas de `user_id`."""
+        return shard_for_user(user_id, self.shard_count)
+
+    def session(self, shard_id):
+        """
+        Obtiene la sesión del contexto actual para un shard, creándola si no existe.
+
+        Args:
+            shard_id (int): Índice del shard.
+
+        Returns:
+            Session: Sesión ligada al motor del shard.
+        """
+        sessions = g.setdefault('_task_shard_sessions', {})
+        if shard_id not in sessions:
+            sessions[shard_id] = Session(bind=self.engine(shard_id))
+        return sessions[shard_id]
+
+    def sessions(self):
+        """Sesiones de todos los shards, en orden de índice."""
+        return [self.session(shard_id) for shard_id in range(self.shard_count)]
+
+
+def init_sharding(app, db):
+    """
+    Registra los shards configurados en `TASK_SHARD_URIS` como binds de Flask-SQLAlchemy.
+
+    Debe llamarse antes de `db.init_app(app)` para que Flask-SQLAlchemy cree sus motores.
+
+    Args:
+        app (Flask): La aplicación Flask.
+        db (SQLAlchemy): La extensión de Flask-SQLAlchemy.
+    """
+    uris = app.config.get('TASK_SHARD_URIS') or []
+    if not uris:
+        return
+
+    node = app.config.get('TASK_ID_NODE')
+    if node is not None and not 0 <= node < _ID_NODES:
+        raise ValueError(f'TASK_ID_NODE must be between 0 and {_ID_NODES - 1}, got {node}')
+
+    binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+    for shard_id, uri in enumerate(uris):
+        binds[shard_bind_key(shard_id)] = uri
+    app.extensions['task_shards'] = ShardRouter(db, len(uris))
+
+    @app.teardown_appcontext
+    def close_shard_sessions(exc):
+        """Cierra las sesiones de los shards al terminar el contexto de aplicación."""
+        for session in g.pop('_task_shard_sessions', {}).values():
+            session.close()
+
+
+def get_shard_router():
+    """Enrutador de shards de la aplicación actual, o None si el sharding está desactivado."""
+    return current_app.extensions.get('task_shards')
+
+
+def task_session(user_id):
+    """
+    Sesión donde se almacenan las tareas de un usuario.
+
+    Args:
+        user_id (int): El ID del usuario.
+
+    Returns:
+        Session: La sesión de su shard, o `db.session` si el sharding está desactivado.
+    """
+    router = get_shard_router()
+    if router is None:
+        return current_app.extensions['sqlalchemy'].session
+    return router.session(router.shard_for(user_id))
+
+
+def task_sessions():
+    """Sesiones de todos los shards de tareas, o `[db.session]` si el sharding está desactivado."""
+    router = get_shard_router()
+    if router is None:
+        return [current_app.extensions['sqlalchemy'].session]
+    return router.sessions()
+
+
+def merge_sorted(results, key, limit=None):
+    """
+    Mezcla resultados ya ordenados de varios shards manteniendo el orden global.
+
+    Args:
+        results (List[Iterable]): Resultados de cada shard, ordenados por `key`.
+        key (Callable): Función que devuelve la clave de ordenación de cada elemento.
+        limit (int, opcional): Número máximo de elementos a devolver.
+
+    Returns:
+        List: Elementos mezclados en orden.
+    """
+    return list(itertools.islice(heapq.merge(*results, key=key), limit))
+
+
+def shard_metadata(*tables):
+    """
+    Copia las tablas indicadas en un `MetaData` propio sin claves foráneas.
+
+    Las tablas referenciadas (`users`, `categories`) viven en la base de datos global,
+    por lo que los shards no pueden declarar claves foráneas hacia ellas.
+
+    Returns:
+        MetaData: Metadatos listos para `create_all` en un shard.
+    """
+    metadata = MetaData()
+    for table in tables:
+        copy = table.to_metadata(metadata)
+        for constraint in list(copy.foreign_key_constraints):
+            copy.constraints.discard(constraint)
+        for column in copy.columns:
+            column.foreign_keys.clear()
+        copy.foreign_keys.clear()
+    return metadata
@@ -0,0 +1,47 @@
+def _is_pysqlite(connection):
+    """Indica si la conexión usa el controlador `pysqlite` (módulo `sqlite3` de la biblioteca estándar)."""
+    return connection.dialect.name == 'sqlite' and connection.dialect.driver == 'pysqlite'
+
+
+def begin_outer_transaction(connection):
+    """
+    Abre una transacción externa que se puede deshacer por completo, también con SQLite.
+
+    El controlador `pysqlite` no emite `BEGIN` hasta la primera escritura y confirma por su
+    cuenta antes de algunas sentencias, de modo que una transacción externa con savepoints
+    (lotes atómicos de `POST /batch`) no se deshace entera. En esas conexiones se desactiva la
+    gestión de transacciones de pysqlite y se emite `BEGIN` directamente al controlador (así no
+    cuenta como consulta en `@query_budget`), como recomienda la documentación de SQLAlchemy.
+
+    Solo se aplica a la conexión indicada: el resto de conexiones de SQLite siguen sin abrir
+    transacciones para las lecturas, que de otro modo bloquearían a los escritores. Debe
+    llamarse justo después de obtener la conexión del pool, y `end_outer_transaction` antes
+    de cerrarla.
+
+    Args:
+        connection (Connection): Conexión sin ninguna transacción en curso.
+
+    Returns:
+        RootTransaction: La transacción de SQLAlchemy, que se confirma o se deshace como siempre.
+    """
+    transaction = connection.begin()
+    if _is_pysqlite(connection):
+        dbapi_connection = connection.connection.dbapi_connection
+        connection.info['pysqlite_isolation_level'] = dbapi_connection.isolation_level
+        dbapi_connection.isolation_level = None
+        dbapi_connection.execute('BEGIN')
+    return transaction
+
+
+def end_outer_transaction(connection, transaction):
+    """
+    Deshace la transacción si sigue abierta y devuelve a pysqlite la gestión de transacciones.
+
+    Args:
+        connection (Connection): Conexión usada en `begin_outer_transaction`.
+        transaction (RootTransaction): Transacción devuelta por `begin_outer_transaction`.
+    """
+    if transaction.is_active:
+        transaction.rollback()
+    if 'pysqlite_isolation_level' in connection.info:
+        connection.connection.dbapi_connection.isolation_level = connection.info.pop('pysqlite_isolation_level')
@@ -0,0 +1,159 @@
+from flask import request
+from flask_restx import marshal
+from sqlalchemy import select, update
+from app import db
+
+
+class VersionConflictError(ValueError):
+    """
+    Excepción lanzada cuando una actualización condicionada por versión no se aplica
+    porque la fila fue modificada por otra escritura concurrente.
+
+    Atributos:
+        current_version (int): Versión actual de la fila en la base de datos.
+    """
+
+    def __init__(self, current_version):
+        super().__init__('Version conflict')
+        self.current_version = current_version
+
+
+def parse_if_match(value):
+    """Interpretar el encabezado ``If-Match`` de una petición.
+
+    Acepta ETags fuertes (``"3"``), débiles (``W/"3"``) y el comodín ``*``.
+
+    Args:
+        value (str): Valor del encabezado, o None si no se envió.
+
+    Returns:
+        int: La versión esperada, o None si no hay condición (encabezado ausente o ``*``).
+
+    Raises:
+        ValueError: Si el encabezado no contiene una versión válida.
+    """
+    if not value or value.strip() == '*':
+        return None
+
+    # Quitar el prefijo de ETag débil y las comillas
+    tag = value.strip()
+    if tag.startswith('W/'):
+        tag = tag[2:]
+    tag = tag.strip('"')
+
+    if not tag.isdigit():
+        raise ValueError('Invalid If-Match header')
+    return int(tag)
+
+
+def make_etag(version):
+    """Construir el valor del encabezado ``ETag`` a partir de una versión.
+
+    Args:
+        version (int): Versión de la fila.
+
+    Returns:
+        str: ETag entrecomillado, por ejemplo ``"3"``.
+    """
+    return f'"{version}"'
+
+
+def versioned_update(model, object_id, values, expected_version=None, fetch=True, session=None, criteria=()):
+    """Actualizar una fila con una única sentencia ``UPDATE`` con control optimista.
+
+    Ejecuta ``UPDATE ... SET ..., version = version + 1 WHERE id = :id [AND version = :v]``
+    sin cargar antes la fila. Si se pide la fila actualizada y el dialecto soporta
+    ``RETURNING``, se obtiene en la misma sentencia; si no, con un SELECT adicional.
+    No confirma la transacción.
+
+    Args:
+        model (db.Model): Modelo con columnas ``id`` y ``version``.
+        object_id (int): ID de la fila a actualizar.
+        values (dict): Columnas y nuevos valores.
+        expected_version (int, opcional): Versión que debe tener la fila para aplicar el cambio.
+        fetch (bool, opcional): Si es True, devuelve la instancia actualizada.
+        session (Session, opcional): Sesión en la que ejecutar la sentencia; por defecto `db.session`.
+        criteria (Iterable, opcional): Condiciones adicionales que debe cumplir la fila (por
+            ejemplo, que no esté borrada); si no las cumple se trata como inexistente.
+
+    Returns:
+        db.Model | int | None: La instancia actualizada si ``fetch`` es True; en caso contrario,
+        la nueva versión si se conoce sin consultas adicionales, o None.
+
+    Raises:
+        ValueError: Si la fila no existe.
+        VersionConflictError: Si la versión de la fila no coincide con ``expected_version``.
+    """
+    session = session or db.session
+    stmt = update(model).where(model.id == object_id, *criteria).values(version=model.version + 1, **values)
+    if expected_version is not None:
+        stmt = stmt.where(model.version == expected_version)
+
+    # No sincronizar la sesión con una consulta adicional: la fila se refresca vía RETURNING
+    stmt = stmt.execution_options(synchronize_session=False)
+    supports_returning = session.get_bind(mapper=model).dialect.update_returning
+
+    if fetch and supports_returning:
+        # Una sola ida y vuelta: la fila actualizada vuelve en la misma sentencia
+        stmt = stmt.returning(model).execution_options(populate_existing=True)
+        instance = session.execute(stmt).scalar_one_or_none()
+        if instance is not None:
+            return instance
+    elif supports_returning:
+        new_version = session.execute(stmt.returning(model.version)).scalar_one_or_none()
+        if new_version is not None:
+            return new_version
+    else:
+        if session.execute(stmt).rowcount:
+            if fetch:
+                return session.get(model, object_id, populate_existing=True)
+            return expected_version + 1 if expected_version is not None else None
+
+    # Ninguna fila afectada: distinguir entre fila inexistente y conflicto de versión
+    current_version = session.execute(
+        select(model.version).where(model.id == object_id, *criteria)
+    ).scalar_one_or_none()
+    if current_version is None:
+        raise ValueError(f'{model.__name__} not found')
+    raise VersionConflictError(current_version)
+
+
+def handle_conditional_patch(namespace, patch, object_id, response_model):
+    """Resolver una petición PATCH condicionada por versión.
+
+    La versión esperada se toma del encabezado ``If-Match`` (responde 412 si no coincide)
+    o del campo ``version`` del cuerpo (responde 409 si no coincide). Con
+    ``Prefer: return=minimal`` no se recupera la fila y se responde 204.
+
+    Args:
+        namespace (Namespace): Namespace de Flask-RESTX usado para abortar la petición.
+        patch (Callable): Método de servicio ``patch(object_id, changes, expected_version, fetch)``.
+        object_id (int): ID de la fila a actualizar.
+        response_model (Model): Modelo de salida para serializar la fila actualizada.
+
+    Returns:
+        tuple: Cuerpo, código de estado y encabezados de la respuesta.
+    """
+    data = request.get_json() or {}
+
+    # El encabezado If-Match tiene prioridad sobre la versión enviada en el cuerpo
+    try:
+        header_version = parse_if_match(request.headers.get('If-Match'))
+    except ValueError as e:
+        namespace.abort(400, str(e))
+    expected_version = header_version if header_version is not None else data.get('version')
+    fetch = 'return=minimal' not in request.headers.get('Prefer', '')
+
+    try:
+        result = patch(object_id, data, expected_version, fetch)
+    except VersionConflictError as e:
+        status = 412 if header_version is not None else 409
+        namespace.abort(status, str(e), current_version=e.current_version)
+    except ValueError as e:
+        status = 404 if str(e).endswith('not found') else 400
+        namespace.abort(status, str(e))
+
+    if not fetch:
+        headers = {'ETag': make_etag(result)} if result is not None else {}
+        return '', 204, headers
+    return marshal(result, response_model), 200, {'ETag': make_etag(result.version)}
@@ -0,0 +1,107 @@
+import logging
+import time
+
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up_app(app):
+    """
+    Prepara en el proceso maestro todo lo que no depende de conexiones abiertas.
+
+    Con `preload_app` los workers heredan este trabajo por copy-on-write en lugar de
+    repetirlo cada uno en su primera petición: configuración de los mapeadores de
+    SQLAlchemy, carga del backend de bcrypt y generación de la especificación Swagger.
+
+    Args:
+        app (Flask): La aplicación Flask ya creada.
+
+    Returns:
+        dict: Duración en milisegundos de cada paso.
+    """
+    from app import bcrypt
+
+    timings = {}
+
+    started = time.perf_counter()
+    configure_mappers()  # Resolver relaciones y backrefs de todos los modelos
+    timings['mappers'] = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    bcrypt.generate_password_hash('warm-up', rounds=4)  # Cargar la extensión C de bcrypt
+    timings['bcrypt'] = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    api = app.extensions['restx_api']
+    with app.test_request_context('/'):
+        api.__schema__  # Flask-RESTX guarda la especificación generada en el objeto Api
+    timings['swagger'] = (time.perf_counter() - started) * 1000
+
+    logger.info('Application warm-up: %s', ', '.join(f'{k}={v:.1f}ms' for k, v in timings.items()))
+    return timings
+
+
+def reset_after_fork(app):
+    """
+    Reinicia en un worker recién creado el estado por proceso heredado del maestro.
+
+    Con `preload_app` el worker hereda la memoria del maestro: conexiones abiertas, el
+    generador de IDs de tareas, los pools de hilos y el barrido periódico de tareas
+    vencidas. Las conexiones se olvidan sin cerrarlas (siguen siendo del maestro) y el
+    resto se vuelve a crear bajo demanda en el worker.
+
+    Args:
+        app (Flask): La aplicación Flask.
+    """
+    from app import db
+    from app.jobs.overdue_sweep import reset_overdue_sweeper
+    from app.jobs.user_purge import reset_purge_executor
+    from app.utils.sharding import reset_task_id_generator
+
+    with app.app_context():
+        engines = list(db.engines.values())
+    replicas = app.extensions.get('db_replicas')
+    if replicas is not None:
+        engines += replicas.engines
+    for engine in engines:
+        engine.dispose(close=False)  # Olvidar las conexiones heredadas del proceso maestro
+
+    # Los pools de hilos heredados no tienen hilos en el hijo: se recrean bajo demanda
+    app.extensions.pop('batch_executor', None)
+    reset_purge_executor()
+    reset_overdue_sweeper()
+    reset_task_id_generator()
+
+
+def prime_connection_pool(app, connections):
+    """
+    Abre de antemano `connections` conexiones en el pool de cada motor del worker actual.
+
+    Debe llamarse después del fork: las conexiones no pueden compartirse entre procesos,
+    así que primero se descartan las heredadas del maestro sin cerrarlas.
+
+    Args:
+        app (Flask): La aplicación Flask.
+        connections (int): Número de conexiones a abrir por motor.
+
+    Returns:
+        float: Duración en milisegundos.
+    """
+    from app import db
+
+    started = time.perf_counter()
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)  # Olvidar las conexiones heredadas del proceso maestro
+
+            # Abrir todas las conexiones a la vez para que queden en el pool al devolverlas
+            opened = [engine.connect() for _ in range(connections)]
+            for connection in opened:
+                connection.execute(text('SELECT 1'))
+                connection.close()
+
+    elapsed = (time.perf_counter() - started) * 1000
+    logger.info('Connection pool primed with %d connections per engine in %.1fms', connections, elapsed)
+    return elapsed
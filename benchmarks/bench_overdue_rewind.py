@@ -0,0 +1,131 @@
+"""
+Benchmark del retroceso de la marca de agua del barrido de tareas vencidas.
+
+Cada creación o modificación de una tarea con una fecha límite pasada llama a
+`rewind_overdue_watermark`, que lee la única fila de marca de agua de su shard y estado y
+solo la actualiza si el barrido ya ha superado esa fecha. Siembra una base de datos SQLite
+temporal y mide, con varios hilos llamando a la vez, el coste por llamada de cada caso:
+  - future: fecha límite futura, no consulta la base de datos,
+  - behind: la marca de agua va por detrás de la fecha (el caso habitual), solo lee,
+  - ahead: la marca de agua ha superado la fecha, lee y actualiza,
+  - old-behind / old-ahead: los dos últimos casos con la implementación anterior, que
+    lanzaba el UPDATE (y el COMMIT) sobre la fila en todas las llamadas.
+
+Uso:
+    python benchmarks/bench_overdue_rewind.py --calls 2000 --threads 1 4
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+STATUS = 'pending'
+
+
+def configure(database_path):
+    """Apuntar la configuración a la base de datos del benchmark antes de crear la aplicación."""
+    from app.config import Config
+    Config.SQLALCHEMY_DATABASE_URI = f'sqlite:///{database_path}'
+    Config.SQLALCHEMY_ECHO = False
+    Config.SQLALCHEMY_REPLICA_URIS = []
+    Config.TASK_SHARD_URIS = []
+
+
+def set_watermark(db, position):
+    """Guardar la marca de agua del shard 0 y el estado barrido en `position`."""
+    from app.jobs.overdue_sweep import _watermark_name
+    from app.models.sweep_watermark import SweepWatermark
+
+    db.session.merge(SweepWatermark(name=_watermark_name(0, STATUS), position=position, last_id=0))
+    db.session.commit()
+
+
+def always_update(shard_id, status, due_date):
+    """Implementación anterior: UPDATE condicional y COMMIT en cada llamada con fecha pasada."""
+    from sqlalchemy import update
+    from app import db
+    from app.jobs.overdue_sweep import _watermark_name
+    from app.models.sweep_watermark import SweepWatermark
+
+    db.session.execute(
+        update(SweepWatermark)
+        .where(SweepWatermark.name == _watermark_name(shard_id, status), SweepWatermark.position >= due_date)
+        .values(position=due_date, last_id=0, updated_at=datetime.utcnow())
+    )
+    db.session.commit()
+
+
+def run_case(app, rewind, due_date, calls, threads):
+    """Llamar `calls` veces a `rewind` repartidas entre `threads` hilos; devuelve las latencias en µs."""
+    from app.utils.query_budget import QueryCounter
+
+    latencies, queries = [], []
+    lock = threading.Lock()
+
+    def worker(count):
+        local, counted = [], 0
+        with app.app_context():
+            for _ in range(count):
+                with QueryCounter() as counter:
+                    started = time.perf_counter()
+                    rewind(0, STATUS, due_date)
+                    local.append((time.perf_counter() - started) * 1e6)
+                counted += counter.count
+        with lock:
+            latencies.extend(local)
+            queries.append(counted)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for future in [executor.submit(worker, calls // threads) for _ in range(threads)]:
+            future.result()
+    elapsed = time.perf_counter() - started
+    return latencies, sum(queries) / len(latencies), len(latencies) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=2000, help='Llamadas por caso.')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4], help='Hilos concurrentes.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        configure(os.path.join(tmp, 'rewind.db'))
+        from app import create_app, db
+        from app.jobs.overdue_sweep import rewind_overdue_watermark
+
+        app = create_app()
+        now = datetime.utcnow()
+        due_date = now - timedelta(days=1)
+        cases = [
+            # (nombre, función, fecha límite, posición de la marca de agua)
+            ('future', rewind_overdue_watermark, now + timedelta(days=1), now - timedelta(days=30)),
+            ('behind', rewind_overdue_watermark, due_date, now - timedelta(days=30)),
+            ('ahead', rewind_overdue_watermark, due_date, now),
+            ('old-behind', always_update, due_date, now - timedelta(days=30)),
+            ('old-ahead', always_update, due_date, now),
+        ]
+        with app.app_context():
+            db.create_all()
+
+        print(f'{"case":<14} {"threads":>7} {"queries":>8} {"p50 us":>9} {"p99 us":>9} {"calls/s":>9}')
+        for threads in args.threads:
+            for name, rewind, due, position in cases:
+                with app.app_context():
+                    set_watermark(db, position)
+                latencies, queries, throughput = run_case(app, rewind, due, args.calls, threads)
+                p99 = statistics.quantiles(latencies, n=100)[98]
+                print(f'{name:<14} {threads:>7} {queries:>8.1f} {statistics.median(latencies):>9.1f} '
+                      f'{p99:>9.1f} {throughput:>9.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""
+Benchmark de los modos de ejecución síncrono (WSGI, run.py) y asíncrono (ASGI, run_async.py).
+
+Siembra una base de datos SQLite temporal, levanta cada modo en su propio proceso y lanza
+`GET /tasks/` con muchos clientes concurrentes, midiendo el rendimiento (peticiones por
+segundo), la latencia (p50/p99) y los errores.
+
+Uso:
+    python benchmarks/bench_serving_modes.py --concurrency 50 200 500 --requests 2000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def configure(database_path):
+    """Apuntar la configuración a la base de datos del benchmark antes de crear la aplicación."""
+    from app.config import Config
+    Config.SQLALCHEMY_DATABASE_URI = f'sqlite:///{database_path}'
+    Config.SQLALCHEMY_ECHO = False
+
+
+def seed(database_path, tasks):
+    """Crear las tablas y sembrar un usuario, categorías y `tasks` tareas; devuelve un token JWT."""
+    configure(database_path)
+    from flask_jwt_extended import create_access_token
+    from app import create_app, db
+    from app.models.category import Category
+    from app.models.task import Task, task_category
+    from app.models.user import User
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        user = User('bench', 'bench@example.com', 'bench')
+        categories = [Category(f'category-{i}') for i in range(5)]
+        db.session.add(user)
+        db.session.add_all(categories)
+        db.session.commit()
+
+        db.session.execute(Task.__table__.insert(), [
+            {'title': f'task-{i}', 'status': 'pending', 'user_id': user.id, 'version': 1} for i in range(tasks)
+        ])
+        db.session.execute(task_category.insert(), [
+            {'task_id': i + 1, 'category_id': categories[i % 5].id} for i in range(tasks)
+        ])
+        db.session.commit()
+        return create_access_token(identity=user.id)
+
+
+def serve(mode, database_path, port):
+    """Levantar la aplicación en el modo indicado (se ejecuta en un subproceso)."""
+    configure(database_path)
+    if mode == 'wsgi':
+        from werkzeug.serving import run_simple
+        from app import create_app
+        run_simple('127.0.0.1', port, create_app(), threaded=True)
+    else:
+        import uvicorn
+        from app.asgi import create_asgi_app
+        uvicorn.run(create_asgi_app(), host='127.0.0.1', port=port, log_level='warning', backlog=4096)
+
+
+async def fetch(port, path, token):
+    """Hacer una petición HTTP/1.1 con `Connection: close` y devolver el código de estado."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(
+        f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nAuthorization: Bearer {token}\r\n'
+        f'Connection: close\r\n\r\n'.encode()
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return int(response.split(b' ', 2)[1])
+
+
+async def load(port, path, token, concurrency, total):
+    """Lanzar `total` peticiones con `concurrency` clientes simultáneos."""
+    latencies, errors = [], 0
+    remaining = iter(range(total))
+
+    async def client():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                status = await fetch(port, path, token)
+            except OSError:
+                status = None
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'rps': total / elapsed,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p99_ms': latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        'errors': errors,
+    }
+
+
+def wait_for_port(port, timeout=30):
+    """Esperar a que el servidor acepte conexiones."""
+    import socket
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'Server on port {port} did not start')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[50, 200, 500])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--tasks', type=int, default=50, help='Tareas sembradas (tamaño de cada respuesta).')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--serve', choices=['wsgi', 'asgi'], help=argparse.SUPPRESS)
+    parser.add_argument('--database', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.database, args.port)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_path = os.path.join(tmp, 'bench.db')
+        token = seed(database_path, args.tasks)
+
+        print(f'{"mode":<6} {"clients":>8} {"req/s":>10} {"p50 ms":>10} {"p99 ms":>10} {"errors":>8}')
+        for mode in ('wsgi', 'asgi'):
+            server = subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), '--serve', mode,
+                 '--database', database_path, '--port', str(args.port)],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            try:
+                wait_for_port(args.port)
+                for concurrency in args.concurrency:
+                    result = asyncio.run(load(args.port, '/tasks/', token, concurrency, args.requests))
+                    print(f'{mode:<6} {concurrency:>8} {result["rps"]:>10.1f} {result["p50_ms"]:>10.1f} '
+                          f'{result["p99_ms"]:>10.1f} {result["errors"]:>8}')
+            finally:
+                server.terminate()
+                server.wait()
+
+
+if __name__ == '__main__':
+    main()
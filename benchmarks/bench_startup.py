@@ -0,0 +1,140 @@
+"""
+Mide el arranque del servidor de producción (gunicorn.conf.py + wsgi.py).
+
+Para cada variante (con y sin precalentamiento, con y sin preload) levanta gunicorn contra
+una base de datos SQLite sembrada y registra el tiempo hasta la primera respuesta correcta,
+la latencia de la primera petición a Swagger y a un endpoint con base de datos, y la memoria
+de cada worker (RSS y PSS, que reparte las páginas compartidas por copy-on-write).
+
+Uso:
+    python benchmarks/bench_startup.py --workers 4 --threads 4
+"""
+import argparse
+import importlib
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+VARIANTS = [
+    ('preload+warmup', {'GUNICORN_PRELOAD': 'true', 'APP_WARMUP': 'true'}),
+    ('preload', {'GUNICORN_PRELOAD': 'true', 'APP_WARMUP': 'false'}),
+    ('no-preload', {'GUNICORN_PRELOAD': 'false', 'APP_WARMUP': 'false'}),
+]
+
+# Las peticiones van siempre a 127.0.0.1: ignorar cualquier proxy configurado en el entorno
+_opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+
+
+def seed(database_path):
+    """Crear las tablas y un usuario; devuelve un token JWT para los endpoints protegidos."""
+    from app.config import Config
+    Config.SQLALCHEMY_DATABASE_URI = f'sqlite:///{database_path}'
+    Config.SQLALCHEMY_ECHO = False
+    from flask_jwt_extended import create_access_token
+    from app import create_app, db
+    from app.models.user import User
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        user = User('bench', 'bench@example.com', 'bench')
+        db.session.add(user)
+        db.session.commit()
+        return create_access_token(identity=user.id)
+
+
+def timed_get(url, token=None, timeout=30):
+    """Hacer una petición GET y devolver (código de estado, milisegundos)."""
+    request = urllib.request.Request(url, headers={'Authorization': f'Bearer {token}'} if token else {})
+    started = time.perf_counter()
+    with _opener.open(request, timeout=timeout) as response:
+        response.read()
+        return response.status, (time.perf_counter() - started) * 1000
+
+
+def memory_kb(pid):
+    """RSS y PSS de un proceso en KB, leídos de /proc/<pid>/smaps_rollup (Linux)."""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            key, _, rest = line.partition(':')
+            if key in ('Rss', 'Pss'):
+                values[key] = int(rest.split()[0])
+    return values['Rss'], values['Pss']
+
+
+def children(pid):
+    """PIDs de los procesos hijos (workers) del maestro de gunicorn."""
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(child) for child in f.read().split()]
+
+
+def run_variant(name, env, args, database_path, token):
+    """Arrancar gunicorn con una variante de configuración y medir el arranque."""
+    env = {
+        **os.environ, **env,
+        'BIND': f'127.0.0.1:{args.port}',
+        'WEB_CONCURRENCY': str(args.workers),
+        'GUNICORN_THREADS': str(args.threads),
+        'DATABASE_URL_OVERRIDE': database_path,
+    }
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'benchmarks.bench_startup:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        base = f'http://127.0.0.1:{args.port}'
+        while True:
+            try:
+                _, swagger_ms = timed_get(f'{base}/swagger.json')
+                break
+            except OSError:
+                if time.perf_counter() - started > 60:
+                    raise RuntimeError('gunicorn did not start')
+                time.sleep(0.05)
+        ready_ms = (time.perf_counter() - started) * 1000
+        _, db_ms = timed_get(f'{base}/users/me', token)
+
+        # Esperar a que todos los workers estén listos antes de medir su memoria
+        time.sleep(1)
+        workers = [memory_kb(pid) for pid in children(server.pid)]
+        rss = sum(r for r, _ in workers) / len(workers) / 1024
+        pss = sum(p for _, p in workers) / len(workers) / 1024
+        print(f'{name:<16} {ready_ms:>10.0f} {swagger_ms:>12.1f} {db_ms:>10.1f} {rss:>10.1f} {pss:>10.1f}')
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--port', type=int, default=8766)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_path = os.path.join(tmp, 'bench.db')
+        token = seed(database_path)
+
+        print(f'{"variant":<16} {"ready ms":>10} {"1st swagger":>12} {"1st db ms":>10} {"RSS MB":>10} {"PSS MB":>10}')
+        for name, env in VARIANTS:
+            run_variant(name, env, args, database_path, token)
+
+
+# Aplicación servida por gunicorn durante el benchmark: wsgi.py apuntando a la base sembrada
+if os.environ.get('DATABASE_URL_OVERRIDE'):
+    from app.config import Config
+    Config.SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.environ['DATABASE_URL_OVERRIDE']}"
+    Config.SQLALCHEMY_ECHO = False
+    app = importlib.import_module('wsgi').app
+
+if __name__ == '__main__':
+    main()
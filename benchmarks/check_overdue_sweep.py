@@ -0,0 +1,158 @@
+"""
+Comprobación de extremo a extremo del barrido de tareas vencidas.
+
+Crea la aplicación sobre SQLite temporal (con --shards, también con shards de tareas), crea
+y modifica tareas a través de la API y ejecuta `sweep_overdue_tasks` entre cada paso, en
+lotes pequeños para recorrer también la paginación por clave. Comprueba que cada barrido
+anuncia con `overdue_tasks_flagged` justo las tareas que acaban de vencer y que
+`GET /tasks/` devuelve su `overdue_at`, también cuando la tarea queda por detrás de la
+marca de agua:
+  - una tarea que se vuelve a abrir tras completarse,
+  - una tarea creada con una fecha límite ya pasada,
+  - una fecha límite adelantada con PATCH.
+
+El barrido se ejecuta sin ventana de retroceso (`OVERDUE_SWEEP_LOOKBACK=0`), que de otro modo
+ocultaría las tareas que la marca de agua se salta.
+
+Falla (código de salida 1) si alguna comprobación no se cumple.
+
+Uso:
+    python benchmarks/check_overdue_sweep.py
+    python benchmarks/check_overdue_sweep.py --shards 2
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def configure(database_uri, shard_uris):
+    """Apuntar la configuración a las bases de datos temporales antes de crear la aplicación."""
+    from app.config import Config
+    Config.SQLALCHEMY_DATABASE_URI = database_uri
+    Config.SQLALCHEMY_ECHO = False
+    Config.SQLALCHEMY_REPLICA_URIS = []
+    Config.TASK_SHARD_URIS = shard_uris
+    Config.QUERY_BUDGETS_ENFORCED = True
+    Config.OVERDUE_SWEEP_LOOKBACK = 0
+    Config.OVERDUE_SWEEP_INTERVAL = 0
+
+
+def seed(db, users):
+    """Crear las tablas (también en los shards) y sembrar los usuarios."""
+    from werkzeug.security import generate_password_hash
+    from app.models.task import Task, task_category
+    from app.models.user import User
+    from app.utils.sharding import get_shard_router, shard_metadata
+
+    db.create_all()
+    router = get_shard_router()
+    if router is not None:
+        metadata = shard_metadata(Task.__table__, task_category)
+        for shard_id in range(router.shard_count):
+            metadata.create_all(router.engine(shard_id))
+
+    password_hash = generate_password_hash('secret')
+    db.session.execute(User.__table__.insert(), [
+        {'username': f'user{i}', 'email': f'user{i}@example.com', 'password_hash': password_hash, 'version': 1}
+        for i in range(1, users + 1)
+    ])
+    db.session.commit()
+
+
+def due_in(days):
+    """Fecha límite en formato ISO 8601 a `days` días de ahora (negativo: ya pasada)."""
+    return (datetime.utcnow() + timedelta(days=days)).isoformat(timespec='seconds')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--shards', type=int, default=0, help='Número de shards de tareas (0: sin sharding).')
+    parser.add_argument('--users', type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        configure(
+            f"sqlite:///{os.path.join(tmp, 'sweep.db')}",
+            [f"sqlite:///{os.path.join(tmp, f'shard{i}.db')}" for i in range(args.shards)],
+        )
+        from flask_jwt_extended import create_access_token
+        from app import create_app, db
+        from app.jobs.overdue_sweep import overdue_tasks_flagged, sweep_overdue_tasks
+
+        app = create_app()
+        with app.app_context():
+            seed(db, args.users)
+            tokens = [
+                {'Authorization': f'Bearer {create_access_token(identity=user_id)}'}
+                for user_id in range(1, args.users + 1)
+            ]
+        client = app.test_client()
+        owners, announced, failures = {}, [], []
+
+        def on_flagged(sender, tasks, **kwargs):
+            announced.extend(task['id'] for task in tasks)
+
+        overdue_tasks_flagged.connect(on_flagged, app)
+
+        def create(title, days):
+            """Crear una tarea con un propietario distinto cada vez, para repartirlas entre shards."""
+            headers = tokens[len(owners) % len(tokens)]
+            response = client.post('/tasks/', json={'title': title, 'due_date': due_in(days)}, headers=headers)
+            assert response.status_code == 201, response.get_json()
+            task_id = int(response.get_json()['id'])
+            owners[task_id] = headers
+            return task_id
+
+        def patch(task_id, body, minimal=False):
+            headers = dict(owners[task_id], **({'Prefer': 'return=minimal'} if minimal else {}))
+            response = client.patch(f'/tasks/{task_id}', json=body, headers=headers)
+            assert response.status_code in (200, 204), response.get_json()
+
+        def sweep():
+            """Ejecutar un barrido y devolver las tareas anunciadas por la señal."""
+            announced.clear()
+            with app.app_context():
+                flagged = sweep_overdue_tasks(batch_size=2)
+            assert flagged == len(announced)
+            return sorted(announced)
+
+        def overdue():
+            response = client.get('/tasks/?limit=1000', headers=tokens[0])
+            return sorted(int(task['id']) for task in response.get_json() if task['overdue_at'])
+
+        def check(description, actual, expected):
+            ok = actual == expected
+            print(f"{'OK  ' if ok else 'FAIL'}  {description}: {actual}" + ('' if ok else f' (expected {expected})'))
+            if not ok:
+                failures.append(description)
+
+        past = [create(f'past {i}', -i) for i in range(1, 4)]
+        future = create('future', 2)
+        completed = create('completed', -5)
+        patch(completed, {'status': 'completed'})
+        check('first sweep flags the overdue pending tasks', sweep(), sorted(past))
+        check('GET /tasks/ returns overdue_at', overdue(), sorted(past))
+
+        patch(completed, {'status': 'pending'}, minimal=True)
+        check('reopened task behind the watermark is flagged', sweep(), [completed])
+
+        created_late = create('created late', -10)
+        check('task created behind the watermark is flagged', sweep(), [created_late])
+
+        patch(future, {'due_date': due_in(-20)})
+        check('due date moved behind the watermark is flagged', sweep(), [future])
+
+        check('nothing is flagged twice', sweep(), [])
+        check('GET /tasks/ returns every overdue task', overdue(), sorted(past + [completed, created_late, future]))
+
+    print(f'\n{len(failures)} failures')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
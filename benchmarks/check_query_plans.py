@@ -0,0 +1,281 @@
+"""
+Comprobación de presupuestos de consultas y de planes de ejecución de los servicios.
+
+Siembra una base de datos SQLite temporal, ejecuta cada escenario de `scenarios()` sobre
+los servicios reales con `QUERY_BUDGETS_ENFORCED` activado y captura todas sus sentencias
+SQL. Después obtiene el `EXPLAIN QUERY PLAN` de cada una y lo compara con la línea base
+versionada en `benchmarks/query_plans.json`.
+
+Solo hay línea base para SQLite. Los presupuestos de los motores sin
+`UPDATE ... RETURNING` (MySQL), donde las actualizaciones que devuelven la fila la releen
+con un SELECT, se comprueban con --without-returning.
+
+Falla (código de salida 1) si:
+  - un método de servicio supera su presupuesto de consultas (`@query_budget`),
+  - un escenario lanza una excepción,
+  - el plan de una consulta conocida cambia respecto a la línea base,
+  - una consulta nueva recorre una tabla completa (full scan).
+
+Tras revisar los cambios, regenera la línea base con --update-baseline.
+
+Uso:
+    python benchmarks/check_query_plans.py
+    python benchmarks/check_query_plans.py --without-returning
+    python benchmarks/check_query_plans.py --update-baseline
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import traceback
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BASELINE_PATH = os.path.join(ROOT, 'benchmarks', 'query_plans.json')
+
+# Sentencias cuyo plan interesa; los INSERT ... VALUES y el control de transacciones no tienen plan
+_EXPLAINABLE = re.compile(r'^\s*(SELECT|UPDATE|DELETE|INSERT\s+INTO\s+\S+\s*\([^)]*\)\s*SELECT)', re.IGNORECASE)
+
+# Listas de parámetros de IN (...) expandidas: su longitud depende de los datos, no de la consulta
+_EXPANDED_IN = re.compile(r'IN \((?:\?|%s|%\(\w+\)s)(?:,\s*(?:\?|%s|%\(\w+\)s))*\)', re.IGNORECASE)
+
+
+def configure(database_uri):
+    """Apuntar la configuración a la base de datos del harness antes de crear la aplicación."""
+    from app.config import Config
+    Config.SQLALCHEMY_DATABASE_URI = database_uri
+    Config.SQLALCHEMY_ECHO = False
+    Config.SQLALCHEMY_REPLICA_URIS = []
+    Config.TASK_SHARD_URIS = []
+    Config.QUERY_BUDGETS_ENFORCED = True
+    Config.USER_PURGE_ASYNC = True
+
+
+def seed(db, users, categories, tasks):
+    """Crear las tablas y sembrar usuarios, categorías y tareas con sus asociaciones."""
+    from datetime import datetime, timedelta
+    from werkzeug.security import generate_password_hash
+    from app.models.category import Category
+    from app.models.task import Task, task_category
+    from app.models.user import User
+
+    db.create_all()
+    password_hash = generate_password_hash('secret')
+    now = datetime.utcnow()
+    db.session.execute(User.__table__.insert(), [
+        {'username': f'user{i}', 'email': f'user{i}@example.com', 'password_hash': password_hash, 'version': 1}
+        for i in range(1, users + 1)
+    ])
+    db.session.execute(Category.__table__.insert(), [
+        {'name': f'category{i}', 'version': 1} for i in range(1, categories + 1)
+    ])
+    db.session.execute(Task.__table__.insert(), [
+        {'id': i, 'title': f'task{i}', 'status': ('pending', 'completed')[i % 2], 'user_id': i % users + 1,
+         'due_date': now + timedelta(days=i % 30 - 15), 'version': 1}
+        for i in range(1, tasks + 1)
+    ])
+    db.session.execute(task_category.insert(), [
+        {'task_id': i, 'category_id': i % categories + 1} for i in range(1, tasks + 1)
+    ])
+    db.session.commit()
+
+
+def scenarios():
+    """
+    Escenarios del harness: nombre y llamada a un método de servicio sobre los datos sembrados.
+
+    `UserService.create_user` no se incluye porque construye `User(password_hash=...)`, que
+    el modelo no admite; la búsqueda por `username`/`email` queda cubierta por el resto.
+    """
+    from app.jobs.overdue_sweep import sweep_overdue_tasks
+    from app.services.category_service import CategoryService
+    from app.services.task_service import TaskService
+    from app.services.user_service import UserService
+
+    return [
+        # Usuarios: User.query.filter_by(id=/username=/email=)
+        ('UserService.get_user_by_id', lambda: UserService.get_user_by_id(1)),
+        ('UserService.get_user_by_username', lambda: UserService.get_user_by_username('user2')),
+        ('UserService.authenticate_user', lambda: UserService.authenticate_user('user3', 'secret')),
+        ('UserService.update_user', lambda: UserService.update_user(4, username='user4b', email='user4b@example.com')),
+        ('UserService.patch_user', lambda: UserService.patch_user(5, {'email': 'user5b@example.com'}, expected_version=1)),
+        ('UserService.get_all_users', lambda: UserService.get_all_users()),
+        ('UserService.delete_user', lambda: UserService.delete_user(6)),
+        # Categorías: Category.query.filter_by(name=) y upserts por nombre
+        ('CategoryService.create_category', lambda: CategoryService.create_category('new-category')),
+        ('CategoryService.get_or_create_categories',
+         lambda: CategoryService.get_or_create_categories(['category1', 'category2', 'fresh-category'])),
+        ('CategoryService.get_category_ids_by_names',
+         lambda: CategoryService.get_category_ids_by_names(['category3', 'category4'])),
+        ('CategoryService.update_category', lambda: CategoryService.update_category(5, 'category5b')),
+        ('CategoryService.patch_category', lambda: CategoryService.patch_category(6, {'name': 'category6b'}, 1)),
+        ('CategoryService.get_all_categories', lambda: CategoryService.get_all_categories()),
+        # Tareas: Category.id.in_(...) al asociar categorías, cursores y agregados
+        ('TaskService.create_task', lambda: TaskService.create_task(
+            'new task', None, None, 1, category_ids=[1, 2], category_names=['category3', 'another-category'],
+            create_categories=True)),  # Caso más caro: un administrador que nombra una categoría nueva
+        ('TaskService.update_task', lambda: TaskService.update_task(10, title='task10b', category_ids=[1, 3, 4])),
+        ('TaskService.patch_task', lambda: TaskService.patch_task(11, {'title': 'task11b'}, expected_version=1)),
+        # Como en los endpoints masivos: solo las tareas del usuario (la 12 es del usuario 13)
+        ('TaskService.add_categories_to_tasks',
+         lambda: TaskService.add_categories_to_tasks([12, 13, 14], [1, 2], user_id=13)),
+        ('TaskService.remove_categories_from_tasks',
+         lambda: TaskService.remove_categories_from_tasks([12, 13, 14], [1], user_id=13)),
+        ('TaskService.get_all_tasks', lambda: TaskService.get_all_tasks(after_id=100, limit=20)),
+        ('TaskService.get_task_stats', lambda: TaskService.get_task_stats()),
+        ('TaskService.mark_task_status', lambda: TaskService.mark_task_status(15, 'in-progress')),
+        ('TaskService.delete_task', lambda: TaskService.delete_task(16)),
+        # Barrido de vencidas: recorrido del índice (status, due_date) desde la marca de agua
+        ('overdue_sweep.sweep_overdue_tasks', lambda: sweep_overdue_tasks(batch_size=100, max_batches=2)),
+    ]
+
+
+def normalize_sql(statement):
+    """Clave estable de una sentencia: espacios colapsados y listas IN (...) de longitud variable."""
+    return _EXPANDED_IN.sub('IN (...)', ' '.join(statement.split()))
+
+
+def explain(connection, statement, parameters):
+    """
+    Obtiene el plan de una sentencia con `EXPLAIN QUERY PLAN` de SQLite.
+
+    Returns:
+        Tuple[List[str], bool]: Líneas del plan y si recorre alguna tabla completa.
+    """
+    if isinstance(parameters, list):  # executemany: basta con el plan de la primera fila
+        parameters = parameters[0]
+
+    rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+    plan = [row[-1] for row in rows]
+    # SQLite distingue SEARCH (por índice) de SCAN (recorrido completo de la tabla o del índice)
+    return plan, any(line.startswith('SCAN ') for line in plan)
+
+
+def run(app, db):
+    """
+    Ejecuta todos los escenarios y obtiene el plan de cada consulta.
+
+    Returns:
+        Tuple[dict, List[str]]: Consultas y planes por escenario, y errores encontrados
+        (presupuestos superados y excepciones).
+    """
+    from app.utils.query_budget import QueryBudgetExceeded, QueryCounter
+
+    results, errors = {}, []
+    for name, call in scenarios():
+        with app.app_context():
+            with QueryCounter() as counter:
+                try:
+                    call()
+                except QueryBudgetExceeded as e:
+                    errors.append(f'BUDGET   {name}: {e}')
+                except Exception:
+                    errors.append(f'ERROR    {name}:\n{traceback.format_exc()}')
+            db.session.rollback()
+
+            # Obtener los planes con una conexión nueva del mismo motor de cada sentencia
+            queries, seen = [], set()
+            for connection, statement, parameters in counter.statements:
+                sql = normalize_sql(statement)
+                if not _EXPLAINABLE.match(statement) or sql in seen:
+                    continue
+                seen.add(sql)
+                with connection.engine.connect() as explain_connection:
+                    plan, full_scan = explain(explain_connection, statement, parameters)
+                queries.append({'sql': sql, 'plan': plan, 'full_scan': full_scan})
+            results[name] = {'queries': len(counter.statements), 'plans': queries}
+    return results, errors
+
+
+def compare(results, baseline):
+    """
+    Compara los planes obtenidos con la línea base.
+
+    Returns:
+        Tuple[List[str], List[str]]: Fallos y avisos.
+    """
+    failures, warnings = [], []
+    for name, result in results.items():
+        known = {query['sql']: query for query in baseline.get(name, {}).get('plans', [])}
+        for query in result['plans']:
+            previous = known.pop(query['sql'], None)
+            if previous is None:
+                if query['full_scan']:
+                    failures.append(f"FULLSCAN {name}: {query['sql']}\n           {' | '.join(query['plan'])}")
+                else:
+                    warnings.append(f"NEW      {name}: {query['sql']}")
+            elif previous['plan'] != query['plan']:
+                failures.append(
+                    f"PLAN     {name}: {query['sql']}\n"
+                    f"           before: {' | '.join(previous['plan'])}\n"
+                    f"           now:    {' | '.join(query['plan'])}"
+                )
+            elif query['full_scan']:
+                warnings.append(f"KNOWN    {name}: full scan accepted in baseline: {query['sql']}")
+        for sql in known:
+            warnings.append(f'GONE     {name}: {sql}')
+    return failures, warnings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true', help='Guardar los planes actuales como línea base.')
+    parser.add_argument('--without-returning', action='store_true',
+                        help='Desactivar UPDATE ... RETURNING, como en MySQL, para comprobar sus presupuestos.')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--categories', type=int, default=20)
+    parser.add_argument('--tasks', type=int, default=2000)
+    args = parser.parse_args()
+    if args.update_baseline and args.without_returning:
+        parser.error('the baseline is recorded with the real SQLite dialect: drop --without-returning')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        configure(f"sqlite:///{os.path.join(tmp, 'plans.db')}")
+        from app import create_app, db
+
+        app = create_app()
+        with app.app_context():
+            seed(db, args.users, args.categories, args.tasks)
+            dialect = db.engine.dialect.name
+            if args.without_returning:
+                # `versioned_update` consulta esta capacidad del dialecto en cada llamada
+                db.engine.dialect.update_returning = False
+
+        results, errors = run(app, db)
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baselines = json.load(f)
+
+    if args.update_baseline:
+        baselines[dialect] = results
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'Baseline for {dialect} written to {args.baseline} ({len(results)} scenarios)')
+        for error in errors:
+            print(error)
+        return 1 if errors else 0
+
+    if dialect not in baselines:
+        print(f'No baseline for {dialect}: run with --update-baseline first')
+        return 1
+
+    failures, warnings = compare(results, baselines[dialect])
+    for line in warnings:
+        print(line)
+    for line in errors + failures:
+        print(line)
+
+    total = sum(len(result['plans']) for result in results.values())
+    print(f'\n{len(results)} scenarios, {total} distinct queries, {len(errors) + len(failures)} failures')
+    return 1 if errors or failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""
+Informe del arranque en frío de la aplicación.
+
+Lanza varios intérpretes nuevos y mide en cada uno las fases del arranque: importar el
+paquete `app`, `create_app()`, la primera petición a `/swagger.json` y la primera petición
+con base de datos (mediana de todas las ejecuciones). Después ejecuta una vez más con
+`python -X importtime` y desglosa el tiempo de importación por paquete y por cada módulo
+que importa directamente la aplicación.
+
+Uso:
+    python benchmarks/profile_startup.py --runs 10 --top 15
+"""
+import argparse
+import collections
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Código que ejecuta cada intérprete medido; imprime la duración de cada fase en JSON
+PHASES_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {root!r})
+timings = {{}}
+
+mark = time.perf_counter()
+from app.config import Config
+Config.SQLALCHEMY_DATABASE_URI = 'sqlite:///{database}'
+Config.SQLALCHEMY_ECHO = False
+from app import create_app
+timings['import app'] = time.perf_counter() - mark
+
+mark = time.perf_counter()
+app = create_app()
+timings['create_app()'] = time.perf_counter() - mark
+
+client = app.test_client()
+mark = time.perf_counter()
+assert client.get('/swagger.json').status_code == 200
+timings['1st /swagger.json'] = time.perf_counter() - mark
+
+mark = time.perf_counter()
+assert client.get('/categories/', headers={{'Authorization': 'Bearer {token}'}}).status_code == 200
+timings['1st db request'] = time.perf_counter() - mark
+
+timings['total'] = time.perf_counter() - started
+print(json.dumps(timings))
+"""
+
+
+def seed(database_path):
+    """Crear las tablas en una base de datos SQLite temporal; devuelve un token JWT."""
+    script = f"""
+import sys
+sys.path.insert(0, {ROOT!r})
+from app.config import Config
+Config.SQLALCHEMY_DATABASE_URI = 'sqlite:///{database_path}'
+Config.SQLALCHEMY_ECHO = False
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+app = create_app()
+with app.app_context():
+    db.create_all()
+    print(create_access_token(identity=1))
+"""
+    return subprocess.run([sys.executable, '-c', script], check=True, capture_output=True, text=True).stdout.strip()
+
+
+def measure_phases(database_path, token, runs):
+    """Mediana de la duración (ms) de cada fase del arranque en `runs` intérpretes nuevos."""
+    script = PHASES_SCRIPT.format(root=ROOT, database=database_path, token=token)
+    samples = collections.defaultdict(list)
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', script], check=True, capture_output=True, text=True).stdout
+        for phase, seconds in json.loads(output.splitlines()[-1]).items():
+            samples[phase].append(seconds * 1000)
+    return {phase: statistics.median(values) for phase, values in samples.items()}
+
+
+def import_breakdown(database_path, token):
+    """
+    Ejecuta el arranque con `-X importtime` y agrega los tiempos.
+
+    Returns:
+        Tuple[Counter, Counter]: Tiempo propio (us) por paquete de primer nivel y tiempo
+        acumulado (us) de cada módulo importado directamente por el paquete `app`.
+    """
+    script = PHASES_SCRIPT.format(root=ROOT, database=database_path, token=token)
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', script], check=True, capture_output=True, text=True
+    ).stderr
+
+    by_package, by_app_import = collections.Counter(), collections.Counter()
+    pending = []  # Módulos hijos vistos hasta que aparece su importador (importtime lista primero los hijos)
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        module = name.strip()
+        by_package[module.split('.')[0]] += int(self_us)
+
+        if module.split('.')[0] == 'app':
+            # Los hijos de un módulo de la aplicación que no son de la aplicación son sus dependencias
+            for child_depth, child, child_cumulative in pending:
+                if child_depth == depth + 1 and child.split('.')[0] != 'app':
+                    by_app_import[f'{child} (from {module})'] += child_cumulative
+        pending = [entry for entry in pending if entry[0] <= depth] + [(depth, module, int(cumulative_us))]
+
+    return by_package, by_app_import
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_path = os.path.join(tmp, 'profile.db')
+        token = seed(database_path)
+
+        print(f'Startup phases (median of {args.runs} cold runs)')
+        for phase, ms in measure_phases(database_path, token, args.runs).items():
+            print(f'  {phase:<24} {ms:>9.1f} ms')
+
+        by_package, by_app_import = import_breakdown(database_path, token)
+        print(f'\nImport time by package (self time, total {sum(by_package.values()) / 1000:.1f} ms)')
+        for package, us in by_package.most_common(args.top):
+            print(f'  {package:<40} {us / 1000:>9.1f} ms')
+
+        print('\nThird-party imports pulled in by the application (cumulative)')
+        for module, us in by_app_import.most_common(args.top):
+            print(f'  {module:<60} {us / 1000:>9.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Configuración de gunicorn para producción.
+
+Uso:
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Variables de entorno:
+    BIND: Dirección de escucha (por defecto 0.0.0.0:8000).
+    WEB_CONCURRENCY: Número de procesos worker (por defecto 2 * CPUs + 1).
+    GUNICORN_THREADS: Hilos por worker (por defecto 4).
+    DB_POOL_PRIME: Conexiones a abrir por worker antes de aceptar tráfico (por defecto, una por hilo).
+    GUNICORN_PRELOAD: 'false' para cargar la aplicación en cada worker en lugar de en el maestro.
+    OVERDUE_SWEEP_INTERVAL: Segundos entre barridos de tareas vencidas en cada worker (por defecto 0, desactivado).
+    TASK_ID_NODE: Nodo fijo del generador de IDs de tareas; sin él, cada worker arrienda uno libre al arrancar.
+"""
+import multiprocessing
+import os
+import resource
+import time
+
+# Dirección de escucha
+bind = os.environ.get('BIND', '0.0.0.0:8000')
+
+# Procesos preforkeados y mezcla de hilos por proceso (worker gthread)
+workers = int(os.environ.get('WEB_CONCURRENCY') or multiprocessing.cpu_count() * 2 + 1)
+threads = int(os.environ.get('GUNICORN_THREADS') or 4)
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+# Cargar la aplicación en el maestro antes del fork: los workers comparten la memoria
+# de los módulos importados y del precalentamiento (ver wsgi.py) por copy-on-write
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+# Reiniciar periódicamente los workers para acotar el crecimiento de memoria
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS') or 10000)
+max_requests_jitter = max_requests // 10
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT') or 30)
+graceful_timeout = timeout
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    """Reiniciar en el worker recién creado el estado por proceso heredado del maestro."""
+    from app.utils.warmup import reset_after_fork
+
+    reset_after_fork(worker.app.wsgi())
+
+
+def post_worker_init(worker):
+    """Abrir las conexiones del pool en cada worker antes de que acepte peticiones."""
+    from app.jobs.overdue_sweep import start_overdue_sweeper
+    from app.jobs.user_purge import resume_user_purges
+    from app.utils.sharding import lease_task_id_node
+    from app.utils.warmup import prime_connection_pool
+
+    started = time.perf_counter()
+    prime_connection_pool(worker.wsgi, int(os.environ.get('DB_POOL_PRIME') or threads))
+    if worker.wsgi.config['TASK_SHARD_URIS']:
+        lease_task_id_node(worker.wsgi)  # Falla el arranque del worker si no obtiene un nodo único
+    start_overdue_sweeper(worker.wsgi)  # Solo si OVERDUE_SWEEP_INTERVAL > 0; hilo propio tras el fork
+    if worker.wsgi.config['USER_PURGE_ASYNC']:
+        resume_user_purges(worker.wsgi)  # Purgados interrumpidos por un reinicio; solo uno de los workers los ejecuta
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    worker.log.info(
+        'Worker %s ready in %.1fms (max RSS %.1f MB)', worker.pid, (time.perf_counter() - started) * 1000, rss_mb
+    )
+
+
+def worker_exit(server, worker):
+    """Liberar el nodo de IDs de tareas del worker para que otro pueda arrendarlo sin esperar a que caduque."""
+    from app.utils.sharding import release_task_id_node
+
+    app = getattr(worker, 'wsgi', None)  # No existe si el worker falló al cargar la aplicación
+    if app is not None and app.config['TASK_SHARD_URIS']:
+        release_task_id_node(app)
@@ -0,0 +1,11 @@
+import os
+import uvicorn
+from app.asgi import create_asgi_app
+
+# Crear la aplicación en modo asíncrono (ASGI) usando la función factory `create_asgi_app`
+app = create_asgi_app()
+
+# Punto de entrada para ejecutar la aplicación con un servidor ASGI (uvicorn)
+if __name__ == '__main__':
+    # Un único proceso con bucle de eventos: la concurrencia la limita el pool de conexiones
+    uvicorn.run(app, host=os.environ.get('HOST', '127.0.0.1'), port=int(os.environ.get('PORT', 8000)))
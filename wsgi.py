@@ -0,0 +1,16 @@
+import os
+from app import create_app
+from app.config import Config
+from app.utils.warmup import warm_up_app
+
+# En producción nunca se imprimen las consultas SQL, aunque SQLALCHEMY_ECHO esté activado en el
+# entorno: cada sentencia bloquearía el hilo escribiendo en el log. Debe fijarse antes de crear los motores
+Config.SQLALCHEMY_ECHO = False
+
+# Crear la aplicación Flask usando la función factory `create_app`
+app = create_app()
+
+# Precalentar la aplicación al importarla: con `preload_app` esto ocurre una sola vez en el
+# proceso maestro de gunicorn y los workers lo comparten por copy-on-write
+if os.environ.get('APP_WARMUP', 'true').lower() == 'true':
+    warm_up_app(app)